@@ -0,0 +1,66 @@
+# User administration and the admin login.
+from flask import Blueprint, request, jsonify, current_app
+from app import db
+from models import User, Admin
+from pagination import paginated_response
+from hashing import verify_bcrypt, hash_bcrypt, bcrypt_needs_rehash, overloaded_response, HashingOverloaded
+from auth import admin_token, cached_admin, get_admin_cache, admin_required, revoke_identity
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/api/users', methods=['GET'])
+@admin_required
+def get_users():
+    try:
+        return paginated_response(User, User.query, [])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+@bp.route('/api/users/<int:id>', methods=['DELETE'])
+@admin_required
+def delete_user(id):
+    # Logic to delete user with given id
+    revoke_identity(id)
+    return jsonify({"message": "User deleted successfully"}), 200
+
+
+
+# Handle login request
+@bp.route('/admin-login-page')
+def login_page():
+    return current_app.send_static_file('adminlogin.html')
+
+# Handle login request
+@bp.route('/api/admin-authenticate', methods=['POST'])
+def authenticate_admin():
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('password')
+
+    if not email or not password:
+        return jsonify({'message': 'Email and password are required'}), 400
+
+    admin = cached_admin(email)
+    try:
+        valid = admin is not None and verify_bcrypt(admin['password'], password)
+        if valid and bcrypt_needs_rehash(admin['password']):
+            Admin.query.filter_by(id=admin['id']).update({'password': hash_bcrypt(password)})
+            db.session.commit()
+            get_admin_cache().delete(email)
+    except HashingOverloaded:
+        db.session.rollback()
+        return overloaded_response()
+    if valid:
+        return jsonify({
+            'message': 'Login successful',
+            'redirect': 'http://127.0.0.1:5500/admin.html',
+            'token': admin_token(admin)
+        }), 200
+    else:
+        return jsonify({'message': 'Invalid email or password'}), 401
+
+# Serve the admin panel (protected route)
+@bp.route('/admin-dashboard')
+def admin_dashboard():
+    # Add authentication check here in a real app
+    return current_app.send_static_file('admin.html')
@@ -0,0 +1,264 @@
+# Admission control: every request is sorted into a route class, must find
+# room under its class's in-flight limit in this process (503 otherwise) and
+# take a token from its client's bucket for that class (429 otherwise), so
+# logins, uploads and full-table reads cannot tie up every request thread
+# and one client cannot use up a class for everyone else.
+from flask import Blueprint, request, jsonify, g, current_app
+from flask_jwt_extended import decode_token
+from collections import OrderedDict
+from threading import Lock
+from pagination import wants_stream
+from cache import cached_entry
+from async_db import blocking
+import math
+import time
+
+# Endpoints of the expensive classes; everything else is 'default'
+ROUTE_CLASSES = {
+    # Password hashing
+    'auth': {'auth.login', 'auth.register_user', 'admin.authenticate_admin'},
+    # Multipart uploads, decoded and resized into thumbnails
+    'upload': {'marketplace.create_petm', 'marketplace.create_sell_pet'},
+    # List endpoints; only whole-table reads that miss the response cache
+    # count (see route_class)
+    'list': {'scheduling.get_bookings', 'scheduling.get_boardings', 'scheduling.get_consultations',
+             'marketplace.get_petm', 'marketplace.get_sell_pets', 'admin.get_users'},
+}
+CLASSES = tuple(ROUTE_CLASSES) + ('default',)
+# Probes and scrapes must get through an overloaded worker; event streams
+# have their own limits (EVENTS_MAX_STREAMS)
+EXEMPT = {'health.healthz', 'health.readyz', 'metrics.get_metrics', 'events.get_events'}
+
+
+def parse_rate(spec):
+    """'<requests>/<seconds>' -> (tokens per second, burst), or None for no limit."""
+    if not spec or spec == '0':
+        return None
+    count, _, seconds = spec.partition('/')
+    count, seconds = float(count), float(seconds or 1)
+    return count / seconds, count
+
+
+class MemoryBuckets:
+    """Token buckets in this process, LRU-bounded to `max_entries` clients.
+
+    An evicted client starts again with a full bucket.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.buckets = OrderedDict()  # key -> [tokens, updated]
+        self.lock = Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        """Returns (allowed, seconds until `cost` tokens are available)."""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [burst, now]
+                while len(self.buckets) > self.max_entries:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            bucket[0], bucket[1] = tokens - cost if allowed else tokens, now
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+# Same arithmetic as MemoryBuckets.take, atomically on the server's clock
+TAKE_SCRIPT = '''
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = math.min(burst, (tonumber(state[1]) or burst) + math.max(0, now - (tonumber(state[2]) or now)) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+'''
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker and host.
+
+    `client` is anything with redis-py's eval signature, so tests can pass a
+    local fake instead of a real server.
+    """
+
+    def __init__(self, client, prefix='minibackend:rate:'):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key, rate, burst, cost=1):
+        allowed, tokens = blocking(self.client.eval, TAKE_SCRIPT, 1, self.prefix + key, rate, burst, cost)
+        if int(allowed):
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+
+def build_buckets(config):
+    if config['RATE_LIMIT_BACKEND'] == 'redis':
+        import redis  # Optional dependency, only needed for the shared backend
+        return RedisBuckets(redis.Redis.from_url(config['RATE_LIMIT_REDIS_URL']))
+    return MemoryBuckets(max_entries=config['RATE_LIMIT_MAX_CLIENTS'])
+
+
+class Gate:
+    """At most `limit` requests of one route class in flight (0: no limit).
+
+    Fails fast instead of queueing: a waiting request would still hold a
+    request thread.
+    """
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.in_flight = 0
+        self.lock = Lock()
+
+    def enter(self):
+        with self.lock:
+            if self.limit and self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class Admission:
+    """One app's buckets, per-class gates and rejection counters."""
+
+    def __init__(self, config):
+        self.buckets = build_buckets(config)
+        self.gates = {name: Gate(config[f'CONCURRENCY_{name.upper()}']) for name in CLASSES}
+        # Route class -> (tokens per second, burst) or None
+        self.rates = {name: parse_rate(config[f'RATE_LIMIT_{name.upper()}']) for name in CLASSES}
+        # Route class -> rejections, by reason
+        self.rejections = {name: {'rate_limited': 0, 'overloaded': 0} for name in CLASSES}
+        self.lock = Lock()
+
+    def count(self, name, reason):
+        with self.lock:
+            self.rejections[name][reason] += 1
+
+    def rejection_counts(self):
+        with self.lock:
+            return {name: dict(reasons) for name, reasons in self.rejections.items()}
+
+
+bp = Blueprint('admission', __name__)
+
+
+def init_app(app):
+    app.extensions['admission'] = Admission(app.config)
+
+
+def get_admission():
+    return current_app.extensions['admission']
+
+
+def route_class():
+    endpoint = request.endpoint
+    if endpoint in EXEMPT or request.method == 'OPTIONS':
+        return None
+    for name, endpoints in ROUTE_CLASSES.items():
+        if endpoint in endpoints:
+            # A page (?limit= or ?after=) of a list, or a cached list, is as
+            # cheap as any other read
+            if name == 'list' and not wants_stream() and ('limit' in request.args or 'after' in request.args
+                                                          or cached_entry(current_app.view_functions[endpoint])):
+                return 'default'
+            return name
+    return 'default'
+
+
+def client_identity():
+    """The token's subject for requests with a valid bearer token, else the client address."""
+    if 'client_identity' not in g:
+        g.client_identity = 'ip:' + str(request.remote_addr)
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            try:
+                g.client_identity = 'user:' + str(decode_token(header[7:])['sub'])
+            except Exception:
+                pass  # Invalid or expired: the view will say so
+    return g.client_identity
+
+
+def rejected(message, status, retry_after):
+    response = jsonify({'error': message})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status
+
+
+@bp.before_app_request
+def admit():
+    if not current_app.config['ADMISSION_ENABLED']:
+        return None
+    name = route_class()
+    if name is None:
+        return None
+    # Room first, so a request turned away as busy keeps its token
+    admission = get_admission()
+    gate = admission.gates[name]
+    if not gate.enter():
+        admission.count(name, 'overloaded')
+        return rejected('Server busy, try again shortly', 503, 1)
+
+    rate = admission.rates[name]
+    if rate is not None:
+        try:
+            allowed, wait = admission.buckets.take(f'{name}:{client_identity()}', *rate)
+        except Exception as e:
+            # A limiter outage must not take the API down with it
+            print(f"Rate limiter unavailable, admitting request: {e}")
+            allowed = True
+        if not allowed:
+            gate.leave()
+            admission.count(name, 'rate_limited')
+            return rejected('Too many requests, slow down', 429, wait)
+    g.admission_gate = gate
+    return None
+
+
+@bp.after_app_request
+def release_on_close(response):
+    # Streamed responses keep working after the view returns; their slot is
+    # held until the server has sent the last byte
+    if response.is_streamed:
+        gate = g.pop('admission_gate', None)
+        if gate is not None:
+            response.call_on_close(gate.leave)
+    return response
+
+
+@bp.teardown_app_request
+def release(exc):
+    gate = g.pop('admission_gate', None)
+    if gate is not None:
+        gate.leave()
+
+
+@bp.route('/api/admission/stats', methods=['GET'])
+def get_admission_stats():
+    admission = get_admission()
+    counts = admission.rejection_counts()
+    stats = {}
+    for name in CLASSES:
+        rate = admission.rates[name]
+        stats[name] = {
+            'inFlight': admission.gates[name].in_flight,
+            'concurrencyLimit': admission.gates[name].limit,
+            'rateLimit': {'perSecond': rate[0], 'burst': rate[1]} if rate else None,
+            'rejected': counts[name],
+        }
+    return jsonify(stats), 200
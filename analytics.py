@@ -0,0 +1,102 @@
+from flask import request
+from datetime import datetime, timedelta
+from app import db
+from models import Boarding, BoardingDaily, boardings_archive
+import itertools
+
+MAX_RANGE_DAYS = 366
+
+
+def boarding_nights(check_in, check_out):
+    # A stay occupies each night from check-in up to (not including) check-out;
+    # same-day stays still count as one day
+    nights = max((check_out - check_in).days, 1)
+    return [check_in + timedelta(days=n) for n in range(nights)]
+
+
+def boarding_deltas(boardings, sign, deltas=None):
+    """Accumulate per-(day, package_type) occupancy and revenue changes.
+
+    `boardings` are Boarding objects or dicts of column values. Revenue is
+    booked on the check-in day.
+    """
+    deltas = {} if deltas is None else deltas
+    for b in boardings:
+        if isinstance(b, dict):
+            check_in, check_out, package, price = b['check_in'], b['check_out'], b['package_type'], b['total_price']
+        else:
+            check_in, check_out, package, price = b.check_in, b.check_out, b.package_type, b.total_price
+        for day in boarding_nights(check_in, check_out):
+            entry = deltas.setdefault((day, package), [0, 0])
+            entry[0] += sign
+            if day == check_in:
+                entry[1] += sign * int(price)
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add deltas to the rollup in the current transaction with one upsert."""
+    if not deltas:
+        return
+    table = BoardingDaily.__table__
+    values = [{'day': day, 'package_type': package, 'occupancy': occ, 'revenue': rev}
+              for (day, package), (occ, rev) in deltas.items()]
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in values:
+            updated = db.session.query(BoardingDaily).filter_by(day=row['day'], package_type=row['package_type']).update({
+                'occupancy': BoardingDaily.occupancy + row['occupancy'],
+                'revenue': BoardingDaily.revenue + row['revenue']
+            })
+            if not updated:
+                db.session.add(BoardingDaily(**row))
+        return
+
+    stmt = insert(table).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'package_type'],
+        set_={
+            'occupancy': table.c.occupancy + stmt.excluded.occupancy,
+            'revenue': table.c.revenue + stmt.excluded.revenue
+        }
+    )
+    db.session.execute(stmt)
+
+
+def record_boardings(boardings, sign=1):
+    apply_deltas(boarding_deltas(boardings, sign))
+
+
+def remove_boarding_ids(ids):
+    # For bulk deletes: subtract the rows about to be deleted
+    record_boardings(Boarding.query.filter(Boarding.id.in_(ids)).all(), sign=-1)
+
+
+def rebuild_boarding_rollup(batch_size=1000):
+    """Recompute boarding_daily from the boardings and boardings_archive tables in one transaction."""
+    deltas = {}
+    count = 0
+    archived = db.select(boardings_archive).execution_options(yield_per=batch_size)
+    for boarding in itertools.chain(Boarding.query.yield_per(batch_size),
+                                    (dict(row) for row in db.session.execute(archived).mappings())):
+        boarding_deltas([boarding], 1, deltas)
+        count += 1
+        if count % batch_size == 0:
+            print(f"Scanned {count} boardings")
+    BoardingDaily.query.delete()
+    apply_deltas(deltas)
+    db.session.commit()
+    return count, len(deltas)
+
+
+def parse_range():
+    today = datetime.now().date()
+    start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if 'from' in request.args else today
+    end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if 'to' in request.args else start + timedelta(days=29)
+    if end < start or (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'Range must be between 1 and {MAX_RANGE_DAYS} days')
+    return start, end
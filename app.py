@@ -1,37 +1,208 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from dotenv import load_dotenv 
-from flask_cors import CORS
+from db_config import engine_options, RoutingSession, new_pool_stats, track_pool_stats
 import os
 
-# Load environment variables from .env file
-load_dotenv()
-
-app = Flask(__name__)
-UPLOAD_FOLDER = os.path.join(app.root_path, 'static/uploads')
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-# Ensure upload directory exists with error handling
-try:
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-except OSError as e:
-    print(f"Error creating upload directory {UPLOAD_FOLDER}: {e}")
-CORS(app, origins=["http://127.0.0.1:5500"])
-# CORS(app, resources={r"/api/*": {"origins": "http://127.0.0.1:5500"}})
-# Configure PostgreSQL Database
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS') == 'True'
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-
-db = SQLAlchemy(app)
-
-@app.route('/')
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Blueprint modules in registration order. after_request hooks run in
+# reverse order, so metrics records a response before it is compressed;
+# before_request hooks in order, so metrics also counts what admission rejects.
+# events comes before the modules that register control handlers on its bus.
+BLUEPRINTS = ('compress', 'replicas', 'metrics', 'admission', 'health', 'media', 'events', 'cache',
+              'hashing', 'auth', 'scheduling', 'marketplace', 'admin')
+
+
+def load_config(app):
+    """Settings from the environment (and .env), as app.config entries."""
+    app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', os.path.join(app.root_path, 'static/uploads'))
+    # Largest accepted image upload and size of the background image worker pool
+    app.config['MAX_UPLOAD_BYTES'] = int(os.getenv('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    # Room for the other form fields and multipart headers next to the image
+    app.config['FORM_OVERHEAD_BYTES'] = int(os.getenv('FORM_OVERHEAD_BYTES', 64 * 1024))
+    app.config['IMAGE_WORKERS'] = int(os.getenv('IMAGE_WORKERS', 2))
+    # Public base for image URLs (e.g. a CDN), and optional sendfile hand-off:
+    # MEDIA_ACCEL_PREFIX is an nginx internal location aliased to UPLOAD_FOLDER,
+    # USE_X_SENDFILE makes send_file emit X-Sendfile for Apache/lighttpd
+    app.config['MEDIA_BASE_URL'] = os.getenv('MEDIA_BASE_URL', 'http://127.0.0.1:5000/media')
+    app.config['MEDIA_ACCEL_PREFIX'] = os.getenv('MEDIA_ACCEL_PREFIX', '')
+    app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE') == 'True'
+    # Configure PostgreSQL Database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS') == 'True'
+    # Comma-separated read replica URIs for GET requests (see replicas.py); reads
+    # stick to the primary for a client for a few seconds after it writes, and
+    # cached lists are refilled from the primary for as long after any write
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [u for u in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if u]
+    app.config['REPLICA_RETRY_SECONDS'] = int(os.getenv('REPLICA_RETRY_SECONDS', 30))
+    app.config['READ_YOUR_WRITES_SECONDS'] = int(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    # Cached user/admin records for token checks, and whether admin endpoints
+    # require an admin token
+    app.config['AUTH_CACHE_TTL'] = int(os.getenv('AUTH_CACHE_TTL', 60))
+    app.config['AUTH_CACHE_MAX_ENTRIES'] = int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000))
+    app.config['REQUIRE_ADMIN_TOKEN'] = os.getenv('REQUIRE_ADMIN_TOKEN') == 'True'
+    # Logged-out tokens and revoked users, kept on CACHE_BACKEND until the
+    # tokens expire. With 'memory' each worker holds a copy (sent over the
+    # events backend) that a restarted worker starts without; use 'redis'
+    # when revocation must hold across restarts.
+    app.config['AUTH_REVOCATIONS_MAX_ENTRIES'] = int(os.getenv('AUTH_REVOCATIONS_MAX_ENTRIES', 100000))
+    # Password hashing: werkzeug method/cost for user passwords, bcrypt cost for
+    # admins, and the process pool that runs them (see hashing.py)
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['BCRYPT_ROUNDS'] = int(os.getenv('BCRYPT_ROUNDS', 12))
+    app.config['HASH_WORKERS'] = int(os.getenv('HASH_WORKERS', os.cpu_count() or 2))
+    app.config['HASH_QUEUE_DEPTH'] = int(os.getenv('HASH_QUEUE_DEPTH', 32))
+    app.config['HASH_TIMEOUT'] = float(os.getenv('HASH_TIMEOUT', 5))
+    # Requests slower than this, or running at least this many queries, are logged
+    app.config['SLOW_REQUEST_MS'] = int(os.getenv('SLOW_REQUEST_MS', 500))
+    app.config['SLOW_REQUEST_QUERIES'] = int(os.getenv('SLOW_REQUEST_QUERIES', 50))
+    # Encode JSON responses with orjson when installed (same bytes as Flask's encoder)
+    app.config['FAST_JSON'] = os.getenv('FAST_JSON', 'True') == 'True'
+    # Negotiated response compression (see compress.py); br and zstd need the
+    # brotli / zstandard packages. Encodings are listed in preference order.
+    app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'True') == 'True'
+    app.config['COMPRESS_MIN_BYTES'] = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+    app.config['COMPRESS_ENCODINGS'] = os.getenv('COMPRESS_ENCODINGS', 'zstd,br,gzip').split(',')
+    app.config['COMPRESS_GZIP_LEVEL'] = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    app.config['COMPRESS_BROTLI_QUALITY'] = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
+    app.config['COMPRESS_ZSTD_LEVEL'] = int(os.getenv('COMPRESS_ZSTD_LEVEL', 3))
+    # Server-generated ids (see ids.py): a fixed worker id (0-63) per process, or
+    # unset to lease a free one through lock files in ID_LOCK_DIR. Leases are
+    # per host, so with several hosts give each its own range of worker ids:
+    # ID_WORKER_BASE up to ID_WORKER_BASE + ID_HOST_WORKERS - 1
+    app.config['ID_WORKER_ID'] = os.getenv('ID_WORKER_ID')
+    app.config['ID_WORKER_BASE'] = int(os.getenv('ID_WORKER_BASE', 0))
+    app.config['ID_HOST_WORKERS'] = int(os.getenv('ID_HOST_WORKERS', 64))
+    app.config['ID_LOCK_DIR'] = os.getenv('ID_LOCK_DIR')  # Default: <temp dir>/paws-connect-ids
+    # Bookings, boardings and consultations that finished this many days ago
+    # are moved to the archive tables by `python manage.py archive`
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
+    # Largest page a list endpoint returns for ?limit= / ?after=
+    app.config['PAGE_MAX_LIMIT'] = int(os.getenv('PAGE_MAX_LIMIT', 1000))
+    # Rows fetched per round trip when streaming NDJSON exports
+    app.config['STREAM_BATCH_SIZE'] = int(os.getenv('STREAM_BATCH_SIZE', 500))
+    # Largest array accepted by the bulk create / delete endpoints
+    app.config['BULK_MAX_ITEMS'] = int(os.getenv('BULK_MAX_ITEMS', 1000))
+    # Bookable consultation slots per day, how long a cached day may go stale
+    # and how many (vet, day) entries each worker keeps
+    app.config['CONSULT_SLOTS'] = os.getenv('CONSULT_SLOTS', '09:00,10:00,11:00,12:00,14:00,15:00,16:00,17:00').split(',')
+    app.config['AVAILABILITY_CACHE_TTL'] = int(os.getenv('AVAILABILITY_CACHE_TTL', 30))
+    app.config['AVAILABILITY_CACHE_MAX_DAYS'] = int(os.getenv('AVAILABILITY_CACHE_MAX_DAYS', 50000))
+    # Response cache for the catalogue endpoints ('memory' or 'redis')
+    app.config['CACHE_ENABLED'] = os.getenv('CACHE_ENABLED', 'True') == 'True'
+    app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'memory')
+    app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # With the memory backend each worker has its own cache; writes reach the
+    # others over the events backend, and CACHE_TTL bounds a lost message
+    app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 60))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    # Change feed (see events.py): 'local' fans out between the workers of one
+    # host through Unix sockets in EVENTS_SOCKET_DIR, 'redis' across hosts,
+    # 'memory' stays in one process. Resumable from the last EVENTS_BUFFER_SIZE events.
+    app.config['EVENTS_BACKEND'] = os.getenv('EVENTS_BACKEND', 'local')
+    app.config['EVENTS_REDIS_URL'] = os.getenv('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['EVENTS_SOCKET_DIR'] = os.getenv('EVENTS_SOCKET_DIR')  # Default: <temp dir>/paws-connect-events-<database hash>
+    app.config['EVENTS_BUFFER_SIZE'] = int(os.getenv('EVENTS_BUFFER_SIZE', 1000))
+    app.config['EVENTS_HEARTBEAT_SECONDS'] = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    # Streams end after this long and the client reconnects with Last-Event-ID
+    app.config['EVENTS_STREAM_SECONDS'] = int(os.getenv('EVENTS_STREAM_SECONDS', 300))
+    app.config['EVENTS_RETRY_MS'] = int(os.getenv('EVENTS_RETRY_MS', 3000))
+    # Open streams per process: served from the event loop under asgi.py, or
+    # each holding a request thread under WSGI servers
+    app.config['EVENTS_MAX_STREAMS'] = int(os.getenv('EVENTS_MAX_STREAMS', 10000))
+    app.config['EVENTS_MAX_THREAD_STREAMS'] = int(os.getenv('EVENTS_MAX_THREAD_STREAMS', 2))
+    # Admission control (see admission.py). Per client (token subject or
+    # address) and route class: RATE_LIMIT_<CLASS> requests per window as
+    # "<requests>/<seconds>", also the burst (empty: no limit, the default),
+    # counted per process with 'memory' or across workers and hosts with
+    # 'redis'. Per process: at most CONCURRENCY_<CLASS> requests of a class in
+    # flight (0: no limit); by default half of WEB_THREADS for the expensive
+    # classes, so cheap routes always find a thread.
+    app.config['ADMISSION_ENABLED'] = os.getenv('ADMISSION_ENABLED', 'True') == 'True'
+    app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    app.config['RATE_LIMIT_REDIS_URL'] = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['RATE_LIMIT_MAX_CLIENTS'] = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 100000))
+    app.config['RATE_LIMIT_AUTH'] = os.getenv('RATE_LIMIT_AUTH', '')
+    app.config['RATE_LIMIT_UPLOAD'] = os.getenv('RATE_LIMIT_UPLOAD', '')
+    app.config['RATE_LIMIT_LIST'] = os.getenv('RATE_LIMIT_LIST', '')
+    app.config['RATE_LIMIT_DEFAULT'] = os.getenv('RATE_LIMIT_DEFAULT', '')
+    expensive = max(1, int(os.getenv('WEB_THREADS', 8)) // 2)
+    app.config['CONCURRENCY_AUTH'] = int(os.getenv('CONCURRENCY_AUTH', expensive))
+    app.config['CONCURRENCY_UPLOAD'] = int(os.getenv('CONCURRENCY_UPLOAD', expensive))
+    app.config['CONCURRENCY_LIST'] = int(os.getenv('CONCURRENCY_LIST', expensive))
+    app.config['CONCURRENCY_DEFAULT'] = int(os.getenv('CONCURRENCY_DEFAULT', 0))
+    # Number of reverse proxies in front of the app whose X-Forwarded-For and
+    # X-Forwarded-Proto are trusted (werkzeug's ProxyFix). Leave at 0 unless
+    # every request comes through them: otherwise clients can forge their
+    # address. Rate limits and read-replica stickiness key on that address.
+    app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', 0))
+
+
+def create_app(config=None):
+    """Build the app: settings from the environment, then `config` overrides.
+
+    Importing this module is cheap; the ORM models, blueprints and their
+    dependencies are imported here, and the heavy optional ones (bcrypt,
+    Pillow, brotli, zstandard, redis) only when first used. Nothing here
+    opens a connection or starts a thread or process, so pre-fork servers
+    can build the app once and fork it (see gunicorn.conf.py).
+    """
+    from dotenv import load_dotenv
+    from flask_cors import CORS
+    import importlib
+    import ids
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    app = Flask(__name__)
+    load_config(app)
+    app.config.update(config or {})
+    # Whole request bodies are refused beyond this, before they are parsed
+    if app.config['MAX_CONTENT_LENGTH'] is None:
+        app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_BYTES'] + app.config['FORM_OVERHEAD_BYTES']
+    # Pool sizing, pre-ping, recycle and statement timeout from DB_* variables
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    # Ensure upload directory exists with error handling
+    upload_folder = app.config['UPLOAD_FOLDER']
+    try:
+        if not os.path.exists(upload_folder):
+            os.makedirs(upload_folder)
+    except OSError as e:
+        print(f"Error creating upload directory {upload_folder}: {e}")
+    CORS(app, origins=["http://127.0.0.1:5500"], expose_headers=['X-Next-Cursor', 'Link'])
+    # CORS(app, resources={r"/api/*": {"origins": "http://127.0.0.1:5500"}})
+    if app.config['FAST_JSON']:
+        from json_provider import FastJSONProvider
+        app.json = FastJSONProvider(app)
+
+    if app.config['TRUSTED_PROXIES']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    db.init_app(app)
+    app.extensions['pool_stats'] = new_pool_stats()
+    with app.app_context():
+        track_pool_stats(db.engine, app.extensions['pool_stats'])
+    ids.init_app(app)
+    for name in BLUEPRINTS:
+        module = importlib.import_module(name)
+        if hasattr(module, 'init_app'):
+            module.init_app(app)
+        app.register_blueprint(module.bp)
+    app.add_url_rule('/', 'index', index)
+    return app
+
+
 def index():
     return 'Welcome to Paws Connect!'
 
+
 if __name__ == '__main__':
-    from routes import *  # Import routes
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,122 @@
+# Retention for bookings, boardings and consultations: rows that finished
+# more than ARCHIVE_AFTER_DAYS ago move to <table>_archive, so the hot tables
+# (and the date-ordered scans of their list endpoints) only hold recent and
+# upcoming appointments. python manage.py archive runs it; the list
+# endpoints read both tables with ?include_archived=1.
+from flask import request
+from datetime import datetime
+from app import db
+from models import Booking, Boarding, Consultation, bookings_archive, boardings_archive, consultations_archive
+import time
+
+
+class Retention:
+    """How one model is archived.
+
+    Rows are scanned in (`key`, id) order, the index its list endpoint
+    sorts by, and move once `finished` is before the cutoff.
+    """
+
+    def __init__(self, model, table, key, finished):
+        self.model = model
+        self.table = table
+        self.key = key
+        self.finished = finished
+
+
+RETENTION = {
+    'bookings': Retention(Booking, bookings_archive, Booking.date, Booking.date),
+    # check_in <= check_out, so the check_in index finds every finished stay
+    'boardings': Retention(Boarding, boardings_archive, Boarding.check_in, Boarding.check_out),
+    'consultations': Retention(Consultation, consultations_archive, Consultation.consult_date, Consultation.consult_date),
+}
+ARCHIVE_TABLES = {retention.model: retention.table for retention in RETENTION.values()}
+
+
+def finished_before(retention, cutoff):
+    return db.session.query(retention.model.id, retention.key).filter(
+        retention.key < cutoff, retention.finished < cutoff)
+
+
+def archive_batch(retention, cutoff, after, batch_size):
+    """Moves the next `batch_size` finished rows in one transaction.
+
+    Returns (rows moved, sort key of the last one). A batch is copied and
+    deleted atomically, so an interrupted run loses nothing and a rerun
+    carries on with whatever is still in the hot table.
+    """
+    model = retention.model
+    query = finished_before(retention, cutoff)
+    if after is not None:
+        query = query.filter(db.tuple_(retention.key, model.id) > db.tuple_(*after))
+    rows = query.order_by(retention.key, model.id).limit(batch_size).all()
+    if not rows:
+        return 0, after
+
+    ids = [row_id for row_id, _ in rows]
+    hot = model.__table__
+    names = [column.name for column in hot.columns]
+    copy = db.select(*hot.columns, db.literal(datetime.utcnow(), db.DateTime).label('archived_at')) \
+        .where(hot.c.id.in_(ids))
+    try:
+        db.session.execute(retention.table.insert().from_select(names + ['archived_at'], copy))
+        db.session.execute(hot.delete().where(hot.c.id.in_(ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    row_id, key = rows[-1]
+    return len(ids), (key, row_id)
+
+
+def archive(name, cutoff, batch_size=1000, max_rate=0, pause=0.0, dry_run=False, progress=print):
+    """Archives one table's rows that finished before `cutoff`; returns the number moved.
+
+    `max_rate` caps rows per second (0: no cap) and `pause` sleeps between
+    batches, to leave room for live traffic and replication.
+    """
+    retention = RETENTION[name]
+    total = finished_before(retention, cutoff).count()
+    if dry_run or not total:
+        progress(f"{name}: {total} rows finished before {cutoff.isoformat()}"
+                 f"{' would be archived' if dry_run and total else ''}")
+        return 0
+
+    moved, after = 0, None
+    started = last_report = time.monotonic()
+    while True:
+        count, after = archive_batch(retention, cutoff, after, batch_size)
+        moved += count
+        now = time.monotonic()
+        if not count or now - last_report >= 1:
+            rate = moved / max(now - started, 1e-9)
+            progress(f"{name}: archived {moved}/{total} ({moved / total:.0%}), {rate:.0f} rows/s")
+            last_report = now
+        if not count:
+            return moved
+        delay = pause
+        if max_rate:
+            # Sleep off whatever the batches so far ran ahead of the cap
+            delay = max(delay, moved / max_rate - (now - started))
+        if delay > 0:
+            time.sleep(delay)
+
+
+def include_archived():
+    return request.args.get('include_archived') == '1'
+
+
+def readable(model):
+    """`model`, or with ?include_archived=1 an alias of it over hot UNION ALL archived rows.
+
+    Both tables are indexed on the endpoint's sort key; PostgreSQL pushes the
+    keyset filter into each branch and merges the two ordered scans.
+    """
+    if not include_archived():
+        return model
+    hot, archived = model.__table__, ARCHIVE_TABLES[model]
+    rows = db.union_all(
+        db.select(*hot.columns),
+        db.select(*[archived.c[column.name] for column in hot.columns]),
+    ).subquery(f'{hot.name}_all')
+    return db.aliased(model, rows)
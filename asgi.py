@@ -0,0 +1,317 @@
+# ASGI entry point: python asgi.py (uvicorn, WEB_WORKERS processes), or
+#     uvicorn asgi:application --workers 4
+#
+# The event loop owns the sockets: it reads request bodies (spooling large
+# uploads to a temp file off the loop) and writes responses, so slow clients
+# and uploads in flight do not hold a thread. Small pages of the hot lists,
+# the boarding rollups and image uploads then run on the loop too, with
+# their queries and blocking I/O awaited (see async_db.py; WEB_ASYNC_DB=False
+# or a missing async driver turns this off). Every other request runs the
+# Flask app in a pool of WEB_THREADS threads. asgiref's WsgiToAsgi is not used
+# because it runs every request on one shared thread. /api/events streams
+# go back to the loop once the view returns, so they hold no thread.
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs
+from app import create_app, db
+from async_db import build_async_engines, IO_POOL_KEY
+from db_config import ASYNC_BINDS_KEY
+from events import ASYNC_STREAMS_KEY, EVENT_STREAM_KEY
+from lifecycle import worker_ready, shutdown
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+flask_app = create_app()
+
+request_pool = ThreadPoolExecutor(max_workers=int(os.getenv('WEB_THREADS', 8)), thread_name_prefix='asgi')
+# Spooling request bodies, and the blocking I/O of requests run on the loop
+io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='asgi-io')
+# Request bodies larger than this are spooled to disk
+SPOOL_BYTES = int(os.getenv('WEB_SPOOL_BYTES', 1024 * 1024))
+STREAM_BUFFER_BYTES = 16 * 1024
+# Requests run on the loop: pages of these lists, the boarding rollups and uploads
+LIST_PATHS = {'/api/bookings', '/api/boardings', '/api/consultations', '/api/petm', '/api/sell_pets'}
+LOOP_ROUTES = {
+    'GET': LIST_PATHS | {'/api/boardings/occupancy', '/api/boardings/revenue'},
+    'POST': {'/api/petm', '/api/sell_pets'},
+}
+# Largest ?limit= page served on the loop
+LOOP_MAX_ROWS = int(os.getenv('WEB_LOOP_MAX_ROWS', 100))
+async_engines = None
+if os.getenv('WEB_ASYNC_DB', 'True') == 'True':
+    with flask_app.app_context():
+        async_engines = build_async_engines(db.engine, flask_app.extensions['replicas'])
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def read_body(receive, limit):
+    """The whole request body, in memory or spooled; None if the client left.
+
+    Raises BodyTooLarge as soon as more than `limit` bytes (None: no limit)
+    have arrived, so an oversized upload never lands in memory or on disk.
+    """
+    loop = asyncio.get_running_loop()
+    body, size = BytesIO(), 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if limit is not None and size > limit:
+            if not isinstance(body, BytesIO):
+                await loop.run_in_executor(io_pool, body.close)
+            raise BodyTooLarge
+        if size > SPOOL_BYTES and isinstance(body, BytesIO):
+            spooled = await loop.run_in_executor(io_pool, tempfile.TemporaryFile)
+            await loop.run_in_executor(io_pool, spooled.write, body.getvalue())
+            body = spooled
+        if isinstance(body, BytesIO):
+            body.write(chunk)
+        elif chunk:
+            await loop.run_in_executor(io_pool, body.write, chunk)
+        if not message.get('more_body'):
+            break
+    if not isinstance(body, BytesIO):
+        await loop.run_in_executor(io_pool, body.seek, 0)
+    else:
+        body.seek(0)
+    return body
+
+
+async def send_too_large(send, limit):
+    body = json.dumps({'error': f'Request exceeds {limit} bytes'}).encode()
+    # The rest of the body is never read: the connection cannot be reused
+    await send({'type': 'http.response.start', 'status': 413, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+        (b'connection', b'close')]})
+    await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+def build_environ(scope, body):
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin1')
+    path = scope['path'].encode('utf-8').decode('latin1')
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path,
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        ASYNC_STREAMS_KEY: True,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        if name in environ:
+            value = environ[name] + ('; ' if name == 'HTTP_COOKIE' else ',') + value
+        environ[name] = value
+    return environ
+
+
+def runs_on_loop(environ):
+    if async_engines is None or environ['PATH_INFO'] not in LOOP_ROUTES.get(environ['REQUEST_METHOD'], ()):
+        return False
+    if not isinstance(environ['wsgi.input'], BytesIO):
+        return False  # Parsing a spooled upload reads and writes temp files
+    if environ['REQUEST_METHOD'] == 'GET' and environ['PATH_INFO'] in LIST_PATHS:
+        # Serializing and compressing a large page, a whole list or an NDJSON
+        # stream is CPU work that would stall the loop: those go to a thread
+        args = parse_qs(environ['QUERY_STRING'])
+        limit = args.get('limit', [''])[0]
+        return (limit.isdigit() and 0 < int(limit) <= LOOP_MAX_ROWS and 'stream' not in args
+                and 'application/x-ndjson' not in environ.get('HTTP_ACCEPT', ''))
+    return True
+
+
+def start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in headers],
+    }
+
+
+async def run_on_loop(environ, send):
+    """Runs the Flask app for one request on the event loop.
+
+    The app runs in the greenlet bridge with the async engines bound and
+    blocking I/O sent to io_pool, so it yields to other requests whenever it
+    waits on the database or the disk. The body is sent once complete.
+    """
+    start = {}
+
+    def start_response(status, headers, exc_info=None):
+        start['message'] = start_message(status, headers)
+
+    def respond():
+        result = flask_app(environ, start_response)
+        try:
+            return b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    environ[ASYNC_BINDS_KEY] = async_engines.binds
+    environ[IO_POOL_KEY] = io_pool
+    try:
+        body = await async_engines.run(respond)
+    finally:
+        environ['wsgi.input'].close()
+    await send(start['message'])
+    await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+def run_wsgi(environ, send, loop):
+    """Runs the Flask app for one request on a pool thread.
+
+    Each ASGI message is handed to the event loop and waited for, so a slow
+    client pushes back on a streamed response instead of buffering it.
+    Returns the EventStream of an /api/events response, whose body is then
+    sent from the loop rather than this thread.
+    """
+    def send_message(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    start = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and start.get('sent'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        start['message'] = start_message(status, headers)
+        return lambda data: send_body(data, True)
+
+    def send_body(data, more):
+        if not start.get('sent'):
+            send_message(start['message'])
+            start['sent'] = True
+        send_message({'type': 'http.response.body', 'body': data, 'more_body': more})
+
+    result = flask_app(environ, start_response)
+    try:
+        stream = environ.get(EVENT_STREAM_KEY)
+        if stream is not None:
+            if start['message']['status'] == 200:
+                send_message(start['message'])
+                return stream
+            stream.close()
+        if isinstance(result, (list, tuple)):
+            send_body(b''.join(result), False)
+        else:
+            # Streamed bodies (NDJSON rows) are coalesced into larger messages;
+            # one loop round trip per line would dominate the cost
+            buffered, size = [], 0
+            for chunk in result:
+                buffered.append(chunk)
+                size += len(chunk)
+                if size >= STREAM_BUFFER_BYTES:
+                    send_body(b''.join(buffered), True)
+                    buffered, size = [], 0
+            send_body(b''.join(buffered), False)
+    finally:
+        # Runs call_on_close handlers and ends streamed database sessions
+        if hasattr(result, 'close'):
+            result.close()
+        environ['wsgi.input'].close()
+
+
+async def send_event_stream(stream, receive, send):
+    """Sends an /api/events body from the loop until it ends or the client leaves."""
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        stream.close()  # Wakes frames_async() so it returns
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        async for frame in stream.frames_async():
+            await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+        if not watcher.done():
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    except OSError:
+        pass  # Client went away mid-send
+    finally:
+        watcher.cancel()
+        stream.close()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            worker_ready(flask_app)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # The server has already stopped accepting and drained requests
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, graceful_shutdown)
+            if async_engines is not None:
+                await async_engines.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def graceful_shutdown():
+    request_pool.shutdown(wait=True)
+    io_pool.shutdown(wait=True)
+    shutdown(flask_app)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return  # No websockets
+    # Flask only checks MAX_CONTENT_LENGTH once the body is read: refuse a
+    # declared length up front and stop reading an undeclared one at the limit
+    limit = flask_app.config['MAX_CONTENT_LENGTH']
+    declared = dict(scope['headers']).get(b'content-length', b'')
+    if limit is not None and declared.isdigit() and int(declared) > limit:
+        return await send_too_large(send, limit)
+    try:
+        body = await read_body(receive, limit)
+    except BodyTooLarge:
+        return await send_too_large(send, limit)
+    if body is None:
+        return  # Client went away before sending the whole request
+    environ = build_environ(scope, body)
+    if runs_on_loop(environ):
+        return await run_on_loop(environ, send)
+    loop = asyncio.get_running_loop()
+    stream = await loop.run_in_executor(request_pool, run_wsgi, environ, send, loop)
+    if stream is not None:
+        await send_event_stream(stream, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(
+        'asgi:application',
+        host=os.getenv('WEB_HOST', '127.0.0.1'),
+        port=int(os.getenv('WEB_PORT', 8000)),
+        workers=int(os.getenv('WEB_WORKERS', os.cpu_count() or 1)),
+        lifespan='on',
+        # Seconds in-flight requests get to finish after SIGTERM
+        timeout_graceful_shutdown=int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30)),
+        access_log=os.getenv('WEB_ACCESS_LOG') == 'True',
+    )
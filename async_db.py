@@ -0,0 +1,87 @@
+# Async database and file I/O for the requests asgi.py runs on its event loop.
+#
+# Those requests (pages of the hot lists, the boarding rollups and image
+# uploads) run the Flask app inside SQLAlchemy's greenlet bridge instead of
+# on a request thread. The views stay synchronous: RoutingSession swaps each
+# engine for the sync facade of an AsyncEngine on the same database
+# (aiosqlite, asyncpg or psycopg's async mode), so every query awaits the
+# driver. Other blocking I/O on their path (file writes, Redis, the events
+# broker) goes through blocking(), which awaits it on a thread pool the
+# same way. The loop serves other requests while they wait. Needs greenlet and the async
+# driver; asgi.py runs everything on request threads without them.
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+from db_config import engine_options, track_pool_stats, TimedAsyncQueuePool
+import asyncio
+import os
+
+# WSGI environ key: the executor blocking() waits on
+IO_POOL_KEY = 'pawsconnect.io_pool'
+# Sync driver -> async driver for the same database
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'postgresql+psycopg': 'postgresql+psycopg_async',
+}
+
+
+def async_options(url):
+    options = engine_options(url.render_as_string(hide_password=False))
+    if 'poolclass' in options:
+        options['poolclass'] = TimedAsyncQueuePool
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+    if 'connect_args' in options and url.drivername == 'postgresql+asyncpg':
+        # asyncpg takes server settings rather than libpq's options string
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(statement_timeout)}}
+    return options
+
+
+class AsyncEngines:
+    """Async engines standing in for the primary and each replica engine."""
+
+    def __init__(self, primary, router):
+        import greenlet  # Optional dependency, only needed for the async bridge
+        from sqlalchemy.ext.asyncio import create_async_engine
+        self.engines = []
+        # Sync engine -> its async twin's sync facade, for RoutingSession
+        self.binds = {}
+        for index, engine in enumerate([primary] + router.engines):
+            url = engine.url
+            if url.drivername not in ASYNC_DRIVERS or url.database in (None, '', ':memory:'):
+                raise ValueError(f'No async driver for {url.drivername} databases')
+            async_url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+            # Imports the driver: ImportError when it is not installed
+            async_engine = create_async_engine(async_url, **async_options(async_url))
+            if index:
+                event.listen(async_engine.sync_engine, 'handle_error', router.error_listener(index - 1))
+            track_pool_stats(async_engine.sync_engine, engine.pool.stats)
+            self.engines.append(async_engine)
+            self.binds[engine] = async_engine.sync_engine
+
+    def run(self, fn, *args):
+        """Awaitable: fn(*args) where queries through these engines await."""
+        return greenlet_spawn(fn, *args)
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+
+
+def build_async_engines(primary, router):
+    """AsyncEngines, or None (with the reason printed) when they are unavailable."""
+    try:
+        return AsyncEngines(primary, router)
+    except (ImportError, ValueError) as e:
+        print(f"Async database I/O off, every request runs on a thread: {e}")
+        return None
+
+
+def blocking(fn, *args):
+    """fn(*args); awaited on the ASGI I/O pool in requests run on the event loop."""
+    pool = request.environ.get(IO_POOL_KEY) if has_request_context() else None
+    if pool is None:
+        return fn(*args)
+    return await_only(asyncio.get_running_loop().run_in_executor(pool, fn, *args))
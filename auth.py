@@ -0,0 +1,223 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request, jwt_required, get_jwt
+from datetime import timedelta
+from functools import wraps
+from app import db
+from models import User, Admin
+from cache import MemoryCache, RedisCache
+from events import broadcast
+from hashing import hash_password, verify_password, password_needs_rehash, overloaded_response, HashingOverloaded
+import time
+
+bp = Blueprint('auth', __name__)
+jwt = JWTManager()
+# Control topic that carries revocations to the other workers
+REVOKE_TOPIC = 'auth.revoke'
+# How long revocations are kept when tokens never expire
+REVOKE_FOREVER = 10 * 365 * 24 * 3600
+# Roles /register grants; admins only exist in the admins table
+SIGNUP_ROLES = ('adopter', 'seller')
+
+
+def build_revocations(config):
+    """Revoked token ids ('jti:<id>') and identities ('sub:<id>' -> revoked at), on the CACHE_BACKEND."""
+    if config['CACHE_BACKEND'] == 'redis':
+        import redis  # Optional dependency, only needed for the shared backend
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']), prefix='minibackend:revoked:')
+    return MemoryCache(max_entries=config['AUTH_REVOCATIONS_MAX_ENTRIES'])
+
+
+def init_app(app):
+    jwt.init_app(app)
+    # Small TTL caches so authorization and admin login do not hit the database
+    # on every request; entries are dropped on change and expire after AUTH_CACHE_TTL
+    for name in ('user_cache', 'admin_cache'):
+        app.extensions[name] = MemoryCache(max_entries=app.config['AUTH_CACHE_MAX_ENTRIES'],
+                                           ttl=app.config['AUTH_CACHE_TTL'])
+    revocations = app.extensions['revocations'] = build_revocations(app.config)
+    user_cache = app.extensions['user_cache']
+
+    def revoked_elsewhere(message):
+        key, value, ttl = message.split(' ')
+        if isinstance(revocations, MemoryCache):
+            revocations.set(key, value, ttl=float(ttl))
+        if key.startswith('sub:'):
+            user_cache.delete(key[4:])
+    app.extensions['events'].on(REVOKE_TOPIC, revoked_elsewhere)
+
+
+def get_user_cache():
+    return current_app.extensions['user_cache']
+
+
+def get_admin_cache():
+    return current_app.extensions['admin_cache']
+
+
+def get_revocations():
+    return current_app.extensions['revocations']
+
+
+def issue_token(identity, role, **claims):
+    # Role travels in the token so role checks never need the database
+    return create_access_token(identity=identity, additional_claims={'role': role, **claims})
+
+
+def user_token(user):
+    return issue_token(str(user.id), user.role, name=user.name)
+
+
+def admin_token(admin):
+    # `admin` is the cached record from cached_admin()
+    return issue_token(f"admin:{admin['id']}", admin['role'] or 'admin')
+
+
+def revoke(key, value, ttl):
+    get_revocations().set(key, value, ttl=ttl)
+    # Memory revocations and the user cache live in each worker
+    broadcast(REVOKE_TOPIC, f'{key} {value} {ttl}')
+
+
+def revoke_token(jti, expires_at):
+    # Entries only matter until the token would have expired anyway
+    revoke(f'jti:{jti}', '1', max(expires_at - time.time(), 1))
+
+
+def revoke_identity(identity):
+    # Invalidates every token issued to `identity` before now
+    lifetime = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    if isinstance(lifetime, timedelta):
+        lifetime = lifetime.total_seconds()
+    revoke(f'sub:{identity}', repr(time.time()), lifetime or REVOKE_FOREVER)
+    get_user_cache().delete(str(identity))
+
+
+@jwt.token_in_blocklist_loader
+def token_revoked(jwt_header, jwt_payload):
+    revocations = get_revocations()
+    if revocations.get(f"jti:{jwt_payload['jti']}") is not None:
+        return True
+    revoked_at = revocations.get(f"sub:{jwt_payload['sub']}")
+    return revoked_at is not None and jwt_payload.get('iat', 0) <= float(revoked_at)
+
+
+def cached_user(user_id):
+    """User record as a dict, from the TTL cache or one query on a miss."""
+    key = str(user_id)
+    user_cache = get_user_cache()
+    record = user_cache.get(key)
+    if record is None:
+        user = User.query.filter_by(id=int(user_id)).first()
+        if user is None:
+            return None
+        record = {'id': user.id, 'name': user.name, 'email': user.email, 'role': user.role}
+        user_cache.set(key, record)
+    return record
+
+
+def cached_admin(email):
+    admin_cache = get_admin_cache()
+    record = admin_cache.get(email)
+    if record is None:
+        admin = Admin.query.filter_by(email=email).first()
+        if admin is None:
+            return None
+        record = {'id': admin.id, 'email': admin.email, 'password': admin.password, 'role': admin.role}
+        admin_cache.set(email, record)
+    return record
+
+
+def current_role():
+    claims = get_jwt()
+    if str(claims['sub']).startswith('admin:'):
+        return claims.get('role') or 'admin'
+    role = claims.get('role')
+    if role is None:
+        # Tokens issued before roles were embedded: fall back to the cache/DB
+        record = cached_user(claims['sub'])
+        role = record['role'] if record else None
+    # Only authenticate_admin issues admin tokens; a user row never grants it
+    return None if role == 'admin' else role
+
+
+def role_required(*roles):
+    """Like @jwt_required(), plus a role check from the token's claims."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if current_role() not in roles:
+                return jsonify({'error': 'Forbidden'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def admin_required(view):
+    # Only enforced with REQUIRE_ADMIN_TOKEN=True, so the admin pages keep
+    # working until they send the token from /api/admin-authenticate
+    protected = role_required('admin')(view)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.config['REQUIRE_ADMIN_TOKEN']:
+            return protected(*args, **kwargs)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@bp.route('/register', methods=['POST'])
+def register_user():
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+        
+    if not all(k in data for k in ['name', 'email', 'password']):
+        return jsonify({'error': 'Missing required fields'}), 400
+    role = data.get('role', 'adopter')
+    if role not in SIGNUP_ROLES:
+        return jsonify({'error': f"role must be one of: {', '.join(SIGNUP_ROLES)}"}), 400
+        
+    try:
+        hashed_password = hash_password(data['password'])
+        new_user = User(
+            name=data['name'],
+            email=data['email'],
+            password_hash=hashed_password,
+            role=role
+        )
+        db.session.add(new_user)
+        db.session.commit()
+        return jsonify({'message': 'User registered successfully!'}), 201
+    except HashingOverloaded:
+        db.session.rollback()
+        return overloaded_response()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    user = User.query.filter_by(email=data['email']).first()
+    
+    try:
+        if user and verify_password(user.password_hash, data['password']):
+            # Upgrade hashes made with an older method or cost while we have the password
+            if password_needs_rehash(user.password_hash):
+                user.password_hash = hash_password(data['password'])
+                db.session.commit()
+            access_token = user_token(user)
+            return jsonify({'token': access_token})
+    except HashingOverloaded:
+        db.session.rollback()
+        return overloaded_response()
+    
+    return jsonify({'message': 'Invalid credentials'}), 401
+
+@bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    claims = get_jwt()
+    revoke_token(claims['jti'], claims['exp'])
+    return jsonify({'message': 'Logged out'}), 200
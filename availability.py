@@ -0,0 +1,101 @@
+from flask import current_app, g
+from collections import OrderedDict
+from datetime import timedelta
+from threading import Lock
+from app import db
+from models import Consultation
+import time
+
+MAX_RANGE_DAYS = 92
+
+
+def slot_index():
+    return {slot: i for i, slot in enumerate(current_app.config['CONSULT_SLOTS'])}
+
+
+class SlotCache:
+    """Per-vet, per-day bitmap of booked consultation slots.
+
+    Bit i is set when CONSULT_SLOTS[i] is taken. Days are filled from the
+    database in one range query and then kept current by mark() as this
+    worker creates and deletes consultations; the TTL bounds how long
+    another worker's writes can go unseen. The unique constraint on
+    (vet_id, consult_date, time_slot) is what actually prevents double
+    booking - this cache only serves reads. At most `max_days` (vet, day)
+    entries are kept, least recently read first out.
+    """
+
+    def __init__(self, ttl=30, max_days=50000):
+        self.ttl = ttl
+        self.max_days = max_days
+        self.days = OrderedDict()  # (vet_id, day) -> (expires, mask)
+        self.version = 0  # Bumped by mark() and reset() so a racing load is not stored
+        self.lock = Lock()
+
+    def get_range(self, vet_id, start, end):
+        dates = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+        now = time.monotonic()
+        with self.lock:
+            cached = {d: self.days.get((vet_id, d)) for d in dates}
+            if all(entry and entry[0] > now for entry in cached.values()):
+                for d in dates:
+                    self.days.move_to_end((vet_id, d))
+                return {d: entry[1] for d, entry in cached.items()}
+            version = self.version
+
+        # The days are cached and only this worker's writes are marked on
+        # them: load from the primary, never a replica that may be behind
+        if g.get('read_engine') is not None:
+            g.read_engine = None
+        masks = {d: 0 for d in dates}
+        index = slot_index()
+        rows = db.session.query(Consultation.consult_date, Consultation.time_slot).filter(
+            Consultation.vet_id == vet_id,
+            Consultation.consult_date.between(start, end)
+        )
+        for consult_date, time_slot in rows:
+            if time_slot in index:
+                masks[consult_date] |= 1 << index[time_slot]
+
+        expires = time.monotonic() + self.ttl
+        with self.lock:
+            if self.version == version:
+                for d, mask in masks.items():
+                    self.days[(vet_id, d)] = (expires, mask)
+                    self.days.move_to_end((vet_id, d))
+                while len(self.days) > self.max_days:
+                    self.days.popitem(last=False)
+        return masks
+
+    def mark(self, vet_id, consult_date, time_slot, booked):
+        bit = slot_index().get(time_slot)
+        if bit is None:
+            return
+        with self.lock:
+            self.version += 1
+            entry = self.days.get((vet_id, consult_date))
+            if entry is None:
+                return  # Not cached; the next read loads it from the database
+            expires, mask = entry
+            mask = mask | (1 << bit) if booked else mask & ~(1 << bit)
+            self.days[(vet_id, consult_date)] = (expires, mask)
+
+    def reset(self):
+        with self.lock:
+            self.days.clear()
+            self.version += 1
+
+
+def init_slot_cache(app):
+    app.extensions['slot_cache'] = SlotCache(ttl=app.config['AVAILABILITY_CACHE_TTL'],
+                                             max_days=app.config['AVAILABILITY_CACHE_MAX_DAYS'])
+
+
+def get_slot_cache():
+    return current_app.extensions['slot_cache']
+
+
+def slot_taken(vet_id, consult_date, time_slot):
+    return db.session.query(Consultation.id).filter_by(
+        vet_id=vet_id, consult_date=consult_date, time_slot=time_slot
+    ).first() is not None
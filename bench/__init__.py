@@ -0,0 +1,28 @@
+"""Load benchmarks for the API.
+
+    python -m bench seed --scale 1              # fill the database
+    python -m bench run --save baseline.json    # measure every endpoint
+    python -m bench run --compare baseline.json --threshold 0.2
+    python -m bench serialize                   # per-model JSON microbenchmark
+    python -m bench compression                 # bytes and CPU per encoding
+    python -m bench servers --concurrency 64    # gunicorn (wsgi.py) vs uvicorn (asgi.py)
+    python -m bench ids                         # id uniqueness across processes, ids/s
+    python -m bench startup --baseline HEAD~1   # import time, worker boot and RSS vs a git ref
+    python -m bench events --streams 1000       # memory per idle SSE stream, fan-out latency
+    python -m bench archive --history 10        # list latency before/after archiving (reseeds)
+    python -m bench pagination                  # page p50/p99 from 1k to 1M bookings (reseeds)
+    python -m bench analytics --years 1,4,16    # occupancy/revenue latency vs boarding history (reseeds)
+    python -m bench admission --seed            # cheap-route latency while expensive routes are flooded
+    python -m bench catalogue --rows 500000     # catalogue filter/search latency, indexed vs not (reseeds)
+    python -m bench hashing --clients 8         # catalogue read latency during a login burst
+    python -m bench auth                        # authorized requests/s, queries per authorized request
+    python -m bench cache --workers 2           # catalogue reads cached vs uncached, stale reads after a write
+    python -m bench bulk --count 500            # bulk create/delete vs one request per row
+    python -m bench media --concurrency 32      # image fetch throughput: whole file, 304, Range
+    python -m bench metrics --seed              # metrics hook overhead per query and per request
+
+Uses BENCH_DATABASE_URI (a throwaway SQLite file when unset), never
+SQLALCHEMY_DATABASE_URI: `seed`, `archive`, `pagination`, `analytics` and `catalogue` drop and recreate
+every table,
+so never point BENCH_DATABASE_URI at a real database.
+"""
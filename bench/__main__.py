@@ -0,0 +1,486 @@
+# python -m bench <command>; see bench/__init__.py
+import argparse
+import fnmatch
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from bench.seed import bench_database_uri, seed, DEFAULT_VOLUMES
+
+# Must be settled before create_app reads the environment. The benchmarks
+# drop and recreate tables, so an exported SQLALCHEMY_DATABASE_URI is
+# replaced, never used; the servers they start inherit the same database.
+os.environ['SQLALCHEMY_DATABASE_URI'] = bench_database_uri()
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-only-secret-key-not-for-production')
+# The load benchmarks measure capacity, not the limits; `bench admission` turns them on
+os.environ.setdefault('ADMISSION_ENABLED', 'False')
+
+from app import create_app
+from bench import runner
+from bench.scenarios import scenarios
+
+app = create_app()
+
+
+def parse_volumes(args):
+    volumes = {name: int(count * args.scale) for name, count in DEFAULT_VOLUMES.items()}
+    for item in args.volume or []:
+        name, _, count = item.partition('=')
+        if name not in volumes:
+            raise SystemExit(f"Unknown model for --volume: {name} (one of {', '.join(volumes)})")
+        volumes[name] = int(count)
+    return volumes
+
+
+def seed_command(args):
+    with app.app_context():
+        seed(parse_volumes(args), batch_size=args.batch_size)
+
+
+def run_options(args, volumes):
+    return {'requests': args.requests, 'warmup': args.warmup, 'concurrency': args.concurrency,
+            'bulk_size': args.bulk_size, 'image_size': args.image_size, 'volumes': volumes,
+            'accept_encoding': args.accept_encoding}
+
+
+def select_scenarios(args, options):
+    return [s for s in scenarios(options)
+            if not args.only or any(fnmatch.fnmatch(s.name, pattern) for pattern in args.only)]
+
+
+def run_command(args):
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    app.config['UPLOAD_FOLDER'] = args.upload_folder or tempfile.mkdtemp(prefix='bench-uploads-')
+
+    options = run_options(args, volumes)
+    selected = select_scenarios(args, options)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = runner.start_server(app)
+    print(f"Benchmarking {base_url} ({len(selected)} scenarios, {args.requests} requests each, "
+          f"concurrency {args.concurrency})")
+    print(runner.HEADER)
+    try:
+        results = runner.run(base_url, selected, options)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+            'python': platform.python_version(),
+            'options': options,
+        },
+        'results': results,
+    }
+    if args.save:
+        runner.save_report(args.save, report)
+        print(f"Saved results to {args.save}")
+    if args.compare:
+        return check(runner.load_report(args.compare), report, args.threshold)
+    return 0
+
+
+def serialize_command(args):
+    from bench import serialization
+    with app.app_context():
+        results = serialization.run(repeat=args.repeat, limit=args.limit)
+    if args.save:
+        runner.save_report(args.save, {'results': results})
+    return 0 if all(r['identical'] for r in results.values()) else 1
+
+
+def compression_command(args):
+    from bench import compression
+    with app.app_context():
+        results = compression.run(repeat=args.repeat, cached=args.cached)
+    if args.save:
+        runner.save_report(args.save, {'results': results})
+    return 0
+
+
+def servers_command(args):
+    from bench import servers
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    options = run_options(args, volumes)
+    results = servers.run(select_scenarios(args, options), options, args.modes.split(','),
+                          workers=args.workers, threads=args.threads)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'options': options, 'workers': args.workers,
+                                                'threads': args.threads}, 'results': results})
+    return 0
+
+
+def ids_command(args):
+    from bench import ids
+    results = ids.run(processes=args.processes, threads=args.threads, count=args.count,
+                      start_method=args.start_method)
+    if args.save:
+        runner.save_report(args.save, {'results': results})
+    stress = results['stress']
+    return 1 if stress['duplicates'] or stress['unordered'] or stress['out_of_range'] else 0
+
+
+def startup_command(args):
+    from bench import startup
+    results = startup.run(baseline=args.baseline, runs=args.runs, top=args.top, workers=args.workers,
+                          gunicorn=not args.no_gunicorn)
+    if args.save:
+        runner.save_report(args.save, {'results': results})
+    return 0
+
+
+def events_command(args):
+    from bench import events
+    from app import db
+    db.create_all()
+    results = events.run(modes=args.modes.split(','), streams=args.streams, workers=args.workers)
+    if args.save:
+        runner.save_report(args.save, {'results': results})
+    failed = [m for m, r in results.items() if r['delivered'] < r['streams'] or r['resumed'] < 2]
+    return 1 if failed else 0
+
+
+def archive_command(args):
+    from bench import archive
+    volumes = parse_volumes(args)
+    results = archive.run(app, volumes, history=args.history, after_days=args.after_days,
+                          repeat=args.repeat, batch_size=args.batch_size)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'volumes': volumes, 'history': args.history}, 'results': results})
+    return 0 if all(results['identical'].values()) else 1
+
+
+def admission_command(args):
+    from bench import admission
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    options = {'bulk_size': 100, 'image_size': args.image_size, 'volumes': volumes}
+    results = admission.run(options, modes=args.modes.split(','), workers=args.workers, threads=args.threads,
+                            clients=args.clients, seconds=args.seconds, interval=args.interval,
+                            honor_retry_after=not args.ignore_retry_after)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'options': options, 'workers': args.workers,
+                                                'threads': args.threads}, 'results': results})
+    return 0
+
+
+def pagination_command(args):
+    from bench import pagination
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = pagination.run(app, sizes, repeat=args.repeat, full_limit=args.full_limit,
+                             batch_size=args.batch_size)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'sizes': sizes, 'repeat': args.repeat}, 'results': results})
+    return 0
+
+
+def analytics_command(args):
+    from bench import analytics
+    years = [int(span) for span in args.years.split(',')]
+    results = analytics.run(app, years, per_day=args.per_day, repeat=args.repeat, full_limit=args.full_limit,
+                            batch_size=args.batch_size)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'years': years, 'per_day': args.per_day, 'repeat': args.repeat},
+                                       'results': results})
+    return 0
+
+
+def catalogue_command(args):
+    from bench import catalogue
+    results = catalogue.run(app, rows=args.rows, repeat=args.repeat, batch_size=args.batch_size)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'rows': args.rows, 'repeat': args.repeat}, 'results': results})
+    return 0
+
+
+def hashing_command(args):
+    from bench import hashing
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    options = {'bulk_size': 100, 'image_size': 64, 'volumes': volumes}
+    results = hashing.run(options, workers=args.workers, threads=args.threads, clients=args.clients,
+                          seconds=args.seconds, interval=args.interval, hash_workers=args.hash_workers)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'workers': args.workers, 'threads': args.threads,
+                                                'hash_workers': args.hash_workers}, 'results': results})
+    return 0
+
+
+def auth_command(args):
+    from bench import auth
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    options = run_options(args, volumes)
+    results = auth.run(app, options)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'options': options}, 'results': results})
+    return 0 if results['revoked_status'] == 401 else 1
+
+
+def cache_command(args):
+    from bench import cache
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    options = run_options(args, volumes)
+    selected = [s for s in select_scenarios(args, options) if s.name in cache.READS]
+    results = cache.run(selected, options, modes=args.modes.split(','), workers=args.workers, threads=args.threads,
+                        reads=args.reads)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'options': options, 'workers': args.workers,
+                                                'threads': args.threads}, 'results': results})
+    return 1 if results.get('cached', {}).get('stale', {}).get('stale') else 0
+
+
+def bulk_command(args):
+    from bench import bulk
+    results = bulk.run(app, count=args.count, bulk_size=args.bulk_size)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'count': args.count, 'bulk_size': args.bulk_size},
+                                       'results': results})
+    return 0
+
+
+def media_command(args):
+    from bench import media
+    options = {'requests': args.requests, 'warmup': args.warmup, 'concurrency': args.concurrency}
+    results = media.run(options, modes=args.modes.split(','), workers=args.workers, threads=args.threads,
+                        image_size=args.image_size)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'options': options, 'workers': args.workers,
+                                                'threads': args.threads}, 'results': results})
+    return 0
+
+
+def metrics_command(args):
+    from bench import metrics
+    volumes = parse_volumes(args)
+    if args.seed:
+        with app.app_context():
+            seed(volumes, batch_size=args.batch_size)
+    options = run_options(args, volumes)
+    selected = [s for s in select_scenarios(args, options) if args.only or s.name in metrics.SCENARIOS]
+    results = metrics.run(app, selected, options, queries=args.queries, rounds=args.rounds)
+    if args.save:
+        runner.save_report(args.save, {'meta': {'options': options}, 'results': results})
+    return 0
+
+
+def compare_command(args):
+    return check(runner.load_report(args.baseline), runner.load_report(args.current), args.threshold)
+
+
+def check(baseline, current, threshold):
+    regressions = runner.compare(baseline, current, threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {threshold:.0%}")
+        return 1
+    print(f"No regressions beyond {threshold:.0%}")
+    return 0
+
+
+def add_volume_arguments(cmd):
+    cmd.add_argument('--scale', type=float, default=1.0, help='multiplier for the default row counts')
+    cmd.add_argument('--volume', action='append', metavar='MODEL=N',
+                     help=f"rows for one model ({', '.join(DEFAULT_VOLUMES)}); repeatable")
+    cmd.add_argument('--batch-size', type=int, default=1000)
+
+
+parser = argparse.ArgumentParser(prog='python -m bench', description='Paws Connect load benchmarks')
+commands = parser.add_subparsers(dest='command', required=True)
+
+cmd = commands.add_parser('seed', help='drop, recreate and fill every table')
+add_volume_arguments(cmd)
+cmd.set_defaults(func=seed_command)
+
+def add_load_arguments(cmd, concurrency):
+    add_volume_arguments(cmd)
+    cmd.add_argument('--seed', action='store_true', help='seed the database first')
+    cmd.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    cmd.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+    cmd.add_argument('--concurrency', type=int, default=concurrency, help='concurrent clients')
+    cmd.add_argument('--bulk-size', type=int, default=100, help='items per bulk create/delete request')
+    cmd.add_argument('--accept-encoding', default='', help='Accept-Encoding header sent with every request')
+    cmd.add_argument('--image-size', type=int, default=256, help='side of the uploaded PNGs, in pixels')
+    cmd.add_argument('--only', action='append', metavar='PATTERN', help='scenario name glob, e.g. "bookings.*"; repeatable')
+    cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+
+
+cmd = commands.add_parser('run', help='benchmark every endpoint')
+add_load_arguments(cmd, concurrency=8)
+cmd.add_argument('--url', help='benchmark a running server (sharing this database) instead of an in-process one')
+cmd.add_argument('--upload-folder', help='uploads directory for the in-process server (default: a temp dir)')
+cmd.add_argument('--compare', metavar='BASELINE', help='fail on regressions against a saved JSON report')
+cmd.add_argument('--threshold', type=float, default=0.2, help='allowed regression, as a fraction (default 0.2)')
+cmd.set_defaults(func=run_command)
+
+cmd = commands.add_parser('servers', help='sync (gunicorn) vs async (uvicorn) entry points at high concurrency')
+add_load_arguments(cmd, concurrency=64)
+cmd.add_argument('--modes', default='wsgi,asgi', help='comma-separated: wsgi, asgi')
+cmd.add_argument('--workers', type=int, default=2, help='server processes per mode')
+cmd.add_argument('--threads', type=int, default=8, help='request threads per process')
+cmd.set_defaults(func=servers_command)
+
+cmd = commands.add_parser('serialize', help='time list serialization per model (ORM + to_dict vs column tuples)')
+cmd.add_argument('--repeat', type=int, default=5, help='runs per path; the best is reported')
+cmd.add_argument('--limit', type=int, default=5000, help='rows serialized per run')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=serialize_command)
+
+cmd = commands.add_parser('compression', help='bytes on the wire and CPU per request for each encoding')
+cmd.add_argument('--repeat', type=int, default=20, help='requests per endpoint and encoding')
+cmd.add_argument('--cached', action='store_true', help='serve cacheable endpoints from the response cache')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=compression_command)
+
+cmd = commands.add_parser('ids', help='id generator uniqueness stress test and throughput')
+cmd.add_argument('--processes', type=int, default=8)
+cmd.add_argument('--threads', type=int, default=4, help='threads per process')
+cmd.add_argument('--count', type=int, default=50000, help='ids drawn per thread')
+cmd.add_argument('--start-method', choices=['fork', 'spawn'], default='fork',
+                 help='how the processes start (fork also exercises the after-fork re-lease)')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=ids_command)
+
+cmd = commands.add_parser('startup', help='app import time, boot time and per-worker memory vs a baseline ref')
+cmd.add_argument('--baseline', default='HEAD', help='git ref to compare against; empty to skip')
+cmd.add_argument('--runs', type=int, default=5, help='fresh interpreters per tree; the fastest is reported')
+cmd.add_argument('--top', type=int, default=12, help='slowest top-level imports to list')
+cmd.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+cmd.add_argument('--no-gunicorn', action='store_true', help='only measure the import')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=startup_command)
+
+cmd = commands.add_parser('events', help='memory per idle /api/events stream, fan-out latency and resumption')
+cmd.add_argument('--modes', default='asgi,wsgi', help='comma-separated: asgi, wsgi')
+cmd.add_argument('--streams', type=int, default=500, help='idle streams held open per mode')
+cmd.add_argument('--workers', type=int, default=2, help='server processes per mode')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=events_command)
+
+cmd = commands.add_parser('archive', help='list endpoint latency before and after archiving finished rows (reseeds)')
+add_volume_arguments(cmd)
+cmd.add_argument('--history', type=int, default=10, help='finished rows per upcoming row, before the cutoff')
+cmd.add_argument('--after-days', type=int, help='archive rows finished this many days ago (default: ARCHIVE_AFTER_DAYS)')
+cmd.add_argument('--repeat', type=int, default=20, help='timed requests per endpoint')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=archive_command)
+
+cmd = commands.add_parser('admission', help='cheap-route latency while expensive routes are flooded, admission off vs on')
+add_volume_arguments(cmd)
+cmd.add_argument('--seed', action='store_true', help='seed the database first')
+cmd.add_argument('--modes', default='off,concurrency,on', help='comma-separated: off, concurrency (no rate limits), on')
+cmd.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+cmd.add_argument('--threads', type=int, default=8, help='request threads per worker')
+cmd.add_argument('--clients', type=int, default=8, help='flooding clients per expensive scenario')
+cmd.add_argument('--seconds', type=float, default=10, help='cheap-route timing, idle and again under the flood')
+cmd.add_argument('--interval', type=float, default=0.05, help='seconds between cheap requests')
+cmd.add_argument('--ignore-retry-after', action='store_true', help='flood without backing off on 429/503')
+cmd.add_argument('--image-size', type=int, default=256, help='side of the uploaded PNGs, in pixels')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=admission_command)
+
+cmd = commands.add_parser('pagination', help='page latency from 1k to 1M bookings (reseeds)')
+cmd.add_argument('--sizes', default='1000,10000,100000,1000000', help='comma-separated booking counts')
+cmd.add_argument('--repeat', type=int, default=200, help='sequential requests per page and size')
+cmd.add_argument('--full-limit', type=int, default=100000, help='also time the whole list up to this many rows')
+cmd.add_argument('--batch-size', type=int, default=5000)
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=pagination_command)
+
+cmd = commands.add_parser('analytics', help='occupancy/revenue latency as boarding history grows (reseeds)')
+cmd.add_argument('--years', default='1,4,16', help='comma-separated years of boarding history')
+cmd.add_argument('--per-day', type=int, default=20, help='boardings checking in per day of history')
+cmd.add_argument('--repeat', type=int, default=100, help='sequential requests per endpoint and history length')
+cmd.add_argument('--full-limit', type=int, default=50000, help='also time the whole boarding list up to this many rows')
+cmd.add_argument('--batch-size', type=int, default=5000)
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=analytics_command)
+
+cmd = commands.add_parser('catalogue', help='catalogue filter and search latency with and without the indexes (reseeds)')
+cmd.add_argument('--rows', type=int, default=500000, help='petm and sell_pets rows each')
+cmd.add_argument('--repeat', type=int, default=50, help='sequential requests per filter and mode')
+cmd.add_argument('--batch-size', type=int, default=5000)
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=catalogue_command)
+
+cmd = commands.add_parser('hashing', help='catalogue read latency while clients log in back to back')
+add_volume_arguments(cmd)
+cmd.add_argument('--seed', action='store_true', help='seed the database first')
+cmd.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+cmd.add_argument('--threads', type=int, default=8, help='request threads per worker')
+cmd.add_argument('--hash-workers', type=int, default=1, help='hashing processes per worker (HASH_WORKERS)')
+cmd.add_argument('--clients', type=int, default=8, help='clients logging in')
+cmd.add_argument('--seconds', type=float, default=10, help='catalogue read timing, idle and again during the logins')
+cmd.add_argument('--interval', type=float, default=0.05, help='seconds between catalogue reads')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=hashing_command)
+
+cmd = commands.add_parser('auth', help='authorized requests per second and queries per request, token vs no token')
+add_load_arguments(cmd, concurrency=8)
+cmd.set_defaults(func=auth_command)
+
+cmd = commands.add_parser('cache', help='catalogue reads with the response cache off vs on, and stale reads after a write')
+add_load_arguments(cmd, concurrency=8)
+cmd.add_argument('--modes', default='uncached,cached', help='comma-separated: uncached, cached')
+cmd.add_argument('--workers', type=int, default=2, help='gunicorn workers, each with its own memory cache')
+cmd.add_argument('--threads', type=int, default=8, help='request threads per worker')
+cmd.add_argument('--reads', type=int, default=200, help='reads right after the write, checked for staleness')
+cmd.set_defaults(func=cache_command)
+
+cmd = commands.add_parser('bulk', help='rows/s and statements per row, bulk endpoints vs one request per row')
+cmd.add_argument('--count', type=int, default=500, help='rows created and deleted per resource and path')
+cmd.add_argument('--bulk-size', type=int, default=100, help='items per bulk request')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=bulk_command)
+
+cmd = commands.add_parser('media', help='concurrent image fetches from /media: whole file, 304 revalidation, Range')
+cmd.add_argument('--modes', default='wsgi,asgi', help='comma-separated: wsgi, asgi')
+cmd.add_argument('--workers', type=int, default=2, help='server processes per mode')
+cmd.add_argument('--threads', type=int, default=8, help='request threads per process')
+cmd.add_argument('--requests', type=int, default=500, help='measured requests per scenario')
+cmd.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+cmd.add_argument('--concurrency', type=int, default=32, help='concurrent clients')
+cmd.add_argument('--image-size', type=int, default=1024, help='side of the uploaded noise PNG, in pixels')
+cmd.add_argument('--save', metavar='PATH', help='write the results as JSON')
+cmd.set_defaults(func=media_command)
+
+cmd = commands.add_parser('metrics', help='request and query overhead of the metrics hooks, detached vs attached')
+add_load_arguments(cmd, concurrency=8)
+cmd.add_argument('--queries', type=int, default=20000, help='SELECT 1 statements timed per mode')
+cmd.add_argument('--rounds', type=int, default=3, help='alternating off/on runs per scenario; the best is reported')
+cmd.set_defaults(func=metrics_command)
+
+cmd = commands.add_parser('compare', help='compare two saved reports')
+cmd.add_argument('baseline')
+cmd.add_argument('current')
+cmd.add_argument('--threshold', type=float, default=0.2)
+cmd.set_defaults(func=compare_command)
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    # Scenario setups and the seeder read settings from the current app
+    with app.app_context():
+        sys.exit(args.func(args) or 0)
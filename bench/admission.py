@@ -0,0 +1,145 @@
+# Admission control benchmark: floods the expensive route classes (logins,
+# uploads, whole-table lists) while a second client times cheap reads at a
+# steady rate, against gunicorn with admission control off, with only the
+# per-class concurrency limits, and fully on. With admission on, cheap-route
+# latency under the flood should stay close to its idle figure.
+from bench import runner, servers
+from bench.scenarios import scenarios
+from bench.seed import BENCH_EMAIL
+from auth import user_token
+from models import User
+from threading import Event, Lock, Thread
+import itertools
+import json
+import os
+import tempfile
+import time
+
+EXPENSIVE = ('auth.login', 'bookings.all', 'boardings.all', 'consultations.all', 'petm.create', 'sell_pets.create')
+CHEAP = ('bookings.page', 'consultations.availability')
+NO_RATE_LIMITS = {f'RATE_LIMIT_{name}': '' for name in ('AUTH', 'UPLOAD', 'LIST', 'DEFAULT')}
+# Strict per-client limits (there are none by default)
+RATE_LIMITS = {'RATE_LIMIT_AUTH': '20/60', 'RATE_LIMIT_UPLOAD': '30/60', 'RATE_LIMIT_LIST': '60/60',
+               'RATE_LIMIT_DEFAULT': '1200/60'}
+MODES = {
+    'off': {'ADMISSION_ENABLED': 'False'},
+    'concurrency': {'ADMISSION_ENABLED': 'True', **NO_RATE_LIMITS},
+    'on': {'ADMISSION_ENABLED': 'True', **RATE_LIMITS},
+}
+# Requests built per scenario and sent round-robin (uploads are slow to build)
+POOL = 50
+
+
+def build_requests(client, names, options):
+    built = {}
+    for scenario in scenarios(options):
+        if scenario.name in names:
+            state = scenario.setup(client, POOL, options) if scenario.setup else None
+            built[scenario.name] = [scenario.build(n, state) for n in range(POOL)]
+    return built
+
+
+def flood(client, requests, stop, statuses, lock, honor_retry_after):
+    """Sends `requests` back to back until `stop` is set, counting statuses.
+
+    Rejected requests are retried after their Retry-After, as well-behaved
+    clients do, unless `honor_retry_after` is off.
+    """
+    for method, path, body, headers in itertools.cycle(requests):
+        if stop.is_set():
+            return
+        retry_after = None
+        try:
+            status, response_headers, _ = client.send(method, path, body, headers)
+            retry_after = response_headers.get('Retry-After')
+        except Exception as e:
+            status = type(e).__name__
+        with lock:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if retry_after and honor_retry_after:
+            stop.wait(float(retry_after))
+
+
+def probe(client, requests, seconds, interval, headers):
+    """Cheap requests every `interval` seconds for `seconds`; returns (sorted latencies, errors)."""
+    latencies, errors = [], {}
+    deadline = time.monotonic() + seconds
+    for method, path, body, request_headers in itertools.cycle(requests):
+        started = time.monotonic()
+        if started >= deadline:
+            break
+        try:
+            status = client.request(method, path, body, {**request_headers, **headers})[0]
+        except Exception as e:
+            status = type(e).__name__
+        latencies.append(time.monotonic() - started)
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    return sorted(latencies), errors
+
+
+def summary(latencies):
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {'requests': len(latencies), 'p50_ms': ms(runner.percentile(latencies, 0.5)),
+            'p95_ms': ms(runner.percentile(latencies, 0.95)), 'p99_ms': ms(runner.percentile(latencies, 0.99))}
+
+
+def measure(mode, options, workers, threads, clients, seconds, interval, honor_retry_after, port, log_dir):
+    log_path = os.path.join(log_dir, f'bench-admission-{mode}.log')
+    with open(log_path, 'w') as log:
+        process, base_url = servers.start('wsgi', port, workers, threads, log, env=MODES[mode])
+        client = runner.Client(base_url)
+        try:
+            built = build_requests(client, EXPENSIVE + CHEAP, options)
+            cheap = [request for name in CHEAP for request in built[name]]
+            # The cheap client is a signed-in user, so it has buckets of its own
+            user = User.query.filter_by(email=BENCH_EMAIL).first()
+            auth = {'Authorization': f'Bearer {user_token(user)}'}
+
+            idle, idle_errors = probe(client, cheap, seconds, interval, auth)
+            stop, lock = Event(), Lock()
+            statuses = {name: {} for name in EXPENSIVE}
+            flooders = [Thread(target=flood, daemon=True,
+                               args=(client, built[name], stop, statuses[name], lock, honor_retry_after))
+                        for name in EXPENSIVE for _ in range(clients)]
+            for thread in flooders:
+                thread.start()
+            time.sleep(1)  # Let the flood fill the worker's threads first
+            loaded, loaded_errors = probe(client, cheap, seconds, interval, auth)
+            stop.set()
+            for thread in flooders:
+                thread.join(timeout=60)
+            admission = json.loads(client.request('GET', '/api/admission/stats')[1])
+        finally:
+            servers.stop(process)
+    return {
+        'idle': {**summary(idle), 'errors': idle_errors},
+        'loaded': {**summary(loaded), 'errors': loaded_errors},
+        'expensive': statuses,
+        'admission': admission,
+    }
+
+
+def run(options, modes=tuple(MODES), workers=1, threads=8, clients=8, seconds=10, interval=0.05,
+        honor_retry_after=True, port=8970):
+    """Returns {mode: result}."""
+    print(f"{len(EXPENSIVE)} expensive scenarios x {clients} clients "
+          f"({'honoring' if honor_retry_after else 'ignoring'} Retry-After) against {workers} worker(s) x "
+          f"{threads} threads; cheap reads every {interval * 1000:.0f} ms for {seconds} s idle, then under the flood")
+    print(f"{'mode':12} {'idle p50':>9} {'idle p95':>9} {'load p50':>9} {'load p95':>9} {'load p99':>9} "
+          f"{'cheap err':>10} {'flood 2xx':>10} {'429':>7} {'503':>7}")
+    results = {}
+    for i, mode in enumerate(modes):
+        result = results[mode] = measure(mode, options, workers, threads, clients, seconds, interval,
+                                         honor_retry_after, port + i, tempfile.gettempdir())
+        totals = {}
+        for statuses in result['expensive'].values():
+            for status, count in statuses.items():
+                key = '2xx' if status.startswith('2') else status
+                totals[key] = totals.get(key, 0) + count
+        idle, loaded = result['idle'], result['loaded']
+        print(f"{mode:12} {idle['p50_ms']:>9.2f} {idle['p95_ms']:>9.2f} {loaded['p50_ms']:>9.2f} "
+              f"{loaded['p95_ms']:>9.2f} {loaded['p99_ms']:>9.2f} {sum(loaded['errors'].values()):>10} "
+              f"{totals.get('2xx', 0):>10} {totals.get('429', 0):>7} {totals.get('503', 0):>7}")
+    return results
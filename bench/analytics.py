@@ -0,0 +1,86 @@
+# Occupancy and revenue latency against history length: reseeds the
+# boardings, then grows their history a few years at a time (rebuilding
+# the daily rollup) and times a 30-day occupancy range, by package and in
+# total, 90 days of revenue by day, and a single create, which updates the
+# rollup in its transaction. The range queries read boarding_daily only, so
+# they should cost the same with 16 years of boardings as with one; the
+# whole boarding list, which is what a client had to fold before, grows.
+from datetime import date, datetime, timedelta
+from bench import runner
+from bench.pagination import time_path
+from bench.scenarios import json_body, boarding_item
+from bench.seed import seed, insert_batches, NAMES, PACKAGES
+from analytics import rebuild_boarding_rollup
+from models import Boarding
+from app import db
+import random
+import time
+
+TODAY = date.today()
+PATHS = {
+    'occupancy': f'/api/boardings/occupancy?from={TODAY}&to={TODAY + timedelta(days=29)}',
+    'by_package': f'/api/boardings/occupancy?from={TODAY}&to={TODAY + timedelta(days=29)}&group=package_type',
+    'revenue': f'/api/boardings/revenue?from={TODAY - timedelta(days=89)}&to={TODAY}&group=day',
+}
+
+
+def history_rows(first, last, per_day, rng):
+    """`per_day` boardings checking in on every day from `first` to `last`."""
+    day = first
+    while day <= last:
+        for _ in range(per_day):
+            nights = rng.randint(1, 14)
+            yield {'pet_name': rng.choice(NAMES), 'package_type': rng.choice(PACKAGES),
+                   'check_in': day, 'check_out': day + timedelta(days=nights),
+                   'special_needs': '', 'total_price': nights * rng.choice([30, 45, 60]),
+                   'created_at': datetime.utcnow()}
+        day += timedelta(days=1)
+
+
+def time_creates(client, repeat):
+    latencies = []
+    for n in range(repeat):
+        started = time.perf_counter()
+        status, body = client.request('POST', '/api/boardings', *json_body(boarding_item(n)))
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 201:
+            raise RuntimeError(f'POST /api/boardings answered {status}: {body[:200]!r}')
+    latencies.sort()
+    return {'p50_ms': round(runner.percentile(latencies, 0.5), 3), 'p99_ms': round(runner.percentile(latencies, 0.99), 3)}
+
+
+def run(app, years, per_day=20, repeat=100, full_limit=50000, batch_size=5000):
+    """Returns {years: {'rows', label: {'p50_ms', 'p99_ms'}}}; reseeds the database."""
+    seed({}, batch_size=batch_size)
+    rng = random.Random(9)
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    slow_ms, app.config['SLOW_REQUEST_MS'] = app.config['SLOW_REQUEST_MS'], float('inf')
+    labels = list(PATHS) + ['create', 'full']
+    print(f"{per_day} boardings per day of history; {repeat} sequential requests per cell; "
+          f"whole list up to {full_limit} rows")
+    print(f"{'years':>5} {'rows':>9} " + ' '.join(f"{label + ' p50':>14} {label + ' p99':>14}" for label in labels))
+    results, covered = {}, 0
+    try:
+        for span in sorted(years):
+            # Older years go in behind the ones already there
+            first, last = TODAY - timedelta(days=365 * span), TODAY - timedelta(days=365 * covered + 1)
+            insert_batches(Boarding, history_rows(first, last, per_day, rng), batch_size)
+            db.session.commit()
+            rebuild_boarding_rollup(batch_size=batch_size)
+            db.session.remove()
+            covered = span
+            rows = Boarding.query.count()
+            result = results[span] = {'rows': rows}
+            for label, path in PATHS.items():
+                result[label] = time_path(client, path, repeat)
+            result['create'] = time_creates(client, repeat)
+            if rows <= full_limit:
+                result['full'] = time_path(client, '/api/boardings', 5)
+            cells = [result.get(label) for label in labels]
+            print(f"{span:>5} {rows:>9} " + ' '.join(f"{c['p50_ms']:>14.2f} {c['p99_ms']:>14.2f}" if c
+                                                      else f"{'-':>14} {'-':>14}" for c in cells))
+    finally:
+        app.config['SLOW_REQUEST_MS'] = slow_ms
+        server.shutdown()
+    return results
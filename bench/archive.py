@@ -0,0 +1,114 @@
+# Hot-path latency before and after archiving: seeds years of finished
+# bookings, boardings and consultations behind the usual upcoming rows,
+# times the list endpoints, archives everything past the cutoff and times
+# them again, next to the same lists read with ?include_archived=1.
+from datetime import date, timedelta
+from bench import runner
+from bench.seed import seed, insert_batches, booking_rows, boarding_rows, consultation_rows
+from archive import RETENTION, archive
+from analytics import rebuild_boarding_rollup
+from app import db
+import random
+import time
+
+ENDPOINTS = [
+    '/api/bookings',
+    '/api/bookings?limit=50',
+    '/api/boardings',
+    '/api/boardings?limit=50',
+    '/api/consultations',
+    '/api/consultations?limit=50',
+]
+# Seeder generators and the date columns they fill, last one latest
+HISTORY = {
+    'bookings': (booking_rows, ['date']),
+    'boardings': (boarding_rows, ['check_in', 'check_out']),
+    'consultations': (consultation_rows, ['consult_date']),
+}
+
+
+def history_rows(rows, fields, end):
+    """Seeder rows shifted back in time so the latest one finishes on `end`.
+
+    One shift for every row keeps the seeder's unique slots unique.
+    """
+    rows = list(rows)
+    shift = end - max(row[fields[-1]] for row in rows)
+    for row in rows:
+        for field in fields:
+            row[field] += shift
+    return rows
+
+
+def seed_history(volumes, history, cutoff, batch_size):
+    seed(volumes, batch_size=batch_size)
+    rng = random.Random(7)
+    for name, (rows, fields) in HISTORY.items():
+        count = volumes.get(name, 0) * history
+        if count:
+            insert_batches(RETENTION[name].model, history_rows(rows(count, rng), fields, cutoff - timedelta(days=1)),
+                           batch_size)
+            print(f"Seeded {count} finished {name}")
+    db.session.commit()
+    rebuild_boarding_rollup(batch_size=batch_size)
+
+
+def time_endpoints(client, paths, repeat):
+    """{path: (p50 ms, p95 ms, response bytes)}, sequential requests."""
+    results = {}
+    for path in paths:
+        client.request('GET', path)  # Warm-up
+        latencies, size = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            status, body = client.request('GET', path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                raise RuntimeError(f'GET {path} answered {status}')
+            size = len(body)
+        latencies.sort()
+        results[path] = (runner.percentile(latencies, 0.5), runner.percentile(latencies, 0.95), size)
+    return results
+
+
+def with_archived(path):
+    return path + ('&' if '?' in path else '?') + 'include_archived=1'
+
+
+def run(app, volumes, history=10, after_days=None, repeat=20, batch_size=1000):
+    after_days = app.config['ARCHIVE_AFTER_DAYS'] if after_days is None else after_days
+    cutoff = date.today() - timedelta(days=after_days)
+    seed_history(volumes, history, cutoff, batch_size)
+
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    try:
+        full = [path for path in ENDPOINTS if '?' not in path]
+        bodies = {path: client.request('GET', path)[1] for path in full}
+        before = time_endpoints(client, ENDPOINTS, repeat)
+
+        started = time.perf_counter()
+        moved = {name: archive(name, cutoff, batch_size=batch_size) for name in RETENTION}
+        seconds = time.perf_counter() - started
+        db.session.remove()
+
+        after = time_endpoints(client, ENDPOINTS, repeat)
+        union = time_endpoints(client, [with_archived(path) for path in ENDPOINTS], repeat)
+        # Hot plus archived rows must read back exactly as the lists did before
+        identical = {path: client.request('GET', with_archived(path))[1] == body for path, body in bodies.items()}
+    finally:
+        server.shutdown()
+
+    print(f"Archived {sum(moved.values())} rows finished before {cutoff.isoformat()} in {seconds:.1f} s "
+          f"({', '.join(f'{n} {c}' for n, c in moved.items())})")
+    print(f"{'endpoint':32} {'before p50':>11} {'after p50':>10} {'archived p50':>13} {'before KB':>10} {'after KB':>9}")
+    results = {}
+    for path in ENDPOINTS:
+        b, a, u = before[path], after[path], union[with_archived(path)]
+        results[path] = {'before_p50_ms': b[0], 'before_p95_ms': b[1], 'after_p50_ms': a[0], 'after_p95_ms': a[1],
+                         'include_archived_p50_ms': u[0], 'before_bytes': b[2], 'after_bytes': a[2]}
+        print(f"{path:32} {b[0]:>11.2f} {a[0]:>10.2f} {u[0]:>13.2f} {b[2] / 1024:>10.1f} {a[2] / 1024:>9.1f}")
+    for path, same in identical.items():
+        print(f"{with_archived(path)} matches {path} before archiving: {same}")
+    return {'cutoff': cutoff.isoformat(), 'moved': moved, 'seconds': seconds, 'endpoints': results,
+            'identical': identical}
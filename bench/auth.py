@@ -0,0 +1,48 @@
+# Authorized requests per second: the admin user list behind an admin
+# token (role from the token's claims, revocation from the revocation
+# store) against the same list with no token required, with the database
+# queries each request makes. Authorization should add no query.
+from bench import runner
+from bench.scenarios import Scenario, admin_headers
+from app import db
+from sqlalchemy import event
+from threading import Lock
+
+PATH = '/api/users?limit=10'
+
+
+def run(app, options):
+    """Returns {mode: result}, plus the status of a logged-out token."""
+    queries, lock = [0], Lock()
+
+    def count(*args):
+        with lock:
+            queries[0] += 1
+
+    headers = admin_headers()
+    event.listen(db.engine, 'before_cursor_execute', count)
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    previous = app.config['REQUIRE_ADMIN_TOKEN']
+    results = {}
+    try:
+        print(f"GET {PATH}, {options['requests']} requests per mode, concurrency {options['concurrency']}")
+        print(runner.HEADER + f" {'queries/req':>12}")
+        for mode, required in (('anonymous', False), ('token', True)):
+            app.config['REQUIRE_ADMIN_TOKEN'] = required
+            scenario = Scenario(f'users.{mode}', 'GET', PATH, headers=(lambda n, s: headers) if required else None)
+            queries[0] = 0
+            result = results[mode] = runner.run_scenario(client, scenario, options)
+            result['queries_per_request'] = round(queries[0] / (options['requests'] + options['warmup']), 2)
+            print(runner.format_row(scenario.name, result) + f" {result['queries_per_request']:>12.2f}")
+
+        # A logged-out token must be refused from then on
+        token = admin_headers()
+        client.request('POST', '/logout', headers=token)
+        results['revoked_status'] = client.request('GET', PATH, headers=token)[0]
+        print(f"logged-out token: {results['revoked_status']}")
+    finally:
+        app.config['REQUIRE_ADMIN_TOKEN'] = previous
+        server.shutdown()
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return results
@@ -0,0 +1,75 @@
+# Bulk vs one at a time: a single client (as the front-desk sync is) creates
+# and then deletes the same number of bookings, boardings and consultations
+# through the per-row endpoints and through the bulk ones, and reports rows
+# per second and SQL statements per row for each path.
+from bench import runner
+from bench.scenarios import json_body, booking_item, boarding_item, consultation_item
+from app import db
+from sqlalchemy import event
+import json
+import time
+
+RESOURCES = {'bookings': booking_item, 'boardings': boarding_item, 'consultations': consultation_item}
+
+
+def expect(status, body, wanted, what):
+    if status != wanted:
+        raise RuntimeError(f'{what} returned {status}: {body[:200]!r}')
+    return json.loads(body)
+
+
+def one_at_a_time(client, name, item, count):
+    ids = []
+    for n in range(count):
+        ids.append(expect(*client.request('POST', f'/api/{name}', *json_body(item(n))), 201, f'POST /api/{name}')['id'])
+    yield 'create'
+    for row_id in ids:
+        expect(*client.request('DELETE', f'/api/{name}/{row_id}'), 200, f'DELETE /api/{name}/{row_id}')
+    yield 'delete'
+
+
+def in_bulk(client, name, item, count, bulk_size):
+    ids = []
+    for start in range(0, count, bulk_size):
+        items = [item(n) for n in range(start, min(count, start + bulk_size))]
+        body = expect(*client.request('POST', f'/api/{name}/bulk', *json_body(items)), 201, f'POST /api/{name}/bulk')
+        ids.extend(result['id'] for result in body['results'])
+    yield 'create'
+    for start in range(0, count, bulk_size):
+        expect(*client.request('POST', f'/api/{name}/bulk-delete', *json_body({'ids': ids[start:start + bulk_size]})),
+               200, f'POST /api/{name}/bulk-delete')
+    yield 'delete'
+
+
+def run(app, count=500, bulk_size=100):
+    """Returns {resource: {'single'|'bulk': {'create'|'delete': {'rows_per_s', 'statements_per_row'}}}}."""
+    statements = [0]
+
+    def counted(*args):
+        statements[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', counted)
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    results = {}
+    print(f"{count} rows per resource, one client; bulk requests of {bulk_size}")
+    print(f"{'resource':16} {'path':8} {'create rows/s':>14} {'stmts/row':>10} {'delete rows/s':>14} {'stmts/row':>10}")
+    try:
+        for name, item in RESOURCES.items():
+            results[name] = {}
+            for path, steps in (('single', one_at_a_time(client, name, item, count)),
+                                ('bulk', in_bulk(client, name, item, count, bulk_size))):
+                result = results[name][path] = {}
+                statements[0], started = 0, time.perf_counter()
+                for step in steps:
+                    elapsed = time.perf_counter() - started
+                    result[step] = {'rows_per_s': round(count / elapsed, 1),
+                                    'statements_per_row': round(statements[0] / count, 2)}
+                    statements[0], started = 0, time.perf_counter()
+                print(f"{name:16} {path:8} {result['create']['rows_per_s']:>14.1f} "
+                      f"{result['create']['statements_per_row']:>10.2f} {result['delete']['rows_per_s']:>14.1f} "
+                      f"{result['delete']['statements_per_row']:>10.2f}")
+    finally:
+        server.shutdown()
+        event.remove(db.engine, 'before_cursor_execute', counted)
+    return results
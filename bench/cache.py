@@ -0,0 +1,64 @@
+# Response cache benchmark: the catalogue reads against gunicorn with the
+# cache off and on, then how many reads still return the old list right
+# after a write when every worker keeps its own memory cache.
+from bench import runner, servers
+from bench.scenarios import multipart_body, petm_fields
+import json
+import os
+import tempfile
+import time
+import uuid
+
+READS = ('petm.all', 'petm.page', 'petm.filter', 'sell_pets.all', 'sell_pets.page', 'sell_pets.filter',
+         'sell_pets.search')
+MODES = {'uncached': {'CACHE_ENABLED': 'False'}, 'cached': {'CACHE_ENABLED': 'True'}}
+
+
+def stale_reads(client, workers, reads):
+    """Writes one pet after every worker has cached its (empty) species list.
+
+    Returns how many of `reads` fresh-connection reads right after the write
+    still miss the new pet, and how long after the write the last such read was.
+    """
+    species = f'bench-{uuid.uuid4().hex[:12]}'
+    path = f'/api/petm?species={species}'
+    # Fresh connections land on any worker; enough of them reach all of them
+    for _ in range(workers * 20):
+        client.request('GET', path)
+    status, body = client.request('POST', '/api/petm', *multipart_body({**petm_fields(0), 'species': species}, {}))
+    if status != 201:
+        raise RuntimeError(f'create returned {status}: {body[:200]!r}')
+    written = time.monotonic()
+    stale, last_stale = 0, 0.0
+    for _ in range(reads):
+        if not json.loads(client.request('GET', path)[1]):
+            stale += 1
+            last_stale = time.monotonic() - written
+    return stale, last_stale
+
+
+def run(selected, options, modes=tuple(MODES), workers=2, threads=8, reads=200, port=8980):
+    """Returns {mode: {'scenarios': {scenario: result}, 'stale': ...}}."""
+    results = {}
+    for i, mode in enumerate(modes):
+        log_path = os.path.join(tempfile.gettempdir(), f'bench-cache-{mode}.log')
+        with open(log_path, 'w') as log:
+            process, base_url = servers.start('wsgi', port + i, workers, threads, log, env=MODES[mode])
+            try:
+                print(f"{mode}: {base_url}, {workers} workers x {threads} threads")
+                print(runner.HEADER)
+                result = results[mode] = {'scenarios': runner.run(base_url, selected, options)}
+                stale, seconds = stale_reads(runner.Client(base_url), workers, reads)
+                result['stale'] = {'reads': reads, 'stale': stale, 'last_stale_ms': round(seconds * 1000, 2)}
+                print(f"after a write: {stale} of {reads} reads stale, the last {seconds * 1000:.1f} ms after it")
+            finally:
+                servers.stop(process)
+    if 'uncached' in results and 'cached' in results:
+        print()
+        print(f"{'scenario':32} {'uncached rps':>13} {'cached rps':>11} {'speedup':>8} {'uncached p99':>13} {'cached p99':>11}")
+        for name, cached in results['cached']['scenarios'].items():
+            uncached = results['uncached']['scenarios'][name]
+            speedup = cached['rps'] / uncached['rps'] if uncached['rps'] else 0.0
+            print(f"{name:32} {uncached['rps']:>13.1f} {cached['rps']:>11.1f} {speedup:>7.1f}x "
+                  f"{uncached['p99_ms']:>13.2f} {cached['p99_ms']:>11.2f}")
+    return results
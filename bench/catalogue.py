@@ -0,0 +1,67 @@
+# Catalogue filters and search on a large synthetic catalogue: reseeds
+# petm and sell_pets (500k rows each by default), times the first page of
+# each filter with the catalogue indexes in place, then drops them and
+# times the same pages again. The seeder runs ANALYZE, so a filter most
+# rows match walks the primary key and stops after a page either way; a
+# rare one needs its index or reads the whole table. Text search uses the
+# tsvector GIN index on PostgreSQL and falls back to LIKE (a scan) on SQLite.
+from bench import runner
+from bench.pagination import time_path
+from bench.seed import seed
+from models import Petm, SellPet
+from app import db
+
+PATHS = {
+    'sell_pets.page': '/api/sell_pets?limit=50',
+    'sell_pets.species': '/api/sell_pets?species=rabbit&limit=50',
+    'sell_pets.breed_price': '/api/sell_pets?species=dog&breed=husky&min_price=200&max_price=400&limit=50',
+    'sell_pets.price': '/api/sell_pets?min_price=1500&max_price=1510&limit=50',
+    'sell_pets.rare': '/api/sell_pets?species=rabbit&breed=rex&min_price=1990&limit=50',
+    'sell_pets.search': '/api/sell_pets?q=maine+coon&limit=50',
+    'petm.breed_age': '/api/petm?species=cat&breed=bengal&min_age=3&max_age=5&limit=50',
+    'petm.vaccination': '/api/petm?vaccination=none&aggression=high&limit=50',
+    'petm.search': '/api/petm?q=lop&limit=50',
+}
+
+
+def catalogue_indexes():
+    # The ones this database created (the GIN index exists on PostgreSQL only)
+    names = {index['name'] for model in (Petm, SellPet)
+             for index in db.inspect(db.engine).get_indexes(model.__tablename__)}
+    return [index for model in (Petm, SellPet) for index in model.__table__.indexes if index.name in names]
+
+
+def run(app, rows=500000, repeat=50, batch_size=5000):
+    """Returns {'indexed': {label: {'p50_ms', 'p99_ms'}}, 'unindexed': {...}}; reseeds the database."""
+    seed({'petm': rows, 'sell_pets': rows}, batch_size=batch_size)
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    # Time the queries, not the response cache
+    cache_enabled, app.config['CACHE_ENABLED'] = app.config['CACHE_ENABLED'], False
+    slow_ms, app.config['SLOW_REQUEST_MS'] = app.config['SLOW_REQUEST_MS'], float('inf')
+    results = {}
+    indexes = catalogue_indexes()
+    try:
+        results['indexed'] = {label: time_path(client, path, repeat) for label, path in PATHS.items()}
+        for index in indexes:
+            index.drop(db.engine)
+        try:
+            results['unindexed'] = {label: time_path(client, path, repeat) for label, path in PATHS.items()}
+        finally:
+            for index in indexes:
+                index.create(db.engine)
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+    finally:
+        app.config['CACHE_ENABLED'] = cache_enabled
+        app.config['SLOW_REQUEST_MS'] = slow_ms
+        server.shutdown()
+
+    print(f"{rows} rows per catalogue, {repeat} sequential requests per filter; "
+          f"without: {', '.join(index.name for index in indexes)} dropped")
+    print(f"{'filter':24} {'indexed p50':>12} {'indexed p99':>12} {'without p50':>12} {'without p99':>12}")
+    for label in PATHS:
+        indexed, unindexed = results['indexed'][label], results['unindexed'][label]
+        print(f"{label:24} {indexed['p50_ms']:>12.2f} {indexed['p99_ms']:>12.2f} "
+              f"{unindexed['p50_ms']:>12.2f} {unindexed['p99_ms']:>12.2f}")
+    return results
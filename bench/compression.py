@@ -0,0 +1,47 @@
+# Bytes on the wire and server CPU per request for each response encoding,
+# on the list endpoints. Runs requests in-process through the test client,
+# so CPU time is the app's own (routing, query, serialization, compression).
+from flask import current_app
+import compress
+import time
+
+ENDPOINTS = ['/api/consultations', '/api/sell_pets', '/api/petm', '/api/bookings', '/api/boardings',
+             '/api/consultations?limit=50', '/api/bookings?stream=1']
+
+
+def measure(client, path, encoding, repeat):
+    headers = {'Accept-Encoding': encoding} if encoding != 'identity' else {}
+    size = 0
+    started = time.process_time()
+    for _ in range(repeat):
+        response = client.get(path, headers=headers)
+        size = len(response.get_data())
+        response.close()
+    return size, (time.process_time() - started) / repeat
+
+
+def run(repeat=20, cached=False):
+    """Returns {path: {encoding: result}}; must run inside an app context."""
+    app = current_app._get_current_object()
+    previous = app.config['CACHE_ENABLED']
+    app.config['CACHE_ENABLED'] = cached
+    client = app.test_client()
+    encodings = ['identity'] + compress.supported_encodings()
+    results = {}
+    try:
+        print(f"Response cache {'on' if cached else 'off'}; {repeat} requests per cell")
+        print(f"{'endpoint':32} {'encoding':9} {'bytes':>10} {'ratio':>7} {'cpu ms':>8}")
+        for path in ENDPOINTS:
+            results[path] = {}
+            for encoding in encodings:
+                size, cpu = measure(client, path, encoding, repeat)
+                raw = results[path].get('identity', {}).get('bytes', size)
+                results[path][encoding] = result = {
+                    'bytes': size,
+                    'ratio': round(size / raw, 3) if raw else 1.0,
+                    'cpu_ms': round(cpu * 1000, 3),
+                }
+                print(f"{path:32} {encoding:9} {size:>10} {result['ratio']:>7.3f} {result['cpu_ms']:>8.2f}")
+    finally:
+        app.config['CACHE_ENABLED'] = previous
+    return results
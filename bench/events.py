@@ -0,0 +1,137 @@
+# Change feed benchmark: holds many idle /api/events streams open against a
+# server started as in `bench servers`, and reports the server memory each
+# stream costs and how long one change takes to reach every subscriber.
+# Also checks Last-Event-ID resumption, which may land on another worker.
+from bench import runner, servers
+from bench.startup import children, memory_kb
+from urllib.parse import urlsplit
+import json
+import os
+import selectors
+import socket
+import tempfile
+import time
+import uuid
+
+
+def serving_pids(process):
+    # uvicorn with one worker serves from the process itself
+    return children(process.pid) or [process.pid]
+
+
+def server_memory_kb(process):
+    memory = [memory_kb(pid) for pid in serving_pids(process)]
+    return {'rss': sum(m['rss'] for m in memory), 'pss': sum(m['pss'] for m in memory)}
+
+
+def open_stream(base_url, topics='bookings', last_event_id=None):
+    url = urlsplit(base_url)
+    sock = socket.create_connection((url.hostname, url.port), timeout=10)
+    headers = f'Last-Event-ID: {last_event_id}\r\n' if last_event_id else ''
+    sock.sendall(f'GET /api/events?topics={topics} HTTP/1.1\r\nHost: {url.netloc}\r\n'
+                 f'Accept: text/event-stream\r\n{headers}\r\n'.encode('ascii'))
+    return sock
+
+
+def read_until(socks, marker, timeout):
+    """Reads every socket until its data contains `marker`; returns {sock: seconds} and the data."""
+    selector = selectors.DefaultSelector()
+    received = {sock: b'' for sock in socks}
+    for sock in socks:
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+    started = time.perf_counter()
+    arrived = {}
+    deadline = time.monotonic() + timeout
+    while len(arrived) < len(socks) and time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=0.5):
+            sock = key.fileobj
+            chunk = sock.recv(65536)
+            received[sock] += chunk
+            if marker in received[sock] or not chunk:
+                arrived[sock] = time.perf_counter() - started
+                selector.unregister(sock)
+    selector.close()
+    for sock in socks:
+        sock.setblocking(True)
+    return arrived, received
+
+
+def create_booking(client, marker):
+    body = json.dumps({'petName': marker, 'service': marker[:50], 'date': '2031-01-01', 'time': '10:00'})
+    status, _ = client.request('POST', '/api/bookings', body.encode('utf-8'), {'Content-Type': 'application/json'})
+    if status != 201:
+        raise RuntimeError(f'POST /api/bookings answered {status}')
+
+
+def event_ids(data):
+    return [line[4:] for line in data.decode('utf-8', 'replace').splitlines() if line.startswith('id: ')]
+
+
+def check_resume(base_url, client):
+    """Misses two events while disconnected; returns how many came back on reconnect."""
+    first, missed = uuid.uuid4().hex, [uuid.uuid4().hex, uuid.uuid4().hex]
+    sock = open_stream(base_url)
+    read_until([sock], b'retry:', 10)
+    create_booking(client, first)
+    _, received = read_until([sock], first.encode('ascii'), 10)
+    sock.close()
+    for marker in missed:
+        create_booking(client, marker)
+    sock = open_stream(base_url, last_event_id=event_ids(received[sock])[-1])
+    _, received = read_until([sock], missed[-1].encode('ascii'), 10)
+    sock.close()
+    return sum(marker.encode('ascii') in received[sock] for marker in missed)
+
+
+def measure(mode, streams, workers, port, log_dir):
+    # Enough threads under gunicorn for every stream to hold one
+    threads = streams + 8 if mode == 'wsgi' else 8
+    log_path = os.path.join(log_dir, f'bench-events-{mode}.log')
+    with open(log_path, 'w') as log:
+        process, base_url = servers.start(mode, port, workers, threads, log, env={
+            'EVENTS_MAX_STREAMS': str(streams + 10), 'EVENTS_MAX_THREAD_STREAMS': str(streams + 10),
+            'EVENTS_SOCKET_DIR': tempfile.mkdtemp(prefix='bench-events-')})
+        client = runner.Client(base_url)
+        socks = []
+        try:
+            resumed = check_resume(base_url, client)
+            before = server_memory_kb(process)
+            for _ in range(streams):
+                socks.append(open_stream(base_url))
+            opened, _ = read_until(socks, b'retry:', 60)
+            time.sleep(1)
+            after = server_memory_kb(process)
+
+            marker = uuid.uuid4().hex
+            create_booking(client, marker)
+            arrived, _ = read_until(socks, marker.encode('ascii'), 30)
+            latencies = sorted(arrived.values())
+        finally:
+            for sock in socks:
+                sock.close()
+            servers.stop(process)
+    return {
+        'streams': len(opened),
+        'rss_kb_per_stream': (after['rss'] - before['rss']) / max(len(opened), 1),
+        'pss_kb_per_stream': (after['pss'] - before['pss']) / max(len(opened), 1),
+        'server_rss_kb': after['rss'],
+        'delivered': len(arrived),
+        'fanout_p50_ms': runner.percentile(latencies, 0.5) * 1000 if latencies else None,
+        'fanout_max_ms': latencies[-1] * 1000 if latencies else None,
+        'resumed': resumed,
+    }
+
+
+def run(modes=('asgi', 'wsgi'), streams=500, workers=2, port=8960):
+    """Returns {mode: result}; 'delivered' must equal 'streams' and 'resumed' 2."""
+    results = {}
+    print(f"{streams} idle /api/events streams per mode, {workers} workers")
+    print(f"{'mode':6} {'streams':>8} {'KiB/stream':>11} {'PSS/stream':>11} {'delivered':>10} "
+          f"{'p50 ms':>8} {'max ms':>8} {'resumed':>8}")
+    for i, mode in enumerate(modes):
+        result = results[mode] = measure(mode, streams, workers, port + i, tempfile.gettempdir())
+        print(f"{mode:6} {result['streams']:>8} {result['rss_kb_per_stream']:>11.1f} "
+              f"{result['pss_kb_per_stream']:>11.1f} {result['delivered']:>10} "
+              f"{result['fanout_p50_ms'] or 0:>8.1f} {result['fanout_max_ms'] or 0:>8.1f} {result['resumed']:>6}/2")
+    return results
@@ -0,0 +1,58 @@
+# Login burst benchmark: clients log in back to back while another client
+# times catalogue reads at a steady rate, against gunicorn. Password hashing
+# runs in the hashing pool, so reads never wait for a thread held by a login
+# and logins beyond HASH_QUEUE_DEPTH get a 429. With a core to spare for the
+# pool, read latency during the burst stays close to its idle figure.
+from bench import runner, servers
+from bench.admission import build_requests, flood, probe, summary
+from threading import Event, Lock, Thread
+import json
+import os
+import tempfile
+import time
+
+LOGINS = 'auth.login'
+READS = ('petm.page', 'sell_pets.page', 'sell_pets.filter')
+
+
+def run(options, workers=1, threads=8, clients=8, seconds=10, interval=0.05, hash_workers=1, port=8990):
+    """Returns {'idle': ..., 'loaded': ..., 'logins': statuses, 'hashing': /api/hashing/stats}."""
+    log_path = os.path.join(tempfile.gettempdir(), 'bench-hashing.log')
+    print(f"{clients} clients logging in against {workers} worker(s) x {threads} threads, "
+          f"{hash_workers} hashing process(es) each; catalogue reads every {interval * 1000:.0f} ms for {seconds} s "
+          f"idle, then during the logins")
+    with open(log_path, 'w') as log:
+        process, base_url = servers.start('wsgi', port, workers, threads, log,
+                                          env={'HASH_WORKERS': str(hash_workers)})
+        client = runner.Client(base_url)
+        try:
+            built = build_requests(client, (LOGINS,) + READS, options)
+            reads = [request for name in READS for request in built[name]]
+            idle, idle_errors = probe(client, reads, seconds, interval, {})
+            stop, lock, statuses = Event(), Lock(), {}
+            # Logins retry straight away on a 429, as an impatient client would
+            loggers = [Thread(target=flood, args=(client, built[LOGINS], stop, statuses, lock, False), daemon=True)
+                       for _ in range(clients)]
+            for thread in loggers:
+                thread.start()
+            time.sleep(1)  # Let the logins fill the hashing queue first
+            loaded, loaded_errors = probe(client, reads, seconds, interval, {})
+            stop.set()
+            for thread in loggers:
+                thread.join(timeout=60)
+            hashing = json.loads(client.request('GET', '/api/hashing/stats')[1])
+        finally:
+            servers.stop(process)
+
+    results = {'idle': {**summary(idle), 'errors': idle_errors},
+               'loaded': {**summary(loaded), 'errors': loaded_errors},
+               'logins': statuses, 'hashing': hashing}
+    print(f"{'reads':8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name in ('idle', 'loaded'):
+        result = results[name]
+        print(f"{name:8} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{sum(result['errors'].values()):>7}")
+    verify = hashing['calls'].get('verify', {})
+    print(f"logins: {statuses}; verify calls {verify.get('calls', 0)}, avg {verify.get('avg_ms', 0):.1f} ms, "
+          f"rejected {verify.get('rejected', 0)}")
+    return results
@@ -0,0 +1,120 @@
+# Id generator checks: a multi-process uniqueness stress test (processes x
+# threads drawing single ids and bulk blocks at once) and a throughput
+# benchmark, next to the millisecond timestamps bookings used to get.
+from concurrent.futures import ProcessPoolExecutor
+from threading import Thread
+from ids import IdGenerator, id_time, SEQUENCE_BITS, MAX_BORROW_MS
+import multiprocessing
+import random
+import time
+
+# Standalone, without an app: the default lock directory and worker range
+id_generator = IdGenerator()
+
+
+def draw(count, seed):
+    # Mostly single ids, with a bulk block every few calls
+    rng = random.Random(seed)
+    ids = []
+    while len(ids) < count:
+        if rng.random() < 0.1:
+            ids.extend(id_generator.reserve(rng.randint(1, 1000)))
+        else:
+            ids.append(id_generator.next_id())
+    return ids
+
+
+def stress_process(index, threads, count):
+    """Runs in a pool process; returns (worker id, one id list per thread)."""
+    results = [None] * threads
+
+    def work(t):
+        results[t] = draw(count, seed=index * 1000 + t)
+
+    workers = [Thread(target=work, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return id_generator.worker_id, results
+
+
+def stress(processes=8, threads=4, count=50000, start_method='fork'):
+    """Returns a dict of counts; 'duplicates', 'unordered' and 'out_of_range' must be 0."""
+    context = multiprocessing.get_context(start_method)
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = [pool.submit(stress_process, i, threads, count) for i in range(processes)]
+        outcomes = [f.result() for f in futures]
+    finished = time.time()
+
+    seen, total, unordered, out_of_range = set(), 0, 0, 0
+    for worker_id, per_thread in outcomes:
+        for ids in per_thread:
+            total += len(ids)
+            seen.update(ids)
+            # Each thread's ids must increase strictly
+            unordered += sum(1 for a, b in zip(ids, ids[1:]) if b <= a)
+            out_of_range += sum(1 for i in ids if not 0 < i < 2 ** 53)
+            # Borrowed milliseconds may put ids slightly ahead of the clock
+            out_of_range += sum(1 for i in (ids[0], ids[-1]) if not started - 1 <= id_time(i) <= finished + 1)
+    return {
+        'ids': total,
+        'processes': processes,
+        'threads': threads,
+        'worker_ids': len({worker_id for worker_id, _ in outcomes}),
+        'duplicates': total - len(seen),
+        'unordered': unordered,
+        'out_of_range': out_of_range,
+        'seconds': round(finished - started, 3),
+    }
+
+
+def rate(fn, count):
+    started = time.perf_counter()
+    fn(count)
+    return count / (time.perf_counter() - started)
+
+
+def threaded_rate(threads, count):
+    workers = [Thread(target=lambda: [id_generator.next_id() for _ in range(count)]) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * count / (time.perf_counter() - started)
+
+
+def throughput(count=200000, threads=8):
+    """Ids per second for each way of drawing them, and timestamp-id collisions."""
+    id_generator.next_id()  # Leases the worker id outside the timings
+    # Sustained rates are capped by the sequence space (64 ids per ms per
+    # process); a burst within the borrowing window shows the cost per call
+    time.sleep(0.1)
+    burst = 2 ** SEQUENCE_BITS * MAX_BORROW_MS // 2
+    results = {
+        'next_id_burst': rate(lambda n: [id_generator.next_id() for _ in range(n)], burst),
+        'next_id': rate(lambda n: [id_generator.next_id() for _ in range(n)], count),
+        'reserve_1000': rate(lambda n: [id_generator.reserve(1000) for _ in range(n // 1000)], count),
+        f'next_id_{threads}_threads': threaded_rate(threads, count // threads),
+    }
+    timestamps = [int(time.time() * 1000) for _ in range(count)]
+    results['timestamp_collisions'] = count - len(set(timestamps))
+    return results
+
+
+def run(processes=8, threads=4, count=50000, start_method='fork'):
+    print(f"Stress: {processes} processes ({start_method}) x {threads} threads x {count} ids")
+    result = stress(processes, threads, count, start_method)
+    print(f"  {result['ids']} ids from {result['worker_ids']} worker ids in {result['seconds']} s: "
+          f"{result['duplicates']} duplicates, {result['unordered']} out of order, "
+          f"{result['out_of_range']} out of range")
+    draws = 200000
+    speed = throughput(draws)
+    print('Throughput (one process):')
+    for name, value in speed.items():
+        if name != 'timestamp_collisions':
+            print(f"  {name:24} {value:>12,.0f} ids/s")
+    print(f"  int(time() * 1000) ids: {speed['timestamp_collisions']} collisions in {draws:,} draws")
+    return {'stress': result, 'throughput': speed}
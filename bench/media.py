@@ -0,0 +1,68 @@
+# Image serving throughput: uploads one incompressible image, then fetches
+# it from /media with concurrent clients under gunicorn (send_file through
+# wsgi.file_wrapper, so sendfile) and uvicorn: whole-file GETs, revalidations
+# with If-None-Match (304, no body) and 64 KiB Range requests (206).
+from bench import runner, servers
+from bench.scenarios import Scenario, multipart_body, petm_fields
+from io import BytesIO
+import json
+import os
+import random
+import tempfile
+
+RANGE_BYTES = 64 * 1024
+
+
+def noise_png(size):
+    # Random pixels do not compress, so the file is about size * size * 3 bytes
+    from PIL import Image
+    buffer = BytesIO()
+    Image.frombytes('RGB', (size, size), random.Random(size).randbytes(size * size * 3)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def upload(client, image):
+    status, body = client.request('POST', '/api/petm', *multipart_body(
+        petm_fields(0), {'image': ('bench.png', image, 'image/png')}))
+    if status != 201:
+        raise RuntimeError(f'upload returned {status}: {body[:200]!r}')
+    return json.loads(body)['imageName']
+
+
+def media_scenarios(name, etag):
+    path = f'/media/{name}'
+    return [
+        Scenario('media.full', 'GET', path),
+        Scenario('media.revalidate', 'GET', path, headers=lambda n, s: {'If-None-Match': etag}, expect=(304,)),
+        Scenario('media.range', 'GET', path, headers=lambda n, s: {'Range': f'bytes=0-{RANGE_BYTES - 1}'},
+                 expect=(206,)),
+    ]
+
+
+def run(options, modes=('wsgi', 'asgi'), workers=2, threads=8, image_size=1024, port=9000):
+    """Returns {'bytes': image size, mode: {scenario: result with 'mb_per_s'}}."""
+    image = noise_png(image_size)
+    sent = {'media.full': len(image), 'media.revalidate': 0, 'media.range': RANGE_BYTES}
+    results = {'bytes': len(image)}
+    print(f"{len(image) / 1024:.0f} KiB image, {options['requests']} requests per scenario, "
+          f"concurrency {options['concurrency']}, {workers} workers x {threads} threads")
+    for i, mode in enumerate(modes):
+        log_path = os.path.join(tempfile.gettempdir(), f'bench-media-{mode}.log')
+        with open(log_path, 'w') as log:
+            process, base_url = servers.start(mode, port + i, workers, threads, log)
+            client = runner.Client(base_url)
+            try:
+                name = upload(client, image)
+                status, headers, body = client.send('GET', f'/media/{name}')
+                if status != 200 or body != image:
+                    raise RuntimeError(f'GET /media/{name} returned {status} with {len(body)} bytes')
+                print(f"{mode}: {base_url}")
+                print(runner.HEADER + f" {'MB/s':>9}")
+                results[mode] = {}
+                for scenario in media_scenarios(name, headers['ETag']):
+                    result = results[mode][scenario.name] = runner.run_scenario(client, scenario, options)
+                    result['mb_per_s'] = round(result['rps'] * sent[scenario.name] / 1e6, 1)
+                    print(runner.format_row(scenario.name, result) + f" {result['mb_per_s']:>9.1f}")
+            finally:
+                servers.stop(process)
+    return results
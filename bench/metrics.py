@@ -0,0 +1,88 @@
+# Metrics overhead: the cost of the per-query timing hooks on a bare
+# SELECT 1, then a few endpoints against an in-process server with the
+# metrics hooks (query timing, request stats) detached and attached, in
+# alternating rounds so drift hits both modes; the best round of each is
+# kept. The hooks should cost microseconds per query and stay within the
+# noise of a request.
+from bench import runner
+from app import db
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import metrics
+import time
+
+SCENARIOS = ('healthz', 'petm.page', 'bookings.page', 'bookings.all')
+QUERY_HOOKS = (('before_cursor_execute', metrics.before_cursor_execute),
+               ('after_cursor_execute', metrics.after_cursor_execute),
+               ('handle_error', metrics.handle_error))
+
+
+@contextmanager
+def detached(app):
+    """Runs the body with every metrics hook removed, then puts them back."""
+    hooks = ((app.before_request_funcs[None], metrics.start_request_stats),
+             (app.after_request_funcs[None], metrics.record_request_stats))
+    positions = [funcs.index(hook) for funcs, hook in hooks]
+    for funcs, hook in hooks:
+        funcs.remove(hook)
+    for name, hook in QUERY_HOOKS:
+        event.remove(Engine, name, hook)
+    try:
+        yield
+    finally:
+        for name, hook in QUERY_HOOKS:
+            event.listen(Engine, name, hook)
+        for (funcs, hook), position in zip(hooks, positions):
+            funcs.insert(position, hook)
+
+
+def time_queries(count):
+    with db.engine.connect() as conn:
+        select = db.text('SELECT 1')
+        conn.execute(select)
+        started = time.perf_counter()
+        for _ in range(count):
+            conn.execute(select).scalar()
+        return (time.perf_counter() - started) / count * 1e6
+
+
+def run(app, selected, options, queries=20000, rounds=3):
+    """Returns {'query_us': {'off', 'on'}, 'off': {scenario: result}, 'on': {...}}."""
+    with detached(app):
+        query_off = time_queries(queries)
+    query_on = time_queries(queries)
+    results = {'query_us': {'off': round(query_off, 2), 'on': round(query_on, 2)}}
+    print(f"SELECT 1 x {queries}: {query_off:.1f} us without the hooks, {query_on:.1f} us with them "
+          f"(+{query_on - query_off:.1f} us per query)")
+
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    try:
+        print(f"{options['requests']} requests per scenario, concurrency {options['concurrency']}, "
+              f"best of {rounds} rounds")
+        print(f"{'':6}" + runner.HEADER)
+        results['off'], results['on'] = {}, {}
+        for scenario in selected:
+            for _ in range(rounds):
+                for mode in ('off', 'on'):
+                    if mode == 'off':
+                        with detached(app):
+                            result = runner.run_scenario(client, scenario, options)
+                    else:
+                        result = runner.run_scenario(client, scenario, options)
+                    best = results[mode].get(scenario.name)
+                    if best is None or result['rps'] > best['rps']:
+                        results[mode][scenario.name] = result
+            for mode in ('off', 'on'):
+                print(f"{mode:6}" + runner.format_row(scenario.name, results[mode][scenario.name]))
+    finally:
+        server.shutdown()
+
+    print(f"{'scenario':32} {'p50 overhead':>13} {'rps change':>11}")
+    for scenario in selected:
+        off, on = results['off'][scenario.name], results['on'][scenario.name]
+        p50 = (on['p50_ms'] - off['p50_ms']) / off['p50_ms'] if off['p50_ms'] else 0.0
+        rps = (on['rps'] - off['rps']) / off['rps'] if off['rps'] else 0.0
+        print(f"{scenario.name:32} {p50:>+13.1%} {rps:>+11.1%}")
+    return results
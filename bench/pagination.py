@@ -0,0 +1,68 @@
+# Keyset pagination at growing table sizes: reseeds the bookings, then for
+# each size times the first page, a page from the middle and one near the
+# end (?after=), and a projected page (?fields=). With the cursor on the
+# (date, time, id) index every page should cost the same at 1k rows as at
+# 1M; the whole list, timed up to --full-limit rows, grows with the table.
+from bench import runner
+from bench.seed import seed, insert_batches, booking_rows
+from models import Booking
+from pagination import encode_cursor
+from app import db
+import itertools
+import random
+import time
+
+PAGE = '/api/bookings?limit=50'
+FIELDS = '/api/bookings?limit=50&fields=id,petName,date'
+FULL = '/api/bookings'
+
+
+def cursor_at(offset):
+    row = db.session.query(Booking.date, Booking.time, Booking.id).order_by(
+        Booking.date, Booking.time, Booking.id).offset(offset).first()
+    return encode_cursor(list(row)) if row else ''
+
+
+def time_path(client, path, repeat):
+    client.request('GET', path)  # Warm-up
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        status, _ = client.request('GET', path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            raise RuntimeError(f'GET {path} answered {status}')
+    latencies.sort()
+    return {'p50_ms': round(runner.percentile(latencies, 0.5), 3), 'p99_ms': round(runner.percentile(latencies, 0.99), 3)}
+
+
+def run(app, sizes, repeat=200, full_limit=100000, batch_size=5000):
+    """Returns {size: {label: {'p50_ms', 'p99_ms'}}}; reseeds the database."""
+    seed({}, batch_size=batch_size)
+    rows = booking_rows(max(sizes), random.Random(1))
+    server, base_url = runner.start_server(app)
+    client = runner.Client(base_url)
+    # The whole-list reads are slow by design; keep them out of the slow request log
+    slow_ms, app.config['SLOW_REQUEST_MS'] = app.config['SLOW_REQUEST_MS'], float('inf')
+    labels = ('first', 'middle', 'last', 'fields', 'full')
+    print(f"GET {PAGE}: {repeat} sequential requests per cell; whole list up to {full_limit} rows")
+    print(f"{'rows':>9} " + ' '.join(f"{label + ' p50':>11} {label + ' p99':>11}" for label in labels))
+    results, seeded = {}, 0
+    try:
+        for size in sorted(sizes):
+            insert_batches(Booking, itertools.islice(rows, size - seeded), batch_size)
+            db.session.commit()
+            seeded = size
+            paths = {'first': PAGE, 'middle': f'{PAGE}&after={cursor_at(size // 2)}',
+                     'last': f'{PAGE}&after={cursor_at(max(size - 60, 0))}', 'fields': FIELDS}
+            if size <= full_limit:
+                paths['full'] = FULL
+            result = results[size] = {label: time_path(client, path, repeat if label != 'full' else 5)
+                                      for label, path in paths.items()}
+            cells = [result.get(label) for label in labels]
+            print(f"{size:>9} " + ' '.join(f"{c['p50_ms']:>11.2f} {c['p99_ms']:>11.2f}" if c else f"{'-':>11} {'-':>11}"
+                                           for c in cells))
+    finally:
+        app.config['SLOW_REQUEST_MS'] = slow_ms
+        server.shutdown()
+    return results
@@ -0,0 +1,154 @@
+# Runs scenarios against a base URL with concurrent clients and turns the
+# latencies into a report; also compares a report against a saved baseline.
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from urllib.parse import urlsplit
+import http.client
+import json
+import math
+import time
+
+
+class Client:
+    def __init__(self, base_url, timeout=60):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None):
+        """Sends one request on a fresh connection; returns (status, body)."""
+        status, _, body = self.send(method, path, body, headers)
+        return status, body
+
+    def send(self, method, path, body=None, headers=None):
+        """Like request(), but returns (status, response headers, body)."""
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.headers, response.read()
+        finally:
+            conn.close()
+
+
+def start_server(app, host='127.0.0.1'):
+    """Serves `app` on a free port in a background thread; returns (server, base_url)."""
+    from werkzeug.serving import make_server
+    import logging
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server(host, 0, app, threaded=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.port}'
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_scenario(client, scenario, options):
+    requests, warmup = options['requests'], options['warmup']
+    total = requests + warmup
+    state = scenario.setup(client, total, options) if scenario.setup else None
+    built = [scenario.build(n, state) for n in range(total)]
+    if options.get('accept_encoding'):
+        built = [(m, p, b, {**h, 'Accept-Encoding': options['accept_encoding']}) for m, p, b, h in built]
+
+    latencies = []
+    errors = {}
+    window = [None, None]  # first measured request sent, last one finished
+    lock = Lock()
+    next_index = iter(range(total))
+
+    def worker():
+        while True:
+            with lock:
+                n = next(next_index, None)
+            if n is None:
+                return
+            method, path, body, headers = built[n]
+            started = time.perf_counter()
+            try:
+                status = client.request(method, path, body, headers)[0]
+            except Exception as e:
+                status = type(e).__name__
+            finished = time.perf_counter()
+            if n < warmup:
+                continue
+            with lock:
+                latencies.append(finished - started)
+                window[0] = started if window[0] is None else min(window[0], started)
+                window[1] = finished if window[1] is None else max(window[1], finished)
+                if status not in scenario.expect:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+
+    # Warm-up requests are handed out first and left out of every figure
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+        for _ in range(options['concurrency']):
+            pool.submit(worker)
+    wall = window[1] - window[0] if latencies else 0
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_statuses': errors,
+        'rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+    }
+
+
+def run(base_url, scenarios, options):
+    client = Client(base_url)
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = result = run_scenario(client, scenario, options)
+        print(format_row(scenario.name, result))
+    return results
+
+
+HEADER = f"{'scenario':32} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+
+
+def format_row(name, result):
+    return (f"{name:32} {result['rps']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['errors']:>7}")
+
+
+def save_report(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold):
+    """Regressions of `current` against `baseline`, as printable lines.
+
+    A scenario regresses when p95 or p99 latency grows, or RPS drops, by
+    more than `threshold` (0.2 = 20%), or when it starts returning errors.
+    Scenarios present in only one report are skipped.
+    """
+    regressions = []
+    for name, now in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            if before[key] and now[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {before[key]:.2f} -> {now[key]:.2f}")
+        if before['rps'] and now['rps'] < before['rps'] * (1 - threshold):
+            regressions.append(f"{name}: rps {before['rps']:.1f} -> {now['rps']:.1f}")
+        if now['errors'] and not before['errors']:
+            regressions.append(f"{name}: {now['errors']} errors {now['error_statuses']}")
+    return regressions
@@ -0,0 +1,255 @@
+# One Scenario per endpoint (and per interesting variant of the list
+# endpoints). Each builds its n-th request; `setup` prepares whatever the
+# requests consume (rows to delete, tokens to revoke, an uploaded image).
+from datetime import date, timedelta
+from io import BytesIO
+from flask import current_app
+from app import db
+from models import Booking, Petm, SellPet
+from pagination import encode_cursor
+from ids import get_id_generator
+from auth import user_token, admin_token, cached_admin
+from bench.seed import BENCH_EMAIL, BENCH_ADMIN_EMAIL, BENCH_PASSWORD, DEFAULT_VOLUMES
+import itertools
+import json
+import random
+import time
+import uuid
+
+# Unique suffixes for rows created during a run (emails, booking services)
+fresh_ids = itertools.count(int(time.time() * 1000) * 1000)
+# Vet ids for new consultations, so each request books a free slot
+fresh_vets = itertools.count(random.randrange(10 ** 6, 2 ** 30))
+
+
+class Scenario:
+    def __init__(self, name, method, path, body=None, headers=None, setup=None, expect=(200,)):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.setup = setup
+        self.expect = expect
+
+    def build(self, n, state):
+        """(method, path, body bytes, headers) for request number n."""
+        path = self.path(n, state) if callable(self.path) else self.path
+        body, headers = self.body(n, state) if self.body else (None, {})
+        if self.headers:
+            headers = {**headers, **self.headers(n, state)}
+        return self.method, path, body, headers
+
+
+def json_body(data):
+    return json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'}
+
+
+def multipart_body(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, content, content_type) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def png_image(n, size):
+    # A different colour per request, so uploads do not all share one stored file
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new('RGB', (size, size), ((n * 37) % 256, (n * 91) % 256, (n * 53) % 256)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def booking_item(n):
+    return {'petName': 'Bench', 'service': f'bench-{next(fresh_ids)}',
+            'date': date.today().isoformat(), 'time': '10:00'}
+
+
+def boarding_item(n):
+    check_in = date.today() + timedelta(days=n % 60)
+    return {'petName': 'Bench', 'packageType': 'standard',
+            'checkIn': check_in.isoformat(), 'checkOut': (check_in + timedelta(days=3)).isoformat(),
+            'totalPrice': 135}
+
+
+def consultation_item(n):
+    return {'vetId': next(fresh_vets), 'vetName': 'Dr. Bench', 'petType': 'dog',
+            'petAge': 4, 'symptoms': 'routine check', 'consultDate': date.today().isoformat(),
+            'timeSlot': current_app.config['CONSULT_SLOTS'][0]}
+
+
+def petm_fields(n):
+    return {'name': 'Bench', 'species': 'dog', 'breed': 'beagle', 'age': 3,
+            'vaccination': 'complete', 'aggression': 'low'}
+
+
+def sell_pet_fields(n):
+    return {'name': 'Bench', 'species': 'cat', 'breed': 'bengal', 'age': 2,
+            'contact_email': 'seller@bench.example.com', 'price': 400, 'pet-desc': 'Benchmark listing'}
+
+
+def admin_headers(n=None, state=None):
+    with current_app.app_context():
+        token = admin_token(cached_admin(BENCH_ADMIN_EMAIL))
+    return {'Authorization': f'Bearer {token}'}
+
+
+def created_via(path, item, chunk=500):
+    """Setup that creates `count` rows through a bulk endpoint; state is their ids."""
+    def setup(client, count, options):
+        ids = []
+        for start in range(0, count, chunk):
+            items = [item(n) for n in range(start, min(count, start + chunk))]
+            status, body = client.request('POST', path, *json_body(items))
+            ids.extend(result['id'] for result in json.loads(body)['results'])
+        return ids
+    return setup
+
+
+def inserted(model, row):
+    """Setup that inserts `count` rows directly; state is their ids."""
+    def setup(client, count, options):
+        with current_app.app_context():
+            rows = [{'id': row_id, **row(n)} for n, row_id in enumerate(get_id_generator().reserve(count))]
+            db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+        return [r['id'] for r in rows]
+    return setup
+
+
+def petm_row(n):
+    return {'name': 'Bench', 'species': 'dog', 'breed': 'beagle', 'age': 3,
+            'vaccination_status': 'complete', 'aggression_level': 'low'}
+
+
+def sell_pet_row(n):
+    return {'name': 'Bench', 'species': 'cat', 'breed': 'bengal', 'age': 2,
+            'contact_email': 'seller@bench.example.com', 'price': 400}
+
+
+def bulk_setup(setup):
+    # Groups the ids of an id-producing setup into one list per request
+    def grouped(client, count, options):
+        size = options['bulk_size']
+        ids = setup(client, count * size, options)
+        return [ids[i:i + size] for i in range(0, len(ids), size)]
+    return grouped
+
+
+def user_tokens(client, count, options):
+    from models import User
+    with current_app.app_context():
+        user = User.query.filter_by(email=BENCH_EMAIL).first()
+        return [user_token(user) for _ in range(count)]
+
+
+def middle_cursor(client, count, options):
+    # Cursor halfway through the bookings, to show deep pages cost the same as the first
+    with current_app.app_context():
+        total = Booking.query.count()
+        row = Booking.query.order_by(Booking.date, Booking.time, Booking.id).offset(total // 2).first()
+        return encode_cursor([row.date, row.time, row.id]) if row else ''
+
+
+def uploaded_image(client, count, options):
+    fields = petm_fields(0)
+    status, body = client.request('POST', '/api/petm', *multipart_body(
+        fields, {'image': ('bench.png', png_image(0, options['image_size']), 'image/png')}))
+    return json.loads(body)['imageName']
+
+
+def scenarios(options):
+    """All benchmark scenarios for the given runner options."""
+    today = date.today()
+    bulk_size = options['bulk_size']
+    image_size = options['image_size']
+    users = options.get('volumes', DEFAULT_VOLUMES)['users']
+    upload = lambda fields: lambda n, s: multipart_body(
+        fields(n), {'image': (f'bench{n}.png', png_image(n, image_size), 'image/png')})
+    by_id = lambda base: lambda n, s: f'{base}/{s[n]}'
+    ids_body = lambda n, s: json_body({'ids': s[n]})
+
+    return [
+        Scenario('index', 'GET', '/'),
+        Scenario('healthz', 'GET', '/healthz'),
+        Scenario('readyz', 'GET', '/readyz'),
+        Scenario('metrics', 'GET', '/metrics'),
+        Scenario('cache.stats', 'GET', '/api/cache/stats'),
+        Scenario('db.pool_stats', 'GET', '/api/db/pool-stats'),
+        Scenario('hashing.stats', 'GET', '/api/hashing/stats'),
+
+        Scenario('auth.register', 'POST', '/register', expect=(201,),
+                 body=lambda n, s: json_body({'name': 'Bench', 'email': f'{next(fresh_ids)}@bench.example.com',
+                                              'password': BENCH_PASSWORD})),
+        Scenario('auth.login', 'POST', '/login',
+                 body=lambda n, s: json_body({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})),
+        Scenario('auth.logout', 'POST', '/logout', setup=user_tokens,
+                 headers=lambda n, s: {'Authorization': f'Bearer {s[n]}'}),
+        Scenario('admin.authenticate', 'POST', '/api/admin-authenticate',
+                 body=lambda n, s: json_body({'email': BENCH_ADMIN_EMAIL, 'password': BENCH_PASSWORD})),
+        # The static admin pages are not part of this repository
+        Scenario('admin.login_page', 'GET', '/admin-login-page', expect=(200, 404)),
+        Scenario('admin.dashboard', 'GET', '/admin-dashboard', expect=(200, 404)),
+        Scenario('users.page', 'GET', '/api/users?limit=50', headers=admin_headers),
+        # Skips user 1, the account the login and logout scenarios use
+        Scenario('users.delete', 'DELETE', lambda n, s: f'/api/users/{n % max(users - 1, 1) + 2}', headers=admin_headers),
+
+        Scenario('bookings.page', 'GET', '/api/bookings?limit=50'),
+        Scenario('bookings.deep_page', 'GET', lambda n, s: f'/api/bookings?limit=50&after={s}', setup=middle_cursor),
+        Scenario('bookings.all', 'GET', '/api/bookings'),
+        Scenario('bookings.stream', 'GET', '/api/bookings?stream=1'),
+        Scenario('bookings.create', 'POST', '/api/bookings', expect=(201,),
+                 body=lambda n, s: json_body(booking_item(n))),
+        Scenario('bookings.bulk', 'POST', '/api/bookings/bulk', expect=(201,),
+                 body=lambda n, s: json_body([booking_item(n) for _ in range(bulk_size)])),
+        Scenario('bookings.delete', 'DELETE', by_id('/api/bookings'),
+                 setup=created_via('/api/bookings/bulk', booking_item)),
+        Scenario('bookings.bulk_delete', 'POST', '/api/bookings/bulk-delete', body=ids_body,
+                 setup=bulk_setup(created_via('/api/bookings/bulk', booking_item))),
+
+        Scenario('boardings.page', 'GET', '/api/boardings?limit=50'),
+        Scenario('boardings.all', 'GET', '/api/boardings'),
+        Scenario('boardings.occupancy', 'GET', f'/api/boardings/occupancy?from={today}&to={today + timedelta(days=29)}'),
+        Scenario('boardings.revenue', 'GET', f'/api/boardings/revenue?from={today - timedelta(days=89)}&to={today}&group=day'),
+        Scenario('boardings.create', 'POST', '/api/boardings', expect=(201,),
+                 body=lambda n, s: json_body(boarding_item(n))),
+        Scenario('boardings.bulk', 'POST', '/api/boardings/bulk', expect=(201,),
+                 body=lambda n, s: json_body([boarding_item(n) for _ in range(bulk_size)])),
+        Scenario('boardings.delete', 'DELETE', by_id('/api/boardings'),
+                 setup=created_via('/api/boardings/bulk', boarding_item)),
+        Scenario('boardings.bulk_delete', 'POST', '/api/boardings/bulk-delete', body=ids_body,
+                 setup=bulk_setup(created_via('/api/boardings/bulk', boarding_item))),
+
+        Scenario('consultations.page', 'GET', '/api/consultations?limit=50'),
+        Scenario('consultations.all', 'GET', '/api/consultations'),
+        Scenario('consultations.availability', 'GET',
+                 lambda n, s: f'/api/vets/{n % 20 + 1}/availability?from={today}&to={today + timedelta(days=13)}'),
+        Scenario('consultations.create', 'POST', '/api/consultations', expect=(201,),
+                 body=lambda n, s: json_body(consultation_item(n))),
+        Scenario('consultations.bulk', 'POST', '/api/consultations/bulk', expect=(201,),
+                 body=lambda n, s: json_body([consultation_item(n) for _ in range(bulk_size)])),
+        Scenario('consultations.delete', 'DELETE', by_id('/api/consultations'),
+                 setup=created_via('/api/consultations/bulk', consultation_item)),
+        Scenario('consultations.bulk_delete', 'POST', '/api/consultations/bulk-delete', body=ids_body,
+                 setup=bulk_setup(created_via('/api/consultations/bulk', consultation_item))),
+
+        Scenario('petm.page', 'GET', '/api/petm?limit=50'),
+        Scenario('petm.all', 'GET', '/api/petm'),
+        Scenario('petm.filter', 'GET', '/api/petm?species=cat&vaccination=complete&limit=50'),
+        Scenario('petm.create', 'POST', '/api/petm', body=upload(petm_fields), expect=(201,)),
+        Scenario('petm.delete', 'DELETE', by_id('/api/petm'), setup=inserted(Petm, petm_row)),
+
+        Scenario('sell_pets.page', 'GET', '/api/sell_pets?limit=50'),
+        Scenario('sell_pets.all', 'GET', '/api/sell_pets'),
+        Scenario('sell_pets.filter', 'GET', '/api/sell_pets?species=dog&max_price=500&limit=50'),
+        Scenario('sell_pets.search', 'GET', '/api/sell_pets?q=labrador&limit=50'),
+        Scenario('sell_pets.create', 'POST', '/api/sell_pets', body=upload(sell_pet_fields), expect=(201,)),
+        Scenario('sell_pets.delete', 'DELETE', by_id('/api/sell_pets'), setup=inserted(SellPet, sell_pet_row)),
+
+        Scenario('media.get', 'GET', lambda n, s: f'/media/{s}', setup=uploaded_image),
+    ]
@@ -0,0 +1,158 @@
+# Fills the configured database with synthetic rows for the benchmarks.
+# Rows are inserted with executemany in batches, so large volumes seed quickly.
+from datetime import date, datetime, timedelta
+from werkzeug.security import generate_password_hash
+from flask import current_app
+from app import db
+from models import User, Booking, Boarding, Consultation, Petm, SellPet, Admin
+from analytics import rebuild_boarding_rollup
+import bcrypt
+import os
+import random
+import tempfile
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_ADMIN_EMAIL = 'bench-admin@example.com'
+BENCH_PASSWORD = 'bench-password'
+
+SPECIES = {
+    'dog': ['labrador', 'beagle', 'poodle', 'husky', 'terrier'],
+    'cat': ['siamese', 'persian', 'maine coon', 'bengal'],
+    'rabbit': ['lop', 'rex'],
+}
+NAMES = ['Bella', 'Max', 'Luna', 'Charlie', 'Milo', 'Daisy', 'Rocky', 'Coco', 'Oscar', 'Ruby']
+SERVICES = ['grooming', 'bath', 'nail trim', 'dental', 'training']
+PACKAGES = ['basic', 'standard', 'premium']
+VACCINATION = ['complete', 'partial', 'none']
+AGGRESSION = ['low', 'medium', 'high']
+
+DEFAULT_VOLUMES = {
+    'users': 1000,
+    'bookings': 5000,
+    'boardings': 5000,
+    'consultations': 5000,
+    'petm': 2000,
+    'sell_pets': 2000,
+}
+
+
+def bench_database_uri():
+    # Never SQLALCHEMY_DATABASE_URI: seeding drops every table
+    return os.getenv('BENCH_DATABASE_URI') or 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'pawsconnect-bench.db')
+
+
+def pet(rng):
+    species = rng.choice(list(SPECIES))
+    return species, rng.choice(SPECIES[species])
+
+
+def user_rows(count, rng):
+    # Hashing is deliberately slow, so every seeded user shares one hash
+    password_hash = generate_password_hash(BENCH_PASSWORD, method=current_app.config['PASSWORD_HASH_METHOD'])
+    yield {'name': 'Bench', 'email': BENCH_EMAIL, 'password_hash': password_hash,
+           'role': 'adopter', 'created_at': datetime.utcnow()}
+    for i in range(1, count):
+        yield {'name': f'{rng.choice(NAMES)} {i}', 'email': f'user{i}@bench.example.com',
+               'password_hash': password_hash, 'role': rng.choice(['adopter', 'seller']),
+               'created_at': datetime.utcnow() - timedelta(minutes=i)}
+
+
+def booking_rows(count, rng):
+    start = date.today()
+    for i in range(1, count + 1):
+        # (service, date, time) is unique, so spread rows over services, days and hours
+        yield {'pet_name': rng.choice(NAMES), 'service': SERVICES[i % len(SERVICES)],
+               'date': start + timedelta(days=i // (len(SERVICES) * 10)),
+               'time': f'{8 + (i // len(SERVICES)) % 10:02d}:00', 'notes': '',
+               'created_at': datetime.utcnow()}
+
+
+def boarding_rows(count, rng):
+    start = date.today() - timedelta(days=180)
+    for i in range(1, count + 1):
+        check_in = start + timedelta(days=rng.randrange(365))
+        nights = rng.randint(1, 14)
+        yield {'pet_name': rng.choice(NAMES), 'package_type': rng.choice(PACKAGES),
+               'check_in': check_in, 'check_out': check_in + timedelta(days=nights),
+               'special_needs': '', 'total_price': nights * rng.choice([30, 45, 60]),
+               'created_at': datetime.utcnow()}
+
+
+def consultation_rows(count, rng):
+    slots = current_app.config['CONSULT_SLOTS']
+    vets = 20
+    start = date.today()
+    for i in range(1, count + 1):
+        # Fills each vet's slots day by day, so rows map to unique (vet, day, slot)
+        vet, rest = i % vets, i // vets
+        yield {'vet_id': vet + 1, 'vet_name': f'Dr. {NAMES[vet % len(NAMES)]}',
+               'pet_type': pet(rng)[0], 'pet_age': rng.randint(1, 15), 'symptoms': 'routine check',
+               'consult_date': start + timedelta(days=rest // len(slots)),
+               'time_slot': slots[rest % len(slots)], 'status': 'scheduled',
+               'created_at': datetime.utcnow()}
+
+
+def petm_rows(count, rng):
+    for i in range(1, count + 1):
+        species, breed = pet(rng)
+        yield {'name': rng.choice(NAMES), 'species': species, 'breed': breed,
+               'age': rng.randint(0, 15), 'vaccination_status': rng.choice(VACCINATION),
+               'aggression_level': rng.choice(AGGRESSION), 'image_name': None,
+               'created_at': datetime.utcnow() - timedelta(minutes=i)}
+
+
+def sell_pet_rows(count, rng):
+    for i in range(1, count + 1):
+        species, breed = pet(rng)
+        yield {'name': rng.choice(NAMES), 'species': species, 'breed': breed,
+               'age': rng.randint(0, 15), 'description': f'Friendly {breed} looking for a home',
+               'image_name': None, 'contact_email': f'seller{i % 100}@bench.example.com',
+               'contact_phone': None, 'price': rng.randrange(50, 2000, 10),
+               'created_at': datetime.utcnow() - timedelta(minutes=i)}
+
+
+SEEDERS = {
+    'users': (User, user_rows),
+    'bookings': (Booking, booking_rows),
+    'boardings': (Boarding, boarding_rows),
+    'consultations': (Consultation, consultation_rows),
+    'petm': (Petm, petm_rows),
+    'sell_pets': (SellPet, sell_pet_rows),
+}
+
+
+def insert_batches(model, rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(model.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(model.__table__.insert(), batch)
+
+
+def seed(volumes, batch_size=1000, seed_value=42):
+    """Drops and recreates every table, then inserts `volumes` rows per model.
+
+    Must run inside an app context, on BENCH_DATABASE_URI only. Returns the
+    row counts inserted.
+    """
+    uri = current_app.config['SQLALCHEMY_DATABASE_URI']
+    if uri != bench_database_uri():
+        raise RuntimeError(f"Refusing to drop the tables of {uri}; the benchmarks only seed BENCH_DATABASE_URI")
+    rng = random.Random(seed_value)
+    db.drop_all()
+    db.create_all()
+    for name, (model, rows) in SEEDERS.items():
+        insert_batches(model, rows(volumes.get(name, 0), rng), batch_size)
+        print(f"Seeded {volumes.get(name, 0)} {name}")
+
+    admin_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(current_app.config['BCRYPT_ROUNDS']))
+    db.session.add(Admin(email=BENCH_ADMIN_EMAIL, password=admin_hash.decode('utf-8'), role='admin'))
+    db.session.commit()
+    rebuild_boarding_rollup(batch_size=batch_size)
+    # Statistics, as a database that has been running would have (see manage.py analyze)
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    return {name: volumes.get(name, 0) for name in SEEDERS}
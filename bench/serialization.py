@@ -0,0 +1,57 @@
+# Microbenchmark of the list serialization path for each model: ORM objects
+# + to_dict() + Flask's default encoder versus column tuples +
+# row_serializer() + FastJSONProvider. Both must produce the same bytes.
+from flask.json.provider import DefaultJSONProvider
+from flask import current_app
+from models import User, Booking, Boarding, Consultation, Petm, SellPet
+from json_provider import FastJSONProvider, orjson
+import time
+
+MODELS = [User, Booking, Boarding, Consultation, Petm, SellPet]
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(model, repeat, limit):
+    app = current_app._get_current_object()
+    default_json, fast_json = DefaultJSONProvider(app), FastJSONProvider(app)
+    query = model.query.order_by(model.id).limit(limit)
+    serialize = model.row_serializer()
+    columns = model.api_columns(list(model.api_fields))
+
+    def orm_path():
+        return default_json.dumps([row.to_dict() for row in query.all()], separators=(',', ':'))
+
+    def tuple_path():
+        return fast_json.dumps([serialize(row) for row in query.with_entities(*columns).all()],
+                               separators=(',', ':'))
+
+    orm_time, orm_body = best_of(repeat, orm_path)
+    tuple_time, tuple_body = best_of(repeat, tuple_path)
+    return {
+        'rows': query.count(),
+        'orm_ms': round(orm_time * 1000, 3),
+        'tuple_ms': round(tuple_time * 1000, 3),
+        'speedup': round(orm_time / tuple_time, 2) if tuple_time else 0.0,
+        'identical': orm_body == tuple_body,
+    }
+
+
+def run(repeat=5, limit=5000):
+    """Returns {model table: result}; must run inside an app context."""
+    print(f"JSON encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib (orjson not installed)'}")
+    print(f"{'model':16} {'rows':>6} {'orm ms':>9} {'tuple ms':>9} {'speedup':>8} identical")
+    results = {}
+    for model in MODELS:
+        results[model.__tablename__] = result = measure(model, repeat, limit)
+        print(f"{model.__tablename__:16} {result['rows']:>6} {result['orm_ms']:>9.2f} {result['tuple_ms']:>9.2f} "
+              f"{result['speedup']:>7.2f}x {result['identical']}")
+    return results
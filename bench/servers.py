@@ -0,0 +1,78 @@
+# Sync vs async deployment benchmark: starts the app under gunicorn
+# (wsgi.py, gthread workers) and under uvicorn (asgi.py) with the same
+# worker and thread counts, and runs the same scenarios against each.
+from bench import runner
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    'wsgi': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+    'asgi': [sys.executable, 'asgi.py'],
+}
+
+
+def start(mode, port, workers, threads, log, root=ROOT, env=None):
+    env = {**os.environ, 'WEB_PORT': str(port), 'WEB_WORKERS': str(workers), 'WEB_THREADS': str(threads),
+           'UPLOAD_FOLDER': os.environ.get('UPLOAD_FOLDER') or tempfile.mkdtemp(prefix='bench-uploads-'),
+           **(env or {})}
+    process = subprocess.Popen(COMMANDS[mode], cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    client = runner.Client(base_url, timeout=2)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{mode} server exited with {process.returncode}; see {log.name}')
+        try:
+            if client.request('GET', '/healthz')[0] == 200:
+                return process, base_url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop(process)
+    raise RuntimeError(f'{mode} server did not become healthy; see {log.name}')
+
+
+def stop(process):
+    # SIGTERM is the graceful shutdown path for both servers
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run(scenarios, options, modes, workers, threads, port=8900, log_dir=None):
+    """Returns {mode: {scenario: result}}."""
+    results = {}
+    for i, mode in enumerate(modes):
+        log_path = os.path.join(log_dir or tempfile.gettempdir(), f'bench-{mode}.log')
+        with open(log_path, 'w') as log:
+            process, base_url = start(mode, port + i, workers, threads, log)
+            try:
+                print(f"{mode}: {base_url}, {workers} workers x {threads} threads")
+                print(runner.HEADER)
+                results[mode] = runner.run(base_url, scenarios, options)
+            finally:
+                stop(process)
+    print_comparison(results)
+    return results
+
+
+def print_comparison(results):
+    modes = list(results)
+    if len(modes) < 2:
+        return
+    print()
+    print(f"{'scenario':32} " + ' '.join(f"{m + ' rps':>10} {m + ' p99':>10}" for m in modes))
+    for name in results[modes[0]]:
+        cells = []
+        for mode in modes:
+            result = results[mode].get(name)
+            cells.append(f"{result['rps']:>10.1f} {result['p99_ms']:>10.2f}" if result else f"{'-':>10} {'-':>10}")
+        print(f"{name:32} " + ' '.join(cells))
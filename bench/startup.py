@@ -0,0 +1,143 @@
+# Startup benchmark: how long `from wsgi import application` takes and what
+# it imports (python -X importtime), and the boot time and per-worker memory
+# of gunicorn with and without preload_app. Each measurement runs for this
+# tree and for a baseline git ref extracted to a temp dir.
+from bench import servers
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = servers.ROOT
+# Imported on first use since the app factory; loaded at boot before it
+HEAVY_MODULES = ('bcrypt', 'PIL', 'brotli', 'zstandard', 'redis', 'sqlalchemy.dialects.postgresql')
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from wsgi import application
+seconds = time.perf_counter() - started
+with open('/proc/self/status') as status:
+    rss_kb = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+print(json.dumps({'seconds': seconds, 'rss_kb': rss_kb, 'modules': len(sys.modules),
+                  'loaded': [name for name in %r if name in sys.modules]}))
+'''
+
+
+def extract(ref):
+    """Checks out `ref` into a temp dir (without touching the work tree)."""
+    target = tempfile.mkdtemp(prefix='bench-startup-')
+    archive = subprocess.run(['git', 'archive', ref], cwd=ROOT, check=True, capture_output=True).stdout
+    archive_path = os.path.join(target, '.archive.tar')
+    with open(archive_path, 'wb') as f:
+        f.write(archive)
+    with tarfile.open(archive_path) as tar:
+        tar.extractall(target, filter='data')
+    os.remove(archive_path)
+    return target
+
+
+def parse_importtime(stderr, top):
+    """Import self time summed per top-level package, in microseconds, largest first."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def measure_import(root, runs, top):
+    """Best of `runs` fresh interpreters importing the WSGI app."""
+    best = None
+    for _ in range(runs):
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        done = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE % (HEAVY_MODULES,)],
+                              cwd=root, env=env, capture_output=True, text=True)
+        if done.returncode:
+            raise RuntimeError(f'Importing the app in {root} failed:\n{done.stderr[-2000:]}')
+        result = json.loads(done.stdout.strip().splitlines()[-1])
+        result['top'] = parse_importtime(done.stderr, top)
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory_kb(pid):
+    """Rss, Pss and private pages of one process, in KiB."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def measure_workers(root, preload, workers, port, log_dir):
+    log_path = os.path.join(log_dir, f"bench-startup-{'preload' if preload else 'no-preload'}.log")
+    with open(log_path, 'w') as log:
+        started = time.perf_counter()
+        process, _ = servers.start('wsgi', port, workers, 2, log, root=root,
+                                   env={'WEB_PRELOAD': str(preload)})
+        try:
+            # Healthy means one worker answers; wait for the rest to fork
+            deadline = time.monotonic() + 30
+            while len(children(process.pid)) < workers and time.monotonic() < deadline:
+                time.sleep(0.05)
+            boot = time.perf_counter() - started
+            time.sleep(0.5)
+            memory = [memory_kb(pid) for pid in children(process.pid)]
+            master = memory_kb(process.pid)
+        finally:
+            servers.stop(process)
+    return {
+        'boot_seconds': boot,
+        'workers': len(memory),
+        'worker_rss_kb': sum(m['rss'] for m in memory) // max(len(memory), 1),
+        'worker_pss_kb': sum(m['pss'] for m in memory) // max(len(memory), 1),
+        'worker_private_kb': sum(m['private'] for m in memory) // max(len(memory), 1),
+        'master_rss_kb': master['rss'],
+    }
+
+
+def run(baseline='HEAD', runs=5, top=12, workers=4, gunicorn=True, port=8950):
+    trees = {'current': ROOT}
+    if baseline:
+        trees[baseline] = extract(baseline)
+    results = {}
+    try:
+        for label, root in trees.items():
+            result = results[label] = {'import': measure_import(root, runs, top)}
+            imported = result['import']
+            print(f"{label}: import wsgi {imported['seconds'] * 1000:.0f} ms, "
+                  f"{imported['rss_kb'] / 1024:.1f} MiB RSS, {imported['modules']} modules")
+            print(f"  loaded at boot: {', '.join(imported['loaded']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+            for name, micros in imported['top']:
+                print(f"  {micros / 1000:>8.1f} ms  {name}")
+            if not gunicorn:
+                continue
+            for preload in (False, True):
+                key = 'preload' if preload else 'no_preload'
+                measured = result[key] = measure_workers(root, preload, workers, port, tempfile.gettempdir())
+                print(f"  gunicorn {key:10} boot {measured['boot_seconds']:.2f} s, per worker: "
+                      f"RSS {measured['worker_rss_kb'] / 1024:.1f} MiB, "
+                      f"PSS {measured['worker_pss_kb'] / 1024:.1f} MiB, "
+                      f"private {measured['worker_private_kb'] / 1024:.1f} MiB")
+    finally:
+        for label, root in trees.items():
+            if root != ROOT:
+                shutil.rmtree(root, ignore_errors=True)
+    return results
@@ -0,0 +1,109 @@
+from flask import request, jsonify, current_app
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from ids import get_id_generator
+from events import publish_rows
+
+
+def taken_keys(model, columns, keys):
+    """The (column values) tuples among `keys` that rows of `model` already hold."""
+    cols = [getattr(model, name) for name in columns]
+    return {tuple(row) for row in db.session.query(*cols).filter(tuple_(*cols).in_(list(keys)))}
+
+
+def bulk_create(model, required_fields, build, unique=None, before_commit=None, after_commit=None):
+    """Insert a JSON array of items in one transaction.
+
+    Every item is validated before anything is written; if any item fails,
+    nothing is inserted and the response lists the error for each bad item
+    (400). `unique` names columns whose values must not repeat: items that
+    repeat an earlier item's or an existing row's get a 409 in the same form.
+    Valid batches go out as a single executemany INSERT, which SQLAlchemy
+    turns into multi-row INSERT statements on drivers that support them.
+    Ids are always generated by the server; an `id` in an item is ignored.
+    """
+    items = request.get_json()
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty JSON array'}), 400
+    if len(items) > current_app.config['BULK_MAX_ITEMS']:
+        return jsonify({'error': f"At most {current_app.config['BULK_MAX_ITEMS']} items per request"}), 413
+
+    rows, results = {}, []
+    for i, data in enumerate(items):
+        try:
+            if not isinstance(data, dict) or not all(k in data for k in required_fields):
+                raise ValueError('Missing required fields')
+            rows[i] = build(data, i)
+            results.append({'index': i, 'status': 'ok'})
+        except (ValueError, TypeError, KeyError) as e:
+            results.append({'index': i, 'status': 'error', 'error': str(e)})
+
+    if any(result['status'] == 'error' for result in results):
+        return jsonify({'created': 0, 'results': results}), 400
+
+    if unique:
+        first = {}
+        for i, row in rows.items():
+            first.setdefault(tuple(row[name] for name in unique), i)
+        taken = taken_keys(model, unique, first)
+        for i, row in rows.items():
+            key = tuple(row[name] for name in unique)
+            if key in taken:
+                results[i] = {'index': i, 'status': 'conflict', 'error': 'Conflicts with an existing row'}
+            elif first[key] != i:
+                results[i] = {'index': i, 'status': 'conflict', 'error': f'Duplicates item {first[key]}'}
+        if any(result['status'] == 'conflict' for result in results):
+            return jsonify({'created': 0, 'results': results}), 409
+
+    # One block of server-generated ids for the whole batch
+    for row, row_id in zip(rows.values(), get_id_generator().reserve(len(rows))):
+        row['id'] = row_id
+
+    try:
+        db.session.execute(model.__table__.insert(), list(rows.values()))
+        if before_commit:
+            before_commit(list(rows.values()))
+        db.session.commit()
+    except IntegrityError as e:
+        # A concurrent request took a slot after the check above
+        db.session.rollback()
+        return jsonify({'error': 'Batch conflicts with existing rows', 'detail': str(e.orig)}), 409
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in bulk create of {model.__tablename__}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    if after_commit:
+        after_commit()
+    publish_rows(model, 'created', rows.values())
+    for i, row in rows.items():
+        results[i]['id'] = row['id']
+    return jsonify({'created': len(rows), 'results': results}), 201
+
+
+def bulk_delete(model, before_commit=None, after_commit=None):
+    """Delete rows by id list ({"ids": [...]}) with one DELETE ... WHERE id IN."""
+    data = request.get_json()
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'Expected {"ids": [...]}'}), 400
+    if len(ids) > current_app.config['BULK_MAX_ITEMS']:
+        return jsonify({'error': f"At most {current_app.config['BULK_MAX_ITEMS']} ids per request"}), 413
+
+    try:
+        found = {row_id for (row_id,) in db.session.query(model.id).filter(model.id.in_(ids))}
+        if before_commit:
+            before_commit(found)
+        model.query.filter(model.id.in_(found)).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in bulk delete of {model.__tablename__}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    if after_commit:
+        after_commit()
+    publish_rows(model, 'deleted', sorted(found))
+    results = [{'id': row_id, 'status': 'deleted' if row_id in found else 'not_found'} for row_id in ids]
+    return jsonify({'deleted': len(found), 'results': results}), 200
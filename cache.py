@@ -0,0 +1,231 @@
+from flask import Blueprint, request, make_response, jsonify, current_app, g
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from urllib.parse import urlencode
+from pagination import wants_stream
+from events import broadcast
+from async_db import blocking
+import compress
+import hashlib
+import json
+import math
+import time
+
+# Response headers that are stored with a cached body and replayed on a hit
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Link', 'X-Next-Cursor')
+
+
+class MemoryCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.counters = {}  # Never expire and never count against the LRU
+        self.lock = Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.counters:
+                return self.counters[key]
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                self.evictions += 1
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def incr(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+class RedisCache:
+    """Shared cache for multi-worker deployments.
+
+    `client` is anything with redis-py's get/set/delete/incr signature, so tests can
+    pass a local fake instead of a real server. Calls go through blocking(), so
+    requests on the ASGI event loop wait for Redis on a thread.
+    """
+
+    def __init__(self, client, ttl=60, prefix='minibackend:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0  # Redis evicts on its own; not observable here
+
+    def get(self, key):
+        return blocking(self.client.get, self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        blocking(lambda: self.client.set(self.prefix + key, value, ex=math.ceil(self.ttl if ttl is None else ttl)))
+
+    def delete(self, key):
+        blocking(self.client.delete, self.prefix + key)
+
+    def incr(self, key):
+        return int(blocking(self.client.incr, self.prefix + key))
+
+
+def build_cache(config):
+    ttl = config['CACHE_TTL']
+    if config['CACHE_BACKEND'] == 'redis':
+        import redis  # Optional dependency, only needed for the shared backend
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']), ttl=ttl)
+    return MemoryCache(max_entries=config['CACHE_MAX_ENTRIES'], ttl=ttl)
+
+
+bp = Blueprint('cache', __name__)
+stats_lock = Lock()
+# Control topic that carries invalidations between workers' memory caches
+INVALIDATE_TOPIC = 'cache.invalidate'
+
+
+def init_app(app):
+    response_cache = app.extensions['response_cache'] = build_cache(app.config)
+    app.extensions['cache_stats'] = {'hits': 0, 'misses': 0}
+    if isinstance(response_cache, MemoryCache):
+        lag = app.config['READ_YOUR_WRITES_SECONDS']
+
+        def invalidated_elsewhere(namespace):
+            response_cache.incr(f'gen:{namespace}')
+            response_cache.set(f'changed:{namespace}', b'1', ttl=lag)
+        app.extensions['events'].on(INVALIDATE_TOPIC, invalidated_elsewhere)
+
+
+def get_cache():
+    return current_app.extensions['response_cache']
+
+
+def get_cache_counts():
+    return current_app.extensions['cache_stats']
+
+
+def count(stat):
+    cache_stats = get_cache_counts()
+    with stats_lock:
+        cache_stats[stat] += 1
+
+
+def generation(namespace):
+    # Writes bump the namespace generation, which retires every key built with
+    # the old one; stale entries then age out of the LRU / TTL on their own.
+    value = get_cache().get(f'gen:{namespace}')
+    return int(value) if value is not None else 0
+
+
+def invalidate(namespace):
+    response_cache = get_cache()
+    response_cache.incr(f'gen:{namespace}')
+    # A replica may not have the write yet: until it should have, misses are
+    # read from the primary, so a stale list is not cached under the new
+    # generation (see cached_response)
+    response_cache.set(f'changed:{namespace}', b'1', ttl=current_app.config['READ_YOUR_WRITES_SECONDS'])
+    if isinstance(response_cache, MemoryCache):
+        # Every worker has its own memory cache; Redis is already shared
+        broadcast(INVALIDATE_TOPIC, namespace)
+
+
+def encode_entry(response):
+    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+    return json.dumps(headers).encode('utf-8') + b'\n' + response.get_data()
+
+
+def decode_entry(entry):
+    headers, body = entry.split(b'\n', 1)
+    return json.loads(headers), body
+
+
+def cache_key(namespace):
+    # Parameter order does not matter, but the order of a repeated parameter's
+    # values can (the first one wins): a stable sort on the name keeps it
+    query = urlencode(sorted(request.args.items(multi=True), key=lambda item: item[0]))
+    return f'{namespace}:{generation(namespace)}:{query}'
+
+
+def cached_entry(view):
+    """Whether the current request is a hit in `view`'s response cache.
+
+    For callers that run before the view (admission); the entry is kept on
+    `g` so cached_response does not look it up again.
+    """
+    namespace = getattr(view, 'cache_namespace', None)
+    if namespace is None or not current_app.config['CACHE_ENABLED'] or wants_stream():
+        return False
+    key = cache_key(namespace)
+    g.cached_entry = key, get_cache().get(key)
+    return g.cached_entry[1] is not None
+
+
+def cached_response(namespace):
+    """Read-through cache for a GET handler, keyed on namespace + query string.
+
+    Only plain 200 JSON responses are stored; streamed exports bypass it.
+    Every response carries an ETag so clients can revalidate with
+    If-None-Match and get a 304. Compressed variants are stored per encoding.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['CACHE_ENABLED'] or wants_stream():
+                return view(*args, **kwargs)
+
+            response_cache = get_cache()
+            key = cache_key(namespace)
+            looked_up = g.pop('cached_entry', None)
+            entry = looked_up[1] if looked_up and looked_up[0] == key else response_cache.get(key)
+            if entry is not None:
+                count('hits')
+                headers, body = decode_entry(entry)
+                response = make_response(body, 200, headers)
+            else:
+                count('misses')
+                if g.get('read_engine') is not None and response_cache.get(f'changed:{namespace}') is not None:
+                    g.read_engine = None  # See invalidate
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+                response_cache.set(key, encode_entry(response))
+
+            # Compressed bodies are cached next to the entry, so hits are not
+            # recompressed; the encoding prefix keeps them apart from entry keys
+            encoding = compress.response_encoding(response)
+            if encoding is not None:
+                variant_key = f'{encoding}/{key}'
+                body = response_cache.get(variant_key)
+                if body is None:
+                    body = compress.compress(response.get_data(), encoding)
+                    response_cache.set(variant_key, body)
+                compress.set_encoded_body(response, body, encoding)
+
+            return response.make_conditional(request)
+        wrapper.cache_namespace = namespace
+        return wrapper
+    return decorator
+
+
+@bp.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    evictions = getattr(get_cache(), 'evictions', 0)
+    return jsonify({**get_cache_counts(), 'evictions': evictions}), 200
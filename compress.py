@@ -0,0 +1,168 @@
+# Negotiated response compression: gzip always, brotli and zstd when their
+# packages are installed. Applies to JSON/text responses above
+# COMPRESS_MIN_BYTES and to streamed (NDJSON) responses of any size.
+from flask import Blueprint, request, current_app
+from functools import cache
+import gzip
+import importlib
+import zlib
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml')
+# Streamed bodies are flushed to the client once this much input is pending,
+# so NDJSON rows keep arriving without a flush per (tiny) line
+STREAM_FLUSH_BYTES = 16 * 1024
+# Optional packages for the other encodings, imported on first use
+CODEC_MODULES = {'br': 'brotli', 'zstd': 'zstandard'}
+
+bp = Blueprint('compress', __name__)
+
+
+@cache
+def codec(encoding):
+    """The module implementing `encoding`, or None when it is not installed."""
+    if encoding == 'gzip':
+        return gzip
+    try:
+        return importlib.import_module(CODEC_MODULES[encoding])
+    except (KeyError, ImportError):
+        return None
+
+
+def supported_encodings():
+    # COMPRESS_ENCODINGS in server preference order, minus missing packages
+    return [e for e in current_app.config['COMPRESS_ENCODINGS'] if codec(e) is not None]
+
+
+def negotiate():
+    """Best encoding the client accepts, or None for identity.
+
+    Highest Accept-Encoding quality wins; ties go to the server's order.
+    """
+    best, best_quality = None, 0
+    for encoding in supported_encodings():
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compressible(response):
+    config = current_app.config
+    if (not config['COMPRESS_ENABLED'] or request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or response.direct_passthrough
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return False
+    mimetype = response.mimetype or ''
+    if not (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES):
+        return False
+    return response.is_streamed or (response.content_length or 0) >= config['COMPRESS_MIN_BYTES']
+
+
+def response_encoding(response):
+    """Encoding to send `response` with, or None. Marks it as varying."""
+    if not compressible(response):
+        return None
+    response.vary.add('Accept-Encoding')
+    return negotiate()
+
+
+def compress(data, encoding):
+    config = current_app.config
+    if encoding == 'gzip':
+        # mtime=0 keeps the output stable for identical bodies
+        return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+    if encoding == 'br':
+        return codec('br').compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    if encoding == 'zstd':
+        return codec('zstd').ZstdCompressor(level=config['COMPRESS_ZSTD_LEVEL']).compress(data)
+    raise ValueError(f'Unsupported encoding: {encoding}')
+
+
+class StreamCompressor:
+    """Incremental compressor with a uniform compress/flush/finish interface."""
+
+    def __init__(self, encoding):
+        config = current_app.config
+        self.encoding = encoding
+        if encoding == 'gzip':
+            self.obj = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+        elif encoding == 'br':
+            self.obj = codec('br').Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        elif encoding == 'zstd':
+            self.obj = codec('zstd').ZstdCompressor(level=config['COMPRESS_ZSTD_LEVEL']).compressobj()
+        else:
+            raise ValueError(f'Unsupported encoding: {encoding}')
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self.obj.process(data)
+        return self.obj.compress(data)
+
+    def flush(self):
+        if self.encoding == 'gzip':
+            return self.obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == 'br':
+            return self.obj.flush()
+        return self.obj.flush(codec('zstd').COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.obj.finish()
+        return self.obj.flush()
+
+
+def compressed_stream(chunks, encoding):
+    # Built now, while the app context that holds the levels is still active;
+    # the generator itself runs as the server sends the body
+    return compressed_chunks(chunks, StreamCompressor(encoding))
+
+
+def compressed_chunks(chunks, compressor):
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_BYTES:
+                out += compressor.flush()
+                pending = 0
+            if out:
+                yield out
+        yield compressor.finish()
+    finally:
+        # A client that disconnects closes this generator; pass that on so
+        # the wrapped stream releases its database connection
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def set_encoded_body(response, data, encoding):
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    weaken_etag(response)
+
+
+def weaken_etag(response):
+    # The bytes differ from the identity body, but it is the same entity: a
+    # weak ETag still matches If-None-Match, so 304s keep working
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+@bp.after_app_request
+def compress_response(response):
+    encoding = response_encoding(response)
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compressed_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        weaken_etag(response)
+    else:
+        set_encoded_body(response, compress(response.get_data(), encoding), encoding)
+    return response
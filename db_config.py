@@ -0,0 +1,114 @@
+# Engine options from the environment, a QueuePool that records how long
+# requests wait for a connection, and the replica-aware session class.
+# app.py imports this at module level to build `db`, so it must not import app.
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from threading import Lock
+import math
+import os
+
+try:
+    from flask_sqlalchemy.session import Session
+except ImportError:  # Flask-SQLAlchemy 2.x
+    from flask_sqlalchemy import SignallingSession as Session
+import time
+
+pool_stats_lock = Lock()
+# WSGI environ key: {sync engine: engine to use instead} for requests that
+# asgi.py runs on its event loop (see async_db.py)
+ASYNC_BINDS_KEY = 'pawsconnect.async_binds'
+
+
+def new_pool_stats():
+    return {'checkouts': 0, 'timeouts': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0}
+
+
+class TimedPool:
+    # Set by track_pool_stats; pools of engines built outside an app count nothing
+    stats = None
+
+    def recreate(self):
+        # dispose() swaps in a new pool, which keeps counting for the same app
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        stats = self.stats
+        if stats is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            with pool_stats_lock:
+                stats['timeouts'] += 1
+            raise
+        finally:
+            waited = (time.perf_counter() - start) * 1000
+            with pool_stats_lock:
+                stats['checkouts'] += 1
+                stats['wait_total_ms'] += waited
+                stats['wait_max_ms'] = max(stats['wait_max_ms'], waited)
+
+
+class TimedQueuePool(TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def track_pool_stats(engine, stats):
+    """Count `engine`'s checkouts in `stats`, an app's new_pool_stats() dict."""
+    if isinstance(engine.pool, TimedPool):
+        engine.pool.stats = stats
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS built from DB_* environment variables.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (seconds to wait for a
+    connection), DB_POOL_RECYCLE (seconds), DB_POOL_PRE_PING and
+    DB_STATEMENT_TIMEOUT_MS (PostgreSQL only).
+    """
+    uri = uri or ''
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        return {}  # In-memory SQLite needs its single-connection pool
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        # Whole seconds: Flask-SQLAlchemy builds the engine with engine_from_config,
+        # which truncates pool_timeout to an int, so 0.5 would mean no wait at all
+        'pool_timeout': math.ceil(float(os.getenv('DB_POOL_TIMEOUT', 10))),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        # Detects connections killed by a failover before a request uses them
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'True') == 'True',
+    }
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+    if statement_timeout and uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica chosen for this request.
+
+    replicas.py sets g.read_engine for GET requests. Flushes (writes) and
+    anything outside a request always use the primary. Requests run on the
+    ASGI event loop get the async-driver engine for the same database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, *args, **kwargs):
+        engine = None
+        if not self._flushing and has_app_context():
+            engine = g.get('read_engine')
+        if engine is None:
+            engine = super().get_bind(mapper, clause, *args, **kwargs)
+        if has_request_context():
+            engine = request.environ.get(ASYNC_BINDS_KEY, {}).get(engine, engine)
+        return engine
@@ -0,0 +1,454 @@
+# Change feed for dashboards: create and delete handlers publish committed
+# changes, and /api/events streams them as Server-Sent Events instead of
+# clients re-fetching whole lists.
+from flask import Blueprint, request, jsonify, Response, current_app
+from collections import deque
+from threading import Event, Lock, Thread
+from ids import next_id
+from async_db import blocking
+import asyncio
+import hashlib
+import itertools
+import os
+import socket
+import tempfile
+import time
+import weakref
+
+TOPICS = ('bookings', 'boardings', 'consultations', 'petm', 'sell_pets')
+# Rows per event for bulk creates, so every message stays small enough for
+# one datagram of the local broker
+BATCH_ROWS = 100
+MAX_MESSAGE_BYTES = 256 * 1024
+# WSGI environ keys shared with asgi.py: the server can serve streams from
+# its event loop, and the view leaves its EventStream for it to take over
+ASYNC_STREAMS_KEY = 'pawsconnect.async_streams'
+EVENT_STREAM_KEY = 'pawsconnect.event_stream'
+
+
+class MemoryBroker:
+    """Single-process delivery: publishing hands the message straight back."""
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, message):
+        self.deliver(message)
+
+    def after_fork(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class LocalBroker:
+    """Fan-out between the worker processes of one host, without a server.
+
+    Each process binds a Unix datagram socket in `socket_dir` and publishing
+    sends the message to every socket there, its own included. A stand-in
+    for Redis pub/sub when every worker runs on the same machine; a message
+    for a worker whose queue stays full for SEND_TIMEOUT is dropped.
+    """
+
+    SEND_TIMEOUT = 0.1
+
+    def __init__(self, socket_dir):
+        self.socket_dir = socket_dir
+        self.receiver = self.sender = self.path = None
+        self.dropped = 0
+
+    def start(self, deliver):
+        os.makedirs(self.socket_dir, exist_ok=True)
+        self.path = os.path.join(self.socket_dir, f'{os.getpid()}.sock')
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left by an exited process with the same pid
+        self.receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * MAX_MESSAGE_BYTES)
+        self.receiver.bind(self.path)
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender.settimeout(self.SEND_TIMEOUT)
+        Thread(target=self.listen, args=(self.receiver, deliver), name='events-local', daemon=True).start()
+
+    def listen(self, receiver, deliver):
+        while True:
+            try:
+                message = receiver.recv(MAX_MESSAGE_BYTES)
+            except OSError:
+                return  # Closed by stop()
+            try:
+                deliver(message)
+            except Exception as e:
+                print(f"Error delivering event: {str(e)}")
+
+    def publish(self, message):
+        for name in os.listdir(self.socket_dir):
+            if not name.endswith('.sock'):
+                continue
+            path = os.path.join(self.socket_dir, name)
+            try:
+                self.sender.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Nobody is bound to it any more: its process has exited
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                self.dropped += 1
+
+    def after_fork(self):
+        # The sockets and their path belong to the parent; close, never unlink
+        for sock in (self.receiver, self.sender):
+            if sock is not None:
+                sock.close()
+        self.receiver = self.sender = self.path = None
+
+    def stop(self):
+        path = self.path
+        self.after_fork()
+        if path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+class RedisBroker:
+    """Fan-out through Redis pub/sub, for workers on several hosts.
+
+    `client` is anything with redis-py's publish/pubsub signature, so tests
+    can pass a local fake instead of a real server.
+    """
+
+    def __init__(self, client, channel='minibackend:events'):
+        self.client = client
+        self.channel = channel
+        self.pubsub = None
+
+    def start(self, deliver):
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(self.channel)
+        Thread(target=self.listen, args=(self.pubsub, deliver), name='events-redis', daemon=True).start()
+
+    def listen(self, pubsub, deliver):
+        while self.pubsub is pubsub:
+            try:
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        deliver(message['data'])
+            except Exception as e:
+                if self.pubsub is not pubsub:
+                    return  # Closed by stop()
+                print(f"Error in event subscription: {str(e)}")
+                time.sleep(1)
+
+    def publish(self, message):
+        self.client.publish(self.channel, message)
+
+    def after_fork(self):
+        self.pubsub = None
+
+    def stop(self):
+        pubsub, self.pubsub = self.pubsub, None
+        if pubsub is not None:
+            pubsub.close()
+
+
+def build_broker(config):
+    backend = config['EVENTS_BACKEND']
+    if backend == 'redis':
+        import redis  # Optional dependency, only needed for the shared backend
+        return RedisBroker(redis.Redis.from_url(config['EVENTS_REDIS_URL']))
+    if backend == 'local' and hasattr(socket, 'AF_UNIX'):
+        # One feed per database: other deployments on this host stay apart
+        uri = config['SQLALCHEMY_DATABASE_URI'] or ''
+        default = os.path.join(tempfile.gettempdir(), 'paws-connect-events-' + hashlib.sha1(uri.encode('utf-8')).hexdigest()[:12])
+        return LocalBroker(config['EVENTS_SOCKET_DIR'] or default)
+    return MemoryBroker()
+
+
+class EventBus:
+    """Recent events in a bounded ring buffer, and the streams waiting on them.
+
+    Every message, this process's own included, arrives through the broker,
+    so each worker buffers the same events and a client can resume with
+    Last-Event-ID on any of them. The broker is started on first use, never
+    in a parent that is about to fork.
+
+    Control topics (see on()) carry messages between workers instead: they
+    go to a handler in every other process and are never buffered or
+    streamed.
+    """
+
+    def __init__(self, broker=None, size=1000):
+        self.broker = broker or MemoryBroker()
+        self.size = size
+        self.handlers = {}  # Control topic -> handler(data)
+        self.reset()
+        # A weak reference, so the hook does not keep a discarded app's bus alive
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref().after_fork())
+
+    def reset(self):
+        self.lock = Lock()
+        self.started = False
+        self.buffer = deque(maxlen=self.size)  # (seq, event id, topic, frame)
+        self.seq = 0
+        self.streams = set()
+        # Tags this process's control messages, so it skips its own
+        self.origin = 'w' + os.urandom(8).hex()
+
+    def after_fork(self):
+        if self.started:
+            self.broker.after_fork()
+        self.reset()
+
+    def start(self):
+        if self.started:
+            return
+        with self.lock:
+            if not self.started:
+                self.broker.start(self.deliver)
+                self.started = True
+
+    def stop(self):
+        with self.lock:
+            if self.started:
+                self.broker.stop()
+                self.started = False
+
+    def publish(self, topic, data):
+        """Sends `data` (a JSON document, as text) to the `topic` subscribers of every worker."""
+        self.start()
+        # The local broker may wait SEND_TIMEOUT per worker, Redis on the network
+        blocking(self.broker.publish, f'{next_id()} {topic}\n{data}'.encode('utf-8'))
+
+    def on(self, topic, handler):
+        """Calls `handler(data)` with what other processes broadcast() on `topic`."""
+        self.handlers[topic] = handler
+
+    def broadcast(self, topic, data):
+        """Sends `data` (text) to the `topic` handler of every other process."""
+        self.start()
+        blocking(self.broker.publish, f'{self.origin} {topic}\n{data}'.encode('utf-8'))
+
+    def deliver(self, message):
+        header, data = message.split(b'\n', 1)
+        event_id, topic = header.decode('ascii').split(' ')
+        handler = self.handlers.get(topic)
+        if handler is not None:
+            if event_id != self.origin:
+                handler(data.decode('utf-8'))
+            return
+        frame = b'id: %s\ndata: %s\n\n' % (event_id.encode('ascii'), data)
+        with self.lock:
+            self.seq += 1
+            self.buffer.append((self.seq, int(event_id), topic, frame))
+            waiting = [stream for stream in self.streams if topic in stream.topics]
+        for stream in waiting:
+            stream.notify()
+
+    def subscribe(self, stream, last_event_id=None):
+        """Registers `stream`; returns (cursor, whether events were missed).
+
+        The cursor is the last sequence number the stream has seen: the
+        buffered event with `last_event_id`, or the newest one.
+        """
+        self.start()
+        with self.lock:
+            self.streams.add(stream)
+            if last_event_id is None:
+                return self.seq, False
+            for seq, event_id, _, _ in reversed(self.buffer):
+                if event_id == last_event_id:
+                    return seq, False
+            return self.seq, True
+
+    def unsubscribe(self, stream):
+        with self.lock:
+            self.streams.discard(stream)
+
+    def read(self, cursor, topics):
+        """(frames after `cursor` for `topics`, new cursor, whether some were already evicted)."""
+        with self.lock:
+            if not self.buffer or cursor >= self.seq:
+                return [], self.seq, False
+            first = self.buffer[0][0]
+            entries = list(itertools.islice(self.buffer, max(cursor + 1 - first, 0), None))
+            return [frame for _, _, topic, frame in entries if topic in topics], self.seq, cursor + 1 < first
+
+    def latest_id(self):
+        with self.lock:
+            return self.buffer[-1][1] if self.buffer else None
+
+
+class EventStream:
+    """The SSE body for one subscriber: missed events, then live ones.
+
+    Iterating blocks a request thread, sending a comment every `heartbeat`
+    seconds while idle, until the client leaves or `max_seconds` pass;
+    EventSource then reconnects with Last-Event-ID. asgi.py awaits
+    frames_async() on its event loop instead, so idle streams hold no thread.
+    """
+
+    def __init__(self, bus, topics, last_event_id, heartbeat, max_seconds, retry_ms):
+        self.bus = bus
+        self.topics = frozenset(topics)
+        self.heartbeat = heartbeat
+        self.max_seconds = max_seconds
+        self.closed = False
+        self.wakeup = Event()
+        self.notify = self.wakeup.set
+        self.cursor, missed = bus.subscribe(self, last_event_id)
+        self.head = b'retry: %d\n\n' % retry_ms + (self.reset_frame() if missed else b'')
+
+    def reset_frame(self):
+        # Events were lost (evicted, or from before this worker started):
+        # clients reload their lists, then carry on from the newest event
+        event_id = self.bus.latest_id()
+        return (b'id: %d\n' % event_id if event_id is not None else b'') + b'event: reset\ndata: {}\n\n'
+
+    def pending(self):
+        frames, self.cursor, missed = self.bus.read(self.cursor, self.topics)
+        return (self.reset_frame() if missed else b'') + b''.join(frames)
+
+    def __iter__(self):
+        try:
+            yield self.head + self.pending()
+            deadline = time.monotonic() + self.max_seconds
+            while not self.closed and time.monotonic() < deadline:
+                self.wakeup.wait(min(self.heartbeat, max(deadline - time.monotonic(), 0)))
+                self.wakeup.clear()
+                yield self.pending() or b': keep-alive\n\n'
+        finally:
+            self.close()
+
+    async def frames_async(self):
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        self.notify = lambda: loop.call_soon_threadsafe(wakeup.set)
+        try:
+            yield self.head + self.pending()
+            deadline = time.monotonic() + self.max_seconds
+            while not self.closed and time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), min(self.heartbeat, max(deadline - time.monotonic(), 0)))
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                if not self.closed:
+                    yield self.pending() or b': keep-alive\n\n'
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.bus.unsubscribe(self)
+            self.notify()
+
+
+bp = Blueprint('events', __name__)
+stats_lock = Lock()
+
+
+def init_app(app):
+    app.extensions['events'] = EventBus(build_broker(app.config), size=app.config['EVENTS_BUFFER_SIZE'])
+    app.extensions['event_stream_stats'] = {'opened': 0, 'rejected': 0}
+
+
+def get_bus():
+    return current_app.extensions['events']
+
+
+@bp.before_app_request
+def start_bus():
+    # Listen from this worker's first request on, so its buffer can resume
+    # streams that reconnect here
+    get_bus().start()
+
+
+def count(stat):
+    stream_stats = current_app.extensions['event_stream_stats']
+    with stats_lock:
+        stream_stats[stat] += 1
+
+
+def publish(topic, action, **data):
+    """Announces a committed change to the `topic` subscribers; never raises."""
+    try:
+        message = {'topic': topic, 'action': action, **data}
+        get_bus().publish(topic, current_app.json.dumps(message, separators=(',', ':')))
+    except Exception as e:
+        print(f"Error publishing {topic} event: {str(e)}")
+
+
+def broadcast(topic, data):
+    """Control message to the other workers (see EventBus.on); never raises."""
+    try:
+        get_bus().broadcast(topic, data)
+    except Exception as e:
+        print(f"Error broadcasting {topic}: {str(e)}")
+
+
+def publish_rows(model, action, rows):
+    """Publishes created rows (column dicts) or deleted ids in batches of BATCH_ROWS."""
+    rows = list(rows)
+    for i in range(0, len(rows), BATCH_ROWS):
+        batch = rows[i:i + BATCH_ROWS]
+        if action == 'deleted':
+            publish(model.__tablename__, action, ids=batch)
+        else:
+            items = [{key: model.api_convert(key, row.get(attr)) for key, attr in model.api_fields.items()}
+                     for row in batch]
+            publish(model.__tablename__, action, items=items)
+
+
+@bp.route('/api/events', methods=['GET'])
+def get_events():
+    topics = [t for t in request.args.get('topics', '').split(',') if t] or list(TOPICS)
+    unknown = [t for t in topics if t not in TOPICS]
+    if unknown:
+        return jsonify({'error': f"Unknown topics: {', '.join(unknown)} (one of {', '.join(TOPICS)})"}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = -1  # Not one of ours: start over with a reset
+
+    config = current_app.config
+    bus = get_bus()
+    # A thread-served stream occupies a request thread for its whole life
+    served_async = request.environ.get(ASYNC_STREAMS_KEY, False)
+    limit = config['EVENTS_MAX_STREAMS'] if served_async else config['EVENTS_MAX_THREAD_STREAMS']
+    if len(bus.streams) >= limit:
+        count('rejected')
+        response = jsonify({'error': 'Too many event streams on this worker'})
+        response.headers['Retry-After'] = str(config['EVENTS_RETRY_MS'] // 1000 or 1)
+        return response, 503
+
+    stream = EventStream(bus, topics, last_event_id, heartbeat=config['EVENTS_HEARTBEAT_SECONDS'],
+                         max_seconds=config['EVENTS_STREAM_SECONDS'], retry_ms=config['EVENTS_RETRY_MS'])
+    count('opened')
+    # no-transform keeps compression (and its buffering) off the stream
+    response = Response(stream, mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'})
+    if served_async:
+        request.environ[EVENT_STREAM_KEY] = stream
+    else:
+        # Also unsubscribes a stream that is never iterated (HEAD)
+        response.call_on_close(stream.close)
+    return response
+
+
+@bp.route('/api/events/stats', methods=['GET'])
+def get_event_stats():
+    bus = get_bus()
+    return jsonify({
+        **current_app.extensions['event_stream_stats'],
+        'open': len(bus.streams),
+        'buffered': len(bus.buffer),
+        'backend': type(bus.broker).__name__,
+        'dropped': getattr(bus.broker, 'dropped', 0),
+    }), 200
@@ -0,0 +1,42 @@
+# gunicorn settings from WEB_* environment variables:
+#     gunicorn -c gunicorn.conf.py wsgi:application
+import gc
+import multiprocessing
+import os
+
+bind = f"{os.getenv('WEB_HOST', '127.0.0.1')}:{os.getenv('WEB_PORT', '8000')}"
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads per worker; keep workers * threads within the database pool sizes
+threads = int(os.getenv('WEB_THREADS', 8))
+worker_class = 'gthread'
+# Seconds a worker gets to finish in-flight requests after SIGTERM
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+keepalive = 5
+# Build the app once in the master and fork it: workers start without
+# importing anything and share the master's memory pages
+preload_app = os.getenv('WEB_PRELOAD', 'True') == 'True'
+
+
+def pre_fork(server, worker):
+    # Keeps the collector from touching (and so copying) the objects the
+    # workers inherit
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from lifecycle import after_fork
+        from wsgi import application
+        after_fork(application)
+
+
+def post_worker_init(worker):
+    from lifecycle import worker_ready
+    worker_ready(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from lifecycle import shutdown
+    if worker.wsgi is not None:
+        shutdown(worker.wsgi)
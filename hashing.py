@@ -0,0 +1,171 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, jsonify, current_app
+from threading import Lock
+import multiprocessing
+import time
+
+
+class HashingOverloaded(Exception):
+    pass
+
+
+# These run inside the pool processes and must stay top-level to be picklable.
+# bcrypt is imported there, on first use, not by the web workers.
+
+def _generate(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _check(stored_hash, password):
+    return check_password_hash(stored_hash, password)
+
+
+def _bcrypt_check(hashed, password):
+    import bcrypt
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def _bcrypt_hash(password, rounds):
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+class HashingService:
+    """Runs password hashing in a bounded process pool.
+
+    Hashing is CPU-bound for hundreds of ms; doing it in separate processes
+    keeps request threads and the GIL free. At most `queue_depth` calls may be
+    queued or running at once - beyond that calls fail fast with
+    HashingOverloaded so a login burst cannot starve other endpoints. A call
+    that times out is cancelled if it has not started, and keeps its slot
+    until the pool has finished it otherwise.
+    """
+
+    def __init__(self, workers=1, queue_depth=32, timeout=5):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.pool = None
+        self.in_flight = 0
+        self.lock = Lock()
+        self.stats = {}
+
+    def get_pool(self):
+        # Created on first use so importing the app never forks; spawn avoids
+        # inheriting locks held by other request threads
+        if self.pool is None:
+            with self.lock:
+                if self.pool is None:
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def run(self, name, fn, *args):
+        with self.lock:
+            overloaded = self.in_flight >= self.queue_depth
+            if not overloaded:
+                self.in_flight += 1
+        if overloaded:
+            self.record(name, None)
+            raise HashingOverloaded()
+        start = time.perf_counter()
+        try:
+            future = self.get_pool().submit(fn, *args)
+        except Exception:
+            self.release()
+            raise
+        # The slot is held until the pool is done with the call, not until
+        # the caller stops waiting: a timed-out call may still be running
+        future.add_done_callback(self.release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # Only succeeds while it is still queued
+            raise HashingOverloaded()
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def release(self, future=None):
+        with self.lock:
+            self.in_flight -= 1
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def record(self, name, seconds):
+        with self.lock:
+            entry = self.stats.setdefault(name, {'calls': 0, 'rejected': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            if seconds is None:
+                entry['rejected'] += 1
+                return
+            ms = seconds * 1000
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+
+
+bp = Blueprint('hashing', __name__)
+hash_prefix = {}
+
+
+def init_app(app):
+    app.extensions['hashing'] = HashingService(workers=app.config['HASH_WORKERS'],
+                                               queue_depth=app.config['HASH_QUEUE_DEPTH'],
+                                               timeout=app.config['HASH_TIMEOUT'])
+
+
+def get_hashing():
+    return current_app.extensions['hashing']
+
+
+def hash_password(password):
+    return get_hashing().run('hash', _generate, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(stored_hash, password):
+    return get_hashing().run('verify', _check, stored_hash, password)
+
+
+def password_needs_rehash(stored_hash):
+    # werkzeug hashes look like "<method with parameters>$<salt>$<hash>"; compare
+    # the method part with what the configured method produces today
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in hash_prefix:
+        hash_prefix[method] = get_hashing().run('hash', _generate, '', method).split('$', 1)[0]
+    return stored_hash.split('$', 1)[0] != hash_prefix[method]
+
+
+def verify_bcrypt(hashed, password):
+    return get_hashing().run('bcrypt_verify', _bcrypt_check, hashed, password)
+
+
+def hash_bcrypt(password):
+    return get_hashing().run('bcrypt_hash', _bcrypt_hash, password, current_app.config['BCRYPT_ROUNDS'])
+
+
+def bcrypt_needs_rehash(hashed):
+    # $2b$12$... - the cost is the second field
+    try:
+        return int(hashed.split('$')[2]) != current_app.config['BCRYPT_ROUNDS']
+    except (IndexError, ValueError):
+        return False
+
+
+def overloaded_response():
+    response = jsonify({'error': 'Too many login attempts in progress, try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+
+@bp.route('/api/hashing/stats', methods=['GET'])
+def get_hashing_stats():
+    hashing = get_hashing()
+    with hashing.lock:
+        stats = {name: {**entry, 'avg_ms': entry['total_ms'] / entry['calls'] if entry['calls'] else 0.0}
+                 for name, entry in hashing.stats.items()}
+        in_flight = hashing.in_flight
+    return jsonify({'inFlight': in_flight, 'queueDepth': hashing.queue_depth, 'calls': stats}), 200
@@ -0,0 +1,51 @@
+from flask import Blueprint, jsonify, current_app
+from app import db
+from db_config import pool_stats_lock
+
+bp = Blueprint('health', __name__)
+
+
+def pool_stats():
+    """Checkouts, timeouts and waits of this app's pools (primary and replicas)."""
+    with pool_stats_lock:
+        return dict(current_app.extensions['pool_stats'])
+
+
+def pool_status():
+    pool = db.engine.pool
+    status = pool_stats()
+    if hasattr(pool, 'checkedout'):
+        status.update({
+            'size': pool.size(),
+            'checkedOut': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'maxOverflow': pool._max_overflow,
+        })
+    return status
+
+
+@bp.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the process is serving requests; no database access
+    return jsonify({'status': 'ok'}), 200
+
+
+@bp.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: refuse traffic when every pooled connection is busy, without
+    # queueing for one; otherwise confirm the database answers
+    status = pool_status()
+    if 'checkedOut' in status and status['checkedOut'] >= status['size'] + status['maxOverflow']:
+        return jsonify({'status': 'pool exhausted', 'pool': status}), 503
+    try:
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('SELECT 1')
+    except Exception as e:
+        print(f"Error in readyz: {str(e)}")
+        return jsonify({'status': 'database unavailable', 'pool': status}), 503
+    return jsonify({'status': 'ready', 'pool': status}), 200
+
+
+@bp.route('/api/db/pool-stats', methods=['GET'])
+def get_pool_stats():
+    return jsonify(pool_status()), 200
@@ -0,0 +1,138 @@
+from flask import current_app
+from threading import Lock
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Snowflake-style ids: milliseconds since EPOCH_MS, then the worker id, then
+# a per-worker sequence. 41 + 6 + 6 bits keeps every id below 2**53, so
+# JavaScript clients read them exactly, until 2089. Ids from one worker
+# increase strictly; across workers they are ordered to the millisecond.
+EPOCH_MS = 1577836800000  # 2020-01-01T00:00:00Z
+WORKER_BITS = 6
+SEQUENCE_BITS = 6
+MAX_WORKERS = 1 << WORKER_BITS
+# A worker that runs out of sequence numbers borrows later milliseconds; it
+# waits rather than run further than this ahead of the clock. A new process
+# waits this long before its first id, in case the previous holder of its
+# worker id exited with borrowed milliseconds still in the future.
+MAX_BORROW_MS = 50
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), 'paws-connect-ids')
+
+
+class IdGenerator:
+    """Thread-safe, time-ordered 53-bit id source for one app in one process.
+
+    The lock only guards one counter; ids are composed outside it, and
+    reserve(n) hands out a whole block for one acquisition. The worker id is
+    ID_WORKER_ID if set, otherwise ID_WORKER_BASE plus a slot below
+    ID_HOST_WORKERS leased by holding an flock on ID_LOCK_DIR/worker-<id>.lock
+    for the life of the process, so concurrent processes on one host never
+    share one, and hosts with disjoint ranges never do either. Forked
+    children lease their own.
+    """
+
+    def __init__(self):
+        # Set from ID_WORKER_ID / ID_WORKER_BASE / ID_HOST_WORKERS / ID_LOCK_DIR by init_app
+        self.configured_worker_id = None
+        self.worker_base = 0
+        self.host_workers = MAX_WORKERS
+        self.lock_dir = DEFAULT_LOCK_DIR
+        self.lease = None
+        self.reset()
+        os.register_at_fork(after_in_child=self.after_fork)
+
+    def reset(self):
+        self.lock = Lock()
+        self.worker_id = None
+        # Next (milliseconds << SEQUENCE_BITS | sequence) to hand out
+        self.next_tick = 0
+
+    def after_fork(self):
+        # The parent's lease and lock are not ours; close, never unlock, the
+        # inherited file so the parent keeps its slot
+        if self.lease is not None:
+            self.lease.close()
+            self.lease = None
+        self.reset()
+
+    def acquire_worker_id(self):
+        if self.configured_worker_id is not None:
+            worker_id = int(self.configured_worker_id)
+            if not 0 <= worker_id < MAX_WORKERS:
+                raise ValueError(f'ID_WORKER_ID must be between 0 and {MAX_WORKERS - 1}')
+            return worker_id
+        if not (0 <= self.worker_base and 0 < self.host_workers and self.worker_base + self.host_workers <= MAX_WORKERS):
+            raise ValueError(f'ID_WORKER_BASE + ID_HOST_WORKERS must be at most {MAX_WORKERS}')
+        if fcntl is None:
+            return self.worker_base + os.getpid() % self.host_workers
+        lock_dir = self.lock_dir
+        os.makedirs(lock_dir, exist_ok=True)
+        for worker_id in range(self.worker_base, self.worker_base + self.host_workers):
+            lease = open(os.path.join(lock_dir, f'worker-{worker_id}.lock'), 'a')
+            try:
+                fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lease.close()
+                continue
+            self.lease = lease
+            return worker_id
+        raise RuntimeError(f'All {self.host_workers} id worker slots from {self.worker_base} in {lock_dir} are in use')
+
+    def reserve(self, count=1):
+        """`count` consecutive ids from this worker, as a list."""
+        while True:
+            now = (time.time_ns() // 1000000 - EPOCH_MS) << SEQUENCE_BITS
+            with self.lock:
+                if self.worker_id is None:
+                    self.worker_id = self.acquire_worker_id()
+                    time.sleep(MAX_BORROW_MS / 1000)
+                    continue
+                start = max(self.next_tick, now)
+                ahead_ms = (start + count - now) >> SEQUENCE_BITS
+                if ahead_ms <= MAX_BORROW_MS or start == now:
+                    self.next_tick = start + count
+                    break
+            time.sleep((ahead_ms - MAX_BORROW_MS + 1) / 1000)
+        worker = self.worker_id << SEQUENCE_BITS
+        mask = (1 << SEQUENCE_BITS) - 1
+        return [(tick >> SEQUENCE_BITS << (WORKER_BITS + SEQUENCE_BITS)) | worker | (tick & mask)
+                for tick in range(start, start + count)]
+
+    def next_id(self):
+        return self.reserve(1)[0]
+
+    def release(self):
+        """Give the worker id back; the next id leases one again."""
+        with self.lock:
+            if self.lease is not None:
+                self.lease.close()
+                self.lease = None
+            self.worker_id = None
+
+
+def id_time(id_value):
+    """Unix time in seconds at which an id was generated (or borrowed for)."""
+    return ((id_value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000
+
+
+def init_app(app):
+    generator = app.extensions['ids'] = IdGenerator()
+    generator.configured_worker_id = app.config['ID_WORKER_ID']
+    generator.worker_base = app.config['ID_WORKER_BASE']
+    generator.host_workers = app.config['ID_HOST_WORKERS']
+    generator.lock_dir = app.config['ID_LOCK_DIR'] or DEFAULT_LOCK_DIR
+
+
+def get_id_generator():
+    return current_app.extensions['ids']
+
+
+def next_id():
+    """The next id from the current app's generator (the models' column default)."""
+    return current_app.extensions['ids'].next_id()
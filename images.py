@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from threading import Lock
+from app import db
+import os
+
+# Resized WebP variants produced for every upload: name -> longest side in px
+IMAGE_VARIANTS = {'thumb': 320, 'medium': 1024}
+
+# One pool per app, started on its first upload, so a pre-fork master never
+# holds its threads
+image_pool_lock = Lock()
+
+
+def get_image_pool(app):
+    with image_pool_lock:
+        pool = app.extensions.get('image_pool')
+        if pool is None:
+            pool = app.extensions['image_pool'] = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'],
+                                                                     thread_name_prefix='images')
+        return pool
+
+
+def shutdown_image_pool(app, wait=True):
+    with image_pool_lock:
+        pool = app.extensions.pop('image_pool', None)
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def variant_name(image_name, variant):
+    stem = image_name.rsplit('.', 1)[0]
+    return f"{stem}_{variant}.webp"
+
+
+def make_variants(image_name):
+    # Pillow is only needed by the workers, so import it here
+    from PIL import Image, ImageOps
+
+    folder = current_app.config['UPLOAD_FOLDER']
+    variants = {}
+    with Image.open(os.path.join(folder, image_name)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+        for variant, size in IMAGE_VARIANTS.items():
+            name = variant_name(image_name, variant)
+            variants[variant] = name
+            if os.path.exists(os.path.join(folder, name)):
+                continue  # Same content was uploaded before
+            resized = original.copy()
+            resized.thumbnail((size, size))
+            resized.save(os.path.join(folder, name), 'WEBP', quality=80, method=4)
+    return variants
+
+
+def process_image(model, row_id, image_name, on_done=None):
+    # Needs an app context: the upload folder and the session come from it
+    try:
+        variants = make_variants(image_name)
+        model.query.filter_by(id=row_id, image_name=image_name).update({'image_variants': variants})
+        db.session.commit()
+        if on_done:
+            on_done()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error processing image {image_name}: {str(e)}")
+
+
+def process_in_context(app, *args):
+    with app.app_context():
+        process_image(*args)
+
+
+def submit_image(model, row_id, image_name, on_done=None):
+    # Runs after the row is committed; the request returns without waiting
+    app = current_app._get_current_object()
+    get_image_pool(app).submit(process_in_context, app, model, row_id, image_name, on_done)
@@ -0,0 +1,42 @@
+# JSON provider that encodes compact responses (jsonify) with orjson when it
+# is installed, falling back to Flask's encoder for anything orjson would
+# write differently. create_app loads it when FAST_JSON is on; it must not
+# import app, which imports it.
+from flask.json.provider import DefaultJSONProvider
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Output where orjson and the stdlib encoder can disagree: non-ASCII (the
+# stdlib escapes it), DEL, and floats written with an exponent or as a long
+# decimal fraction. A match only costs a re-encode, so false positives from
+# string contents are harmless.
+DIFFERS = re.compile(rb'[^\x00-\x7e]|[0-9][eE]|0\.0000')
+COMPACT = (',', ':')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider whose compact output comes from orjson.
+
+    Produces the same bytes as the default provider, except that NaN and
+    Infinity (not valid JSON) are written as null. Indented output (debug
+    mode) and explicit json.dumps() calls with other arguments use the
+    default encoder unchanged.
+    """
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs == {'separators': COMPACT} and self.sort_keys and self.ensure_ascii:
+            try:
+                # Dates and dataclasses go through Flask's default() (HTTP dates, asdict)
+                encoded = orjson.dumps(obj, default=self.default, option=self.option)
+            except TypeError:
+                pass  # Non-string keys, integers over 64 bits, unknown types
+            else:
+                if not DIFFERS.search(encoded):
+                    return encoded.decode('ascii')
+        return super().dumps(obj, **kwargs)
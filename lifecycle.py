@@ -0,0 +1,45 @@
+# Fork and graceful shutdown hooks shared by the production entry points
+# (wsgi.py / gunicorn.conf.py and asgi.py).
+from app import db
+
+
+def after_fork(app):
+    """Run in each worker forked from an app preloaded in the parent.
+
+    create_app() opens no connections and starts no threads, but anything
+    pooled in the parent since is dropped without closing it: those sockets
+    still belong to the parent.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+    for engine in app.extensions['replicas'].engines:
+        engine.dispose(close=False)
+
+
+def worker_ready(app):
+    """Run in each worker once it serves requests.
+
+    Starts the change feed listener now rather than on the first request, so
+    the worker also gets the cache invalidations and token revocations that
+    other workers send before then.
+    """
+    app.extensions['events'].start()
+
+
+def shutdown(app, wait=True):
+    """Let background work finish, then close pooled connections.
+
+    Pending image variants are completed (wait=True) or dropped, the
+    password hashing processes and the change feed listener are stopped,
+    every engine is disposed and the id worker slot is given back.
+    """
+    from images import shutdown_image_pool
+    shutdown_image_pool(app, wait=wait)
+    app.extensions['hashing'].shutdown(wait=wait)
+    app.extensions['events'].stop()
+    with app.app_context():
+        db.engine.dispose()
+    for engine in app.extensions['replicas'].engines:
+        engine.dispose()
+    app.extensions['ids'].release()
+    print('Background workers stopped and database connections closed')
@@ -0,0 +1,79 @@
+# Maintenance commands: python manage.py <command>
+import argparse
+from datetime import date, datetime, timedelta
+from app import create_app, db
+
+
+def init_db(args):
+    # Creates missing tables and their indexes; existing tables are untouched
+    db.create_all()
+    print('Database tables created')
+
+
+def migrate_uploads(args):
+    from storage import migrate_flat_uploads
+    moved, unreferenced = migrate_flat_uploads(dry_run=args.dry_run)
+    print(f"{'Would move' if args.dry_run else 'Moved'} {moved} uploads into the content-addressed store")
+    for name in unreferenced:
+        print(f"Unreferenced file left in place: {name}")
+
+
+def rebuild_boarding_rollup(args):
+    from analytics import rebuild_boarding_rollup
+    boardings, rows = rebuild_boarding_rollup(batch_size=args.batch_size)
+    print(f"Rebuilt boarding_daily: {rows} rows from {boardings} boardings")
+
+
+def analyze(args):
+    # Planner statistics: without them SQLite reads every match of a common
+    # filter through its index and sorts them for the page, where walking the
+    # primary key would stop after a page. PostgreSQL's autovacuum does this.
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    print('Statistics updated')
+
+
+def archive(args):
+    from flask import current_app
+    from archive import RETENTION, archive
+    if args.before:
+        cutoff = datetime.strptime(args.before, '%Y-%m-%d').date()
+    else:
+        days = args.older_than_days if args.older_than_days is not None else current_app.config['ARCHIVE_AFTER_DAYS']
+        cutoff = date.today() - timedelta(days=days)
+    for name in args.tables.split(','):
+        if name not in RETENTION:
+            raise SystemExit(f"Unknown table: {name} (one of {', '.join(RETENTION)})")
+        archive(name, cutoff, batch_size=args.batch_size, max_rate=args.max_rate, pause=args.pause,
+                dry_run=args.dry_run)
+
+
+parser = argparse.ArgumentParser(description='Paws Connect maintenance commands')
+commands = parser.add_subparsers(dest='command', required=True)
+
+commands.add_parser('init-db', help='create missing tables').set_defaults(func=init_db)
+
+cmd = commands.add_parser('migrate-uploads', help='move flat uploads into the content-addressed store')
+cmd.add_argument('--dry-run', action='store_true')
+cmd.set_defaults(func=migrate_uploads)
+
+cmd = commands.add_parser('rebuild-boarding-rollup', help='recompute the daily boarding occupancy/revenue rollup')
+cmd.add_argument('--batch-size', type=int, default=1000)
+cmd.set_defaults(func=rebuild_boarding_rollup)
+
+commands.add_parser('analyze', help='update the query planner statistics').set_defaults(func=analyze)
+
+cmd = commands.add_parser('archive', help='move finished bookings, boardings and consultations to the archive tables')
+cmd.add_argument('--tables', default='bookings,boardings,consultations')
+cmd.add_argument('--older-than-days', type=int, help='default: ARCHIVE_AFTER_DAYS')
+cmd.add_argument('--before', metavar='YYYY-MM-DD', help='archive rows that finished before this date instead')
+cmd.add_argument('--batch-size', type=int, default=1000, help='rows moved per transaction')
+cmd.add_argument('--max-rate', type=int, default=0, help='rows per second at most (0: no limit)')
+cmd.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+cmd.add_argument('--dry-run', action='store_true', help='only count the rows that would move')
+cmd.set_defaults(func=archive)
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    with create_app().app_context():
+        args.func(args)
@@ -0,0 +1,222 @@
+# Pet listings (petm) and pets for sale, with their image uploads.
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import db
+from models import Petm, SellPet
+from pagination import paginated_response
+from search import filter_catalogue
+from cache import cached_response, invalidate
+from events import publish
+from images import submit_image
+from storage import store_upload, release_upload, remove_unreferenced, UploadTooLarge
+
+bp = Blueprint('marketplace', __name__)
+
+
+# Define allowed_file function to check file extensions
+def allowed_file(filename):
+    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+# @bp.route('/pets', methods=['POST'])
+# @jwt_required()
+# def add_pet():
+#     data = request.get_json()
+
+#     if not all(k in data for k in ['name', 'species', 'breed', 'contact_email']):
+#         return jsonify({'error': 'Missing required fields'}), 400
+
+#     try:
+#         new_pet = Pet(
+#             name=data['name'],
+#             species=data['species'],
+#             breed=data['breed'],
+#             age=data.get('age'),
+#             description=data.get('description'),
+#             contact_email=data['contact_email'],
+#             contact_phone=data.get('contact_phone')
+#         )
+
+#         db.session.add(new_pet)
+#         db.session.commit()
+
+#         return jsonify({'message': 'Pet added successfully!'}), 201
+#     except Exception as e:
+#         db.session.rollback()
+#         return jsonify({'error': str(e)}), 500
+
+# @bp.route('/pets', methods=['GET'])
+# def get_pets():
+#     pets = Pet.query.all()
+#     pets_data = [
+#         {
+#             "id": pet.id,
+#             "name": pet.name,
+#             "species": pet.species,
+#             "breed": pet.breed,
+#             "age": pet.age,
+#             "description": pet.description,
+#             "contact_email": pet.contact_email,
+#             "contact_phone": pet.contact_phone
+#         }
+#         for pet in pets
+#     ]
+#     return jsonify(pets_data), 200
+
+# @bp.route('/pets/<int:pet_id>', methods=['DELETE'])
+# @jwt_required()
+# def delete_pet(pet_id):
+#     pet = Pet.query.get(pet_id)
+
+#     if not pet:
+#         return jsonify({'error': 'Pet not found'}), 404
+
+#     try:
+#         db.session.delete(pet)
+#         db.session.commit()
+#         return jsonify({'message': 'Pet deleted successfully'}), 200
+#     except Exception as e:
+#         db.session.rollback()
+#         return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/petm', methods=['POST'])
+def create_petm():
+    try:
+        # Check for required fields in form data
+        if not all(k in request.form for k in ['name', 'species', 'breed', 'age', 'vaccination', 'aggression']):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        # Handle file upload
+        image_name = image_hash = None
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and allowed_file(file.filename):
+                # Stored under its content hash; identical photos share one file
+                image_name, image_hash = store_upload(file)
+
+        petm = Petm(
+            name=request.form['name'],
+            species=request.form['species'],
+            breed=request.form['breed'],
+            age=int(request.form['age']),
+            vaccination_status=request.form['vaccination'],
+            aggression_level=request.form['aggression'],
+            image_name=image_name,
+            image_hash=image_hash
+        )
+        db.session.add(petm)
+        db.session.commit()
+        invalidate('petm')
+        item = petm.to_dict()
+        publish('petm', 'created', items=[item])
+        if image_name:
+            submit_image(Petm, petm.id, image_name, on_done=lambda: invalidate('petm'))
+        return jsonify(item), 201
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except RequestEntityTooLarge:
+        return jsonify({'error': f"Request exceeds {current_app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in create_petm: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/petm', methods=['GET'])
+@cached_response('petm')
+def get_petm():
+    try:
+        query = filter_catalogue(Petm, Petm.query)
+        return paginated_response(Petm, query, [])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_petm: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/petm/<int:petm_id>', methods=['DELETE'])
+def delete_petm(petm_id):
+    try:
+        petm = Petm.query.get_or_404(petm_id)
+        # Delete the image file once no other listing uses it
+        unreferenced = release_upload(petm.image_name) if petm.image_name else None
+        db.session.delete(petm)
+        db.session.commit()
+        remove_unreferenced(unreferenced)
+        invalidate('petm')
+        publish('petm', 'deleted', ids=[petm_id])
+        return jsonify({'message': 'Pet deleted'}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in delete_petm: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+@bp.route('/api/sell_pets', methods=['POST'])
+def create_sell_pet():
+    try:
+        if not all(k in request.form for k in ['name', 'species', 'breed', 'contact_email', 'price']):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        image_name = image_hash = None
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and allowed_file(file.filename):
+                image_name, image_hash = store_upload(file)
+
+        sell_pet = SellPet(
+            name=request.form['name'],
+            species=request.form['species'],
+            breed=request.form['breed'],
+            age=int(request.form.get('age', 0)),
+            description=request.form.get('pet-desc'),
+            image_name=image_name,
+            image_hash=image_hash,
+            contact_email=request.form['contact_email'],
+            contact_phone=request.form.get('contact_phone'),
+            price=int(request.form['price'])  # New price field
+        )
+        db.session.add(sell_pet)
+        db.session.commit()
+        invalidate('sell_pets')
+        item = sell_pet.to_dict()
+        publish('sell_pets', 'created', items=[item])
+        if image_name:
+            submit_image(SellPet, sell_pet.id, image_name, on_done=lambda: invalidate('sell_pets'))
+        return jsonify(item), 201
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except RequestEntityTooLarge:
+        return jsonify({'error': f"Request exceeds {current_app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in create_sell_pet: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/sell_pets', methods=['GET'])
+@cached_response('sell_pets')
+def get_sell_pets():
+    try:
+        query = filter_catalogue(SellPet, SellPet.query)
+        return paginated_response(SellPet, query, [])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_sell_pets: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/sell_pets/<int:pet_id>', methods=['DELETE'])
+def delete_sell_pet(pet_id):
+    try:
+        sell_pet = SellPet.query.get_or_404(pet_id)
+        unreferenced = release_upload(sell_pet.image_name) if sell_pet.image_name else None
+        db.session.delete(sell_pet)
+        db.session.commit()
+        remove_unreferenced(unreferenced)
+        invalidate('sell_pets')
+        publish('sell_pets', 'deleted', ids=[pet_id])
+        return jsonify({'message': 'Pet deleted'}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in delete_sell_pet: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,43 @@
+from flask import Blueprint, send_file, make_response, abort, current_app
+from werkzeug.security import safe_join
+import mimetypes
+import os
+import re
+
+# Content-addressed names from storage.py (and their variants): the hash in the
+# path changes whenever the bytes do, so these can be cached forever.
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(?:_\w+)?\.\w+$')
+
+bp = Blueprint('media', __name__)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+LEGACY_MAX_AGE = 3600
+
+
+@bp.route('/media/<path:name>', methods=['GET'])
+def get_media(name):
+    config = current_app.config
+    path = safe_join(config['UPLOAD_FOLDER'], name)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    match = CONTENT_ADDRESSED.match(name)
+    etag = os.path.basename(name) if match else None
+
+    if config['MEDIA_ACCEL_PREFIX']:
+        # Let nginx stream the file with sendfile; it handles Range and
+        # conditional requests against the internal location itself
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = config['MEDIA_ACCEL_PREFIX'].rstrip('/') + '/' + name
+        response.headers['Content-Type'] = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    else:
+        # send_file answers Range and If-None-Match / If-Modified-Since, and
+        # hands the file to the server's wsgi.file_wrapper (or X-Sendfile when
+        # USE_X_SENDFILE is on) instead of copying it through Python
+        response = send_file(path, conditional=True, etag=etag or True, max_age=LEGACY_MAX_AGE)
+
+    if match:
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={LEGACY_MAX_AGE}'
+    return response
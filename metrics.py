@@ -0,0 +1,199 @@
+from flask import Blueprint, request, g, has_request_context, Response, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from threading import Lock
+import json
+import time
+
+# Request latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+bp = Blueprint('metrics', __name__)
+
+
+class RouteMetrics:
+    """One app's request counters, by route."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latency = {}    # (route, method) -> [bucket counts..., +Inf count, sum]
+        self.requests = {}   # (route, method, status) -> count
+        self.payload = {}    # (route, method) -> [bytes sum, responses]
+        self.queries = {}    # (route, method) -> [query count, db seconds]
+
+    def record(self, stats, route, method, status, slow):
+        elapsed = time.perf_counter() - stats.start
+        key = (route, method)
+        with self.lock:
+            histogram = self.latency.setdefault(key, [0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    histogram[i] += 1
+            histogram[len(BUCKETS)] += 1
+            histogram[len(BUCKETS) + 1] += elapsed
+            self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+            sizes = self.payload.setdefault(key, [0, 0])
+            sizes[0] += stats.bytes
+            sizes[1] += 1
+            db = self.queries.setdefault(key, [0, 0.0])
+            db[0] += stats.queries
+            db[1] += stats.db_time
+
+        if slow is None:
+            return
+        slow_ms, slow_queries = slow
+        if elapsed * 1000 >= slow_ms or stats.queries >= slow_queries:
+            print(json.dumps({
+                'event': 'slow_request',
+                'route': route,
+                'method': method,
+                'status': status,
+                'duration_ms': round(elapsed * 1000, 2),
+                'queries': stats.queries,
+                'db_ms': round(stats.db_time * 1000, 2),
+                'bytes': stats.bytes,
+            }))
+
+
+def init_app(app):
+    app.extensions['metrics'] = RouteMetrics()
+
+
+class RequestStats:
+    __slots__ = ('start', 'queries', 'db_time', 'bytes')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.bytes = 0
+
+
+# Query counting hooks on every engine (primary and replicas)
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    finish_query(conn)
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(context):
+    # A failed statement never reaches after_cursor_execute; without this its
+    # start time would stay on the connection and time the next query. Errors
+    # outside a statement (connect, commit) have no execution context.
+    if context.execution_context is not None and context.connection.info.get('query_start'):
+        finish_query(context.connection)
+
+
+def finish_query(conn):
+    started = conn.info['query_start'].pop()
+    if has_request_context():
+        stats = g.get('request_stats')
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - started
+
+
+@bp.before_app_request
+def start_request_stats():
+    g.request_stats = RequestStats()
+
+
+def counted(iterable, stats):
+    for chunk in iterable:
+        stats.bytes += len(chunk)
+        yield chunk
+
+
+@bp.after_app_request
+def record_request_stats(response):
+    stats = g.get('request_stats')
+    if stats is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method, status = request.method, response.status_code
+
+    if response.is_streamed:
+        # Count bytes as they are sent; everything is recorded once the
+        # server has finished sending the stream
+        response.response = counted(response.response, stats)
+    else:
+        stats.bytes = response.content_length or 0
+    # Runs after the app context is gone, so the counters and thresholds go
+    # along. Event streams stay open by design: counted, but never logged as slow.
+    config, metrics = current_app.config, current_app.extensions['metrics']
+    slow = None if response.mimetype == 'text/event-stream' else (config['SLOW_REQUEST_MS'], config['SLOW_REQUEST_QUERIES'])
+    response.call_on_close(lambda: metrics.record(stats, route, method, status, slow))
+    return response
+
+
+def labels(**values):
+    pairs = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in values.items())
+    return '{' + pairs + '}'
+
+
+def render_metrics():
+    metrics = current_app.extensions['metrics']
+    lines = []
+    with metrics.lock:
+        lines.append('# HELP http_request_duration_seconds Request latency by route.')
+        lines.append('# TYPE http_request_duration_seconds histogram')
+        for (route, method), histogram in sorted(metrics.latency.items()):
+            for bound, count in zip(BUCKETS, histogram):
+                lines.append(f'http_request_duration_seconds_bucket{labels(route=route, method=method, le=bound)} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{labels(route=route, method=method, le="+Inf")} {histogram[len(BUCKETS)]}')
+            lines.append(f'http_request_duration_seconds_sum{labels(route=route, method=method)} {histogram[len(BUCKETS) + 1]}')
+            lines.append(f'http_request_duration_seconds_count{labels(route=route, method=method)} {histogram[len(BUCKETS)]}')
+
+        lines.append('# HELP http_requests_total Requests by route and status.')
+        lines.append('# TYPE http_requests_total counter')
+        for (route, method, status), count in sorted(metrics.requests.items()):
+            lines.append(f'http_requests_total{labels(route=route, method=method, status=status)} {count}')
+
+        lines.append('# HELP http_response_bytes Response body size by route.')
+        lines.append('# TYPE http_response_bytes summary')
+        for (route, method), (total, count) in sorted(metrics.payload.items()):
+            lines.append(f'http_response_bytes_sum{labels(route=route, method=method)} {total}')
+            lines.append(f'http_response_bytes_count{labels(route=route, method=method)} {count}')
+
+        lines.append('# HELP db_queries_total SQL statements executed while serving a route.')
+        lines.append('# TYPE db_queries_total counter')
+        for (route, method), (count, _) in sorted(metrics.queries.items()):
+            lines.append(f'db_queries_total{labels(route=route, method=method)} {count}')
+        lines.append('# HELP db_query_duration_seconds_total Time spent in SQL while serving a route.')
+        lines.append('# TYPE db_query_duration_seconds_total counter')
+        for (route, method), (_, seconds) in sorted(metrics.queries.items()):
+            lines.append(f'db_query_duration_seconds_total{labels(route=route, method=method)} {seconds}')
+
+    # Counters kept by other modules
+    from cache import get_cache_counts, get_cache
+    from health import pool_stats
+    lines.append('# TYPE response_cache_events_total counter')
+    for name, value in list(get_cache_counts().items()) + [('evictions', getattr(get_cache(), 'evictions', 0))]:
+        lines.append(f'response_cache_events_total{labels(event=name)} {value}')
+    from admission import get_admission
+    admission = get_admission()
+    lines.append('# TYPE admission_rejections_total counter')
+    for name, reasons in admission.rejection_counts().items():
+        for reason, value in reasons.items():
+            lines.append(f'admission_rejections_total{labels(route_class=name, reason=reason)} {value}')
+    lines.append('# TYPE admission_in_flight gauge')
+    for name, gate in admission.gates.items():
+        lines.append(f'admission_in_flight{labels(route_class=name)} {gate.in_flight}')
+    pool = pool_stats()
+    lines.append('# TYPE db_pool_checkouts_total counter')
+    lines.append(f"db_pool_checkouts_total {pool['checkouts']}")
+    lines.append('# TYPE db_pool_timeouts_total counter')
+    lines.append(f"db_pool_timeouts_total {pool['timeouts']}")
+    lines.append('# TYPE db_pool_wait_seconds_total counter')
+    lines.append(f"db_pool_wait_seconds_total {pool['wait_total_ms'] / 1000}")
+    return '\n'.join(lines) + '\n'
+
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
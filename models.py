@@ -1,8 +1,78 @@
-from app import db, app
-from datetime import datetime
+from flask import current_app
+from app import db
+from datetime import date, datetime
+from ids import next_id
+
+
+# Shared serialization for the API models. `api_fields` maps each key in the
+# JSON output to the column it is read from, so list endpoints can project
+# (`?fields=`) and only load the columns they actually send.
+class ApiModel(db.Model):
+    __abstract__ = True
+    api_fields = {}
+    # Keys whose output api_convert computes from the column value, beyond dates
+    api_computed = ()
+
+    @classmethod
+    def api_convert(cls, key, value):
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    def api_value(self, key):
+        return self.api_convert(key, getattr(self, self.api_fields[key]))
+
+    def to_dict(self, fields=None):
+        return {key: self.api_value(key) for key in (fields or self.api_fields)}
+
+    @classmethod
+    def api_columns(cls, fields, entity=None):
+        # `entity` is the model itself or an alias of it (e.g. over a union)
+        entity = entity or cls
+        return [getattr(entity, cls.api_fields[key]) for key in fields]
+
+    @classmethod
+    def row_serializer(cls, fields=None):
+        """Function mapping a row of api_columns(fields) to the to_dict() output.
+
+        Lets list endpoints select plain column tuples instead of hydrating
+        ORM objects. Only keys that need converting pay for a call.
+        """
+        keys = tuple(fields or cls.api_fields)
+        converted = []
+        for i, key in enumerate(keys):
+            column = cls.__table__.c[cls.api_fields[key]]
+            try:
+                is_date = issubclass(column.type.python_type, date)
+            except NotImplementedError:
+                is_date = False
+            if is_date or key in cls.api_computed:
+                converted.append((i, key))
+
+        def serialize(row):
+            item = dict(zip(keys, row))
+            for i, key in converted:
+                item[key] = cls.api_convert(key, row[i])
+            return item
+        return serialize
+
+
+def search_document(*columns):
+    # Full-text document for the catalogue search. Built from immutable
+    # functions and inline literals only, so the query expression is exactly
+    # the one PostgreSQL indexed.
+    empty, space = db.literal_column("''"), db.literal_column("' '")
+    text = db.func.coalesce(columns[0], empty)
+    for column in columns[1:]:
+        text = text.op('||')(space).op('||')(db.func.coalesce(column, empty))
+    return db.func.to_tsvector(db.literal_column("'simple'"), text)
+
+
+def upload_url(name):
+    return f"{current_app.config['MEDIA_BASE_URL'].rstrip('/')}/{name}"
 
 # User Model
-class User(db.Model):
+class User(ApiModel):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -11,11 +81,19 @@ class User(db.Model):
     role = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    api_fields = {
+        'id': 'id',
+        'name': 'name',
+        'email': 'email',
+        'role': 'role',
+        'created_at': 'created_at'
+    }
+
 
 
-class Booking(db.Model):
+class Booking(ApiModel):
     __tablename__ = 'bookings'
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(db.BigInteger, primary_key=True, default=next_id)
     pet_name = db.Column(db.String(100), nullable=False)
     service = db.Column(db.String(50), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -23,19 +101,23 @@ class Booking(db.Model):
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'petName': self.pet_name,
-            'service': self.service,
-            'date': self.date.isoformat(),
-            'time': self.time,
-            'notes': self.notes
-        }
-
-class Boarding(db.Model):
+    __table_args__ = (
+        db.Index('ix_bookings_date_time_id', 'date', 'time', 'id'),
+        db.UniqueConstraint('service', 'date', 'time', name='uq_bookings_service_slot'),
+    )
+
+    api_fields = {
+        'id': 'id',
+        'petName': 'pet_name',
+        'service': 'service',
+        'date': 'date',
+        'time': 'time',
+        'notes': 'notes'
+    }
+
+class Boarding(ApiModel):
     __tablename__ = 'boardings'
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(db.BigInteger, primary_key=True, default=next_id)
     pet_name = db.Column(db.String(100), nullable=False)
     package_type = db.Column(db.String(50), nullable=False)
     check_in = db.Column(db.Date, nullable=False)
@@ -44,20 +126,31 @@ class Boarding(db.Model):
     total_price = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'petName': self.pet_name,
-            'packageType': self.package_type,
-            'checkIn': self.check_in.isoformat(),
-            'checkOut': self.check_out.isoformat(),
-            'specialNeeds': self.special_needs,
-            'totalPrice': self.total_price
-        }
+    __table_args__ = (
+        db.Index('ix_boardings_check_in_id', 'check_in', 'id'),
+    )
+
+    api_fields = {
+        'id': 'id',
+        'petName': 'pet_name',
+        'packageType': 'package_type',
+        'checkIn': 'check_in',
+        'checkOut': 'check_out',
+        'specialNeeds': 'special_needs',
+        'totalPrice': 'total_price'
+    }
+
+# Daily boarding rollup, kept current by create/delete_boarding (see analytics.py)
+class BoardingDaily(db.Model):
+    __tablename__ = 'boarding_daily'
+    day = db.Column(db.Date, primary_key=True)
+    package_type = db.Column(db.String(50), primary_key=True)
+    occupancy = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.BigInteger, nullable=False, default=0)
     
-class Consultation(db.Model):
+class Consultation(ApiModel):
     __tablename__ = 'consultations'
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(db.BigInteger, primary_key=True, default=next_id)
     vet_id = db.Column(db.Integer, nullable=False)
     vet_name = db.Column(db.String(100), nullable=False)
     pet_type = db.Column(db.String(50), nullable=False)
@@ -67,22 +160,45 @@ class Consultation(db.Model):
     time_slot = db.Column(db.String(10), nullable=False)
     status = db.Column(db.String(20), nullable=False, default='scheduled')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_consultations_date_slot_id', 'consult_date', 'time_slot', 'id'),
+        # One consultation per vet per slot; also serves the availability lookup
+        db.UniqueConstraint('vet_id', 'consult_date', 'time_slot', name='uq_consultations_vet_slot'),
+    )
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'vetId': self.vet_id,
-            'vetName': self.vet_name,
-            'petType': self.pet_type,
-            'petAge': self.pet_age,
-            'symptoms': self.symptoms,
-            'consultDate': self.consult_date.isoformat(),
-            'timeSlot': self.time_slot,
-            'status': self.status
-            }    
-class Petm(db.Model):
+    api_fields = {
+        'id': 'id',
+        'vetId': 'vet_id',
+        'vetName': 'vet_name',
+        'petType': 'pet_type',
+        'petAge': 'pet_age',
+        'symptoms': 'symptoms',
+        'consultDate': 'consult_date',
+        'timeSlot': 'time_slot',
+        'status': 'status'
+    }
+
+
+def archive_table(model, *indexes):
+    """Table that archive.py moves finished `model` rows into.
+
+    Same columns as the hot table, without its unique constraints (a slot
+    frees up once its row is archived), plus when each row was moved.
+    """
+    columns = [column._copy() for column in model.__table__.columns]
+    return db.Table(f'{model.__tablename__}_archive', db.metadata, *columns,
+                    db.Column('archived_at', db.DateTime, nullable=False), *indexes)
+
+
+# Archived rows keep the list endpoints' sort order for ?include_archived=1
+bookings_archive = archive_table(Booking, db.Index('ix_bookings_archive_date_time_id', 'date', 'time', 'id'))
+boardings_archive = archive_table(Boarding, db.Index('ix_boardings_archive_check_in_id', 'check_in', 'id'))
+consultations_archive = archive_table(
+    Consultation, db.Index('ix_consultations_archive_date_slot_id', 'consult_date', 'time_slot', 'id'))
+class Petm(ApiModel):
     __tablename__ = 'petm'
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(db.BigInteger, primary_key=True, default=next_id)
     name = db.Column(db.String(100), nullable=False)
     species = db.Column(db.String(50), nullable=False)
     breed = db.Column(db.String(100), nullable=False)
@@ -90,48 +206,99 @@ class Petm(db.Model):
     vaccination_status = db.Column(db.String(20), nullable=False)
     aggression_level = db.Column(db.String(20), nullable=False)
     image_name = db.Column(db.String(255), nullable=True)
+    image_hash = db.Column(db.String(64), nullable=True)
+    image_variants = db.Column(db.JSON, nullable=True)  # Filled in by the image workers
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'species': self.species,
-            'breed': self.breed,
-            'age': self.age,
-            'vaccination': self.vaccination_status,
-            'aggression': self.aggression_level,
-            'imageName': self.image_name
-        }
-    
-class SellPet(db.Model):
+    __table_args__ = (
+        db.Index('ix_petm_species_breed_age', 'species', 'breed', 'age'),
+        # Both are equality filters: with id last, a page comes out of the
+        # index already in id order, with no sort of every match
+        db.Index('ix_petm_vaccination_aggression', 'vaccination_status', 'aggression_level', 'id'),
+        db.Index('ix_petm_search', search_document(name, breed),
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+    search_columns = ('name', 'breed')
+
+    api_fields = {
+        'id': 'id',
+        'name': 'name',
+        'species': 'species',
+        'breed': 'breed',
+        'age': 'age',
+        'vaccination': 'vaccination_status',
+        'aggression': 'aggression_level',
+        'imageName': 'image_name',
+        'imageVariants': 'image_variants'
+    }
+
+    api_computed = ('imageVariants',)
+
+    @classmethod
+    def api_convert(cls, key, value):
+        if key == 'imageVariants':
+            return {name: upload_url(file) for name, file in (value or {}).items()}
+        return super().api_convert(key, value)
+
+class SellPet(ApiModel):
     __tablename__ = 'sell_pets'
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(db.BigInteger, primary_key=True, default=next_id)
     name = db.Column(db.String(100), nullable=False)
     species = db.Column(db.String(50), nullable=False)
     breed = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False, default=0)
     description = db.Column(db.Text, nullable=True)
     image_name = db.Column(db.String(255), nullable=True)
+    image_hash = db.Column(db.String(64), nullable=True)
+    image_variants = db.Column(db.JSON, nullable=True)  # Filled in by the image workers
     contact_email = db.Column(db.String(120), nullable=False)
     contact_phone = db.Column(db.String(20), nullable=True)
     price = db.Column(db.Integer, nullable=False)  # New price field
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'species': self.species,  # Changed from 'type' to match sell.js
-            'breed': self.breed,
-            'age': self.age,
-            'description': self.description,
-            'image_name': self.image_name,
-            'contact_email': self.contact_email,
-            'contact_phone': self.contact_phone,
-            'price': self.price,
-            'images': [f"http://127.0.0.1:5000/static/uploads/{self.image_name}"] if self.image_name else []
-        }
+    __table_args__ = (
+        db.Index('ix_sell_pets_species_breed_price', 'species', 'breed', 'price'),
+        db.Index('ix_sell_pets_species_age', 'species', 'age'),
+        db.Index('ix_sell_pets_price', 'price'),
+        db.Index('ix_sell_pets_search', search_document(name, breed, description),
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
+    search_columns = ('name', 'breed', 'description')
+
+    api_fields = {
+        'id': 'id',
+        'name': 'name',
+        'species': 'species',  # Changed from 'type' to match sell.js
+        'breed': 'breed',
+        'age': 'age',
+        'description': 'description',
+        'image_name': 'image_name',
+        'contact_email': 'contact_email',
+        'contact_phone': 'contact_phone',
+        'price': 'price',
+        'images': 'image_name',
+        'variants': 'image_variants'
+    }
+
+    api_computed = ('images', 'variants')
+
+    @classmethod
+    def api_convert(cls, key, value):
+        if key == 'images':
+            return [upload_url(value)] if value else []
+        if key == 'variants':
+            return {name: upload_url(file) for name, file in (value or {}).items()}
+        return super().api_convert(key, value)
+# One row per file in the content-addressed upload store (see storage.py)
+class StoredFile(db.Model):
+    __tablename__ = 'stored_files'
+    hash = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(255), unique=True, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Admin(db.Model):
     __tablename__ = 'admins'
     id = db.Column(db.Integer, primary_key=True)
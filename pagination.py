@@ -0,0 +1,143 @@
+from flask import request, jsonify, Response, stream_with_context, current_app
+from flask import json as flask_json
+from datetime import date, datetime
+from urllib.parse import urlencode
+from app import db
+import base64
+import json
+
+
+def encode_cursor(values):
+    # Cursor is the sort key of the last row on the page, as urlsafe base64 JSON
+    payload = [v.isoformat() if isinstance(v, date) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    # Turn ISO strings back into dates so the comparison binds with the column
+    # type; anything of the wrong type is a bad cursor, not a database error
+    decoded = []
+    try:
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if value is None:
+                pass
+            elif python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is int and (isinstance(value, bool) or not isinstance(value, int)):
+                raise TypeError(f'{column.key} must be an integer')
+            elif python_type is str and not isinstance(value, str):
+                raise TypeError(f'{column.key} must be a string')
+            decoded.append(value)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    return decoded
+
+
+def parse_fields(model):
+    # ?fields=id,name -> ['id', 'name'], validated against the model's API keys
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    fields = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in model.api_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit():
+    limit = request.args.get('limit')
+    if limit is None:
+        return None
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, current_app.config['PAGE_MAX_LIMIT'])
+
+
+def wants_stream():
+    # ?stream=1 or an Accept header that prefers NDJSON over JSON
+    if request.args.get('stream') == '1':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+
+def ndjson_response(query, serialize):
+    # Rows are fetched through a server-side cursor in STREAM_BATCH_SIZE chunks
+    # and written one JSON document per line, so memory does not grow with
+    # the table and the first row goes out as soon as it is fetched.
+    def generate():
+        # The view's session is removed as soon as the view returns; run the
+        # query on the session of the context stream_with_context pushes, so
+        # its connection goes back to the pool when the stream ends
+        rows = query.with_session(db.session()).yield_per(current_app.config['STREAM_BATCH_SIZE'])
+        for row in rows:
+            yield flask_json.dumps(serialize(row)) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def paginated_response(model, query, sort_columns, entity=None):
+    """Keyset-paginated, optionally projected list response.
+
+    `sort_columns` is the endpoint's existing ORDER BY; the primary key is
+    appended as a tie-breaker so the cursor is unique. `entity` is an alias
+    of `model` the query selects from instead of its table. Without ?limit= or
+    ?after= the whole (ordered) result is returned, as before. With
+    ?stream=1 or `Accept: application/x-ndjson` the rows are streamed as NDJSON.
+    Rows are selected as column tuples (the output columns, then the sort
+    key) and serialized without building ORM objects.
+    """
+    stream = wants_stream()
+    try:
+        fields = parse_fields(model)
+        limit = parse_limit()
+        after = request.args.get('after')
+        key_columns = list(sort_columns) + [(entity or model).id]
+
+        if after:
+            values = decode_cursor(after, key_columns)
+            query = query.filter(db.tuple_(*key_columns) > db.tuple_(*values))
+            if limit is None and not stream:
+                limit = current_app.config['PAGE_MAX_LIMIT']
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    output_columns = model.api_columns(fields or list(model.api_fields), entity)
+    serialize = model.row_serializer(fields)
+    query = query.with_entities(*output_columns, *key_columns).order_by(*[c.asc() for c in key_columns])
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+        return ndjson_response(query, serialize)
+
+    if limit is None:
+        rows = query.all()
+        return jsonify([serialize(row) for row in rows]), 200
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response = jsonify([serialize(row) for row in rows])
+    if has_more:
+        cursor = encode_cursor(rows[-1][len(output_columns):])
+        args = request.args.to_dict()
+        args.update({'after': cursor, 'limit': limit})
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response, 200
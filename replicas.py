@@ -0,0 +1,109 @@
+from flask import Blueprint, request, g, current_app
+from sqlalchemy import create_engine, event
+from threading import Lock
+from db_config import engine_options, track_pool_stats
+from admission import client_identity
+import time
+
+STICKY_COOKIE = 'rw_until'
+
+
+class ReplicaRouter:
+    """Round-robin over healthy read replicas.
+
+    A replica whose connection fails is skipped for REPLICA_RETRY_SECONDS.
+    With no replicas configured, or none healthy, reads use the primary.
+    """
+
+    def __init__(self):
+        self.engines = []
+        self.down_until = []
+        self.retry_seconds = 0
+        self.next = 0
+        self.lock = Lock()
+        # Read-your-writes: client -> time until which its reads go to the
+        # primary. The cookie carries the same deadline across workers for
+        # clients that send it.
+        self.recent_writers = {}
+
+    def configure(self, uris, retry_seconds):
+        # Engines connect lazily, so this is safe before a pre-fork server forks
+        self.engines = [create_engine(uri, **engine_options(uri)) for uri in uris]
+        self.down_until = [0.0] * len(self.engines)
+        self.retry_seconds = retry_seconds
+        for i, engine in enumerate(self.engines):
+            event.listen(engine, 'handle_error', self.error_listener(i))
+
+    def error_listener(self, index):
+        def on_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(index)
+        return on_error
+
+    def mark_down(self, index):
+        with self.lock:
+            self.down_until[index] = time.monotonic() + self.retry_seconds
+        print(f"Read replica {index} marked down for {self.retry_seconds}s")
+
+    def wrote(self, key, until):
+        with self.lock:
+            self.recent_writers[key] = until
+            if len(self.recent_writers) > 10000:
+                now = time.time()
+                for expired in [k for k, t in self.recent_writers.items() if t < now]:
+                    del self.recent_writers[expired]
+
+    def recently_wrote(self, key):
+        with self.lock:
+            return self.recent_writers.get(key, 0) > time.time()
+
+    def pick(self):
+        now = time.monotonic()
+        with self.lock:
+            for _ in range(len(self.engines)):
+                index = self.next
+                self.next = (self.next + 1) % len(self.engines)
+                if self.down_until[index] <= now:
+                    return self.engines[index]
+        return None
+
+
+bp = Blueprint('replicas', __name__)
+
+
+def init_app(app):
+    router = app.extensions['replicas'] = ReplicaRouter()
+    router.configure(app.config['SQLALCHEMY_REPLICA_URIS'], app.config['REPLICA_RETRY_SECONDS'])
+    for engine in router.engines:
+        track_pool_stats(engine, app.extensions['pool_stats'])
+
+
+def get_router():
+    return current_app.extensions['replicas']
+
+
+def recently_wrote(router):
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    # The token's subject, or the client address (see TRUSTED_PROXIES)
+    return router.recently_wrote(client_identity())
+
+
+@bp.before_app_request
+def route_reads():
+    router = get_router()
+    if request.method == 'GET' and router.engines and not recently_wrote(router):
+        g.read_engine = router.pick()
+
+
+@bp.after_app_request
+def remember_writes(response):
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        until = time.time() + current_app.config['READ_YOUR_WRITES_SECONDS']
+        get_router().wrote(client_identity(), until)
+        response.set_cookie(STICKY_COOKIE, str(until), max_age=current_app.config['READ_YOUR_WRITES_SECONDS'],
+                            httponly=True, samesite='Lax')
+    return response
@@ -0,0 +1,326 @@
+# Bookings, boardings and consultations, plus the boarding rollup reports
+# and vet availability built on them.
+from flask import Blueprint, request, jsonify, current_app
+from app import db
+from models import Booking, Boarding, Consultation, BoardingDaily
+from pagination import paginated_response
+from bulk import bulk_create, bulk_delete
+from events import publish
+from archive import readable
+from availability import init_slot_cache, get_slot_cache, slot_taken, MAX_RANGE_DAYS as AVAILABILITY_RANGE_DAYS
+from analytics import record_boardings, remove_boarding_ids, parse_range
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+
+bp = Blueprint('scheduling', __name__)
+
+
+def init_app(app):
+    init_slot_cache(app)
+
+
+# Field parsers for the *_values builders: bad input raises ValueError with
+# the field name, which the bulk endpoints report per item
+def parse_int(data, key):
+    value = data[key]
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{key} must be an integer')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{key} must be an integer') from None
+
+
+def parse_day(data, key):
+    try:
+        return datetime.strptime(data[key], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be a YYYY-MM-DD date') from None
+
+
+BOOKING_FIELDS = ['petName', 'service', 'date', 'time']
+
+def booking_values(data):
+    return {
+        'pet_name': data['petName'],
+        'service': data['service'],
+        'date': parse_day(data, 'date'),
+        'time': data['time'],
+        'notes': data.get('notes', '')
+    }
+
+@bp.route('/api/bookings', methods=['POST'])
+def create_booking():
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if not all(field in data for field in BOOKING_FIELDS):
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        booking = Booking(**booking_values(data))
+        if Booking.query.filter_by(service=booking.service, date=booking.date, time=booking.time).first():
+            return jsonify({'error': 'Time slot already booked'}), 409
+        
+        db.session.add(booking)
+        db.session.commit()
+        item = booking.to_dict()
+        publish('bookings', 'created', items=[item])
+        return jsonify(item), 201
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Time slot already booked'}), 409
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/bookings/bulk', methods=['POST'])
+def create_bookings_bulk():
+    return bulk_create(Booking, BOOKING_FIELDS, lambda data, i: booking_values(data),
+                       unique=('service', 'date', 'time'))
+
+@bp.route('/api/bookings/bulk-delete', methods=['POST'])
+def delete_bookings_bulk():
+    return bulk_delete(Booking)
+
+@bp.route('/api/bookings', methods=['GET'])
+def get_bookings():
+    try:
+        source = readable(Booking)
+        return paginated_response(Booking, db.session.query(source), [source.date, source.time], source)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
+def delete_booking(booking_id):
+    try:
+        booking = Booking.query.get_or_404(booking_id)
+        db.session.delete(booking)
+        db.session.commit()
+        publish('bookings', 'deleted', ids=[booking_id])
+        return jsonify({'message': 'Booking cancelled successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+BOARDING_FIELDS = ['petName', 'packageType', 'checkIn', 'checkOut', 'totalPrice']
+
+def boarding_values(data):
+    check_in, check_out = parse_day(data, 'checkIn'), parse_day(data, 'checkOut')
+    if check_out < check_in:
+        raise ValueError('checkOut must not be before checkIn')
+    return {
+        'pet_name': data['petName'],
+        'package_type': data['packageType'],
+        'check_in': check_in,
+        'check_out': check_out,
+        'special_needs': data.get('specialNeeds', ''),
+        'total_price': parse_int(data, 'totalPrice')
+    }
+
+@bp.route('/api/boardings', methods=['POST'])
+def create_boarding():
+    try:
+        data = request.get_json()
+        if not all(k in data for k in BOARDING_FIELDS):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        boarding = Boarding(**boarding_values(data))
+        db.session.add(boarding)
+        record_boardings([boarding])
+        db.session.commit()
+        item = boarding.to_dict()
+        publish('boardings', 'created', items=[item])
+        return jsonify(item), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in create_boarding: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/boardings/bulk', methods=['POST'])
+def create_boardings_bulk():
+    return bulk_create(Boarding, BOARDING_FIELDS, lambda data, i: boarding_values(data),
+                       before_commit=record_boardings)
+
+@bp.route('/api/boardings/bulk-delete', methods=['POST'])
+def delete_boardings_bulk():
+    return bulk_delete(Boarding, before_commit=remove_boarding_ids)
+
+@bp.route('/api/boardings', methods=['GET'])
+def get_boardings():
+    try:
+        source = readable(Boarding)
+        return paginated_response(Boarding, db.session.query(source), [source.check_in], source)
+    except Exception as e:
+        print(f"Error in get_boardings: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/boardings/<int:boarding_id>', methods=['DELETE'])
+def delete_boarding(boarding_id):
+    try:
+        boarding = Boarding.query.get_or_404(boarding_id)
+        db.session.delete(boarding)
+        record_boardings([boarding], sign=-1)
+        db.session.commit()
+        publish('boardings', 'deleted', ids=[boarding_id])
+        return jsonify({'message': 'Boarding cancelled'}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in delete_boarding: {str(e)}")
+        return jsonify({'error': str(e)}), 500    
+    
+CONSULTATION_FIELDS = ['vetId', 'vetName', 'petType', 'petAge', 'symptoms', 'consultDate', 'timeSlot']
+
+def consultation_values(data):
+    return {
+        'vet_id': parse_int(data, 'vetId'),
+        'vet_name': data['vetName'],
+        'pet_type': data['petType'],
+        'pet_age': parse_int(data, 'petAge'),
+        'symptoms': data['symptoms'],
+        'consult_date': parse_day(data, 'consultDate'),
+        'time_slot': data['timeSlot'],
+        'status': data.get('status', 'scheduled')
+    }
+
+@bp.route('/api/consultations', methods=['POST'])
+def create_consultation():
+    try:
+        data = request.get_json()
+        if not all(k in data for k in CONSULTATION_FIELDS):
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        consultation = Consultation(**consultation_values(data))
+        slot = consultation.vet_id, consultation.consult_date, consultation.time_slot
+        if slot_taken(*slot):
+            # The booking may be another worker's, or not marked yet: a
+            # client told the slot is taken must not be offered it again
+            get_slot_cache().mark(*slot, True)
+            return jsonify({'error': 'Time slot already booked'}), 409
+        db.session.add(consultation)
+        db.session.commit()
+        get_slot_cache().mark(*slot, True)
+        item = consultation.to_dict()
+        publish('consultations', 'created', items=[item])
+        return jsonify(item), 201
+    except IntegrityError:
+        # Lost the race for the slot to a concurrent request
+        db.session.rollback()
+        get_slot_cache().mark(*slot, True)
+        return jsonify({'error': 'Time slot already booked'}), 409
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in create_consultation: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/consultations/bulk', methods=['POST'])
+def create_consultations_bulk():
+    return bulk_create(Consultation, CONSULTATION_FIELDS, lambda data, i: consultation_values(data),
+                       unique=('vet_id', 'consult_date', 'time_slot'), after_commit=get_slot_cache().reset)
+
+@bp.route('/api/consultations/bulk-delete', methods=['POST'])
+def delete_consultations_bulk():
+    return bulk_delete(Consultation, after_commit=get_slot_cache().reset)
+
+@bp.route('/api/consultations', methods=['GET'])
+def get_consultations():
+    try:
+        source = readable(Consultation)
+        return paginated_response(Consultation, db.session.query(source), [source.consult_date, source.time_slot], source)
+    except Exception as e:
+        print(f"Error in get_consultations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/consultations/<int:consultation_id>', methods=['DELETE'])
+def delete_consultation(consultation_id):
+    try:
+        consultation = Consultation.query.get_or_404(consultation_id)
+        db.session.delete(consultation)
+        db.session.commit()
+        get_slot_cache().mark(consultation.vet_id, consultation.consult_date, consultation.time_slot, False)
+        publish('consultations', 'deleted', ids=[consultation_id])
+        return jsonify({'message': 'Consultation cancelled'}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in delete_consultation: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/boardings/occupancy', methods=['GET'])
+def get_boarding_occupancy():
+    try:
+        start, end = parse_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        in_range = BoardingDaily.day.between(start, end)
+        if request.args.get('group') == 'package_type':
+            rows = db.session.query(BoardingDaily.day, BoardingDaily.package_type, BoardingDaily.occupancy) \
+                .filter(in_range, BoardingDaily.occupancy != 0) \
+                .order_by(BoardingDaily.day, BoardingDaily.package_type)
+            data = [{'date': day.isoformat(), 'packageType': package, 'occupancy': occ} for day, package, occ in rows]
+        else:
+            rows = db.session.query(BoardingDaily.day, db.func.sum(BoardingDaily.occupancy)) \
+                .filter(in_range).group_by(BoardingDaily.day).order_by(BoardingDaily.day)
+            data = [{'date': day.isoformat(), 'occupancy': int(occ)} for day, occ in rows if occ]
+        return jsonify({'from': start.isoformat(), 'to': end.isoformat(), 'days': data}), 200
+    except Exception as e:
+        print(f"Error in get_boarding_occupancy: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/boardings/revenue', methods=['GET'])
+def get_boarding_revenue():
+    try:
+        start, end = parse_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        in_range = BoardingDaily.day.between(start, end)
+        if request.args.get('group') == 'day':
+            key, name = BoardingDaily.day, 'date'
+        else:
+            key, name = BoardingDaily.package_type, 'packageType'
+        rows = db.session.query(key, db.func.sum(BoardingDaily.revenue)) \
+            .filter(in_range).group_by(key).order_by(key)
+        data = [{name: k.isoformat() if name == 'date' else k, 'revenue': int(rev)} for k, rev in rows if rev]
+        total = sum(item['revenue'] for item in data)
+        return jsonify({'from': start.isoformat(), 'to': end.isoformat(), 'total': total, 'breakdown': data}), 200
+    except Exception as e:
+        print(f"Error in get_boarding_revenue: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/vets/<int:vet_id>/availability', methods=['GET'])
+def get_vet_availability(vet_id):
+    try:
+        today = datetime.now().date()
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if 'from' in request.args else today
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if 'to' in request.args else start + timedelta(days=6)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    if end < start or (end - start).days >= AVAILABILITY_RANGE_DAYS:
+        return jsonify({'error': f'Range must be between 1 and {AVAILABILITY_RANGE_DAYS} days'}), 400
+
+    try:
+        slots = current_app.config['CONSULT_SLOTS']
+        masks = get_slot_cache().get_range(vet_id, start, end)
+        days = [{
+            'date': d.isoformat(),
+            'free': [slot for i, slot in enumerate(slots) if not mask & (1 << i)]
+        } for d, mask in sorted(masks.items())]
+        return jsonify({'vetId': vet_id, 'from': start.isoformat(), 'to': end.isoformat(), 'days': days}), 200
+    except Exception as e:
+        print(f"Error in get_vet_availability: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,53 @@
+from flask import request
+from app import db
+from models import search_document
+
+# Query parameter -> (column attribute, comparison)
+CATALOGUE_FILTERS = {
+    'species': ('species', 'eq'),
+    'breed': ('breed', 'eq'),
+    'vaccination': ('vaccination_status', 'eq'),
+    'aggression': ('aggression_level', 'eq'),
+    'min_age': ('age', 'ge'),
+    'max_age': ('age', 'le'),
+    'min_price': ('price', 'ge'),
+    'max_price': ('price', 'le'),
+}
+
+
+def text_search(model, q):
+    # PostgreSQL matches against the GIN-indexed tsvector; other databases
+    # (SQLite for local runs) fall back to a LIKE per search term
+    columns = [getattr(model, name) for name in model.search_columns]
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return search_document(*columns).op('@@')(db.func.plainto_tsquery(db.literal_column("'simple'"), q))
+    terms = [t for t in q.split() if t]
+    return db.and_(*[db.or_(*[column.ilike(f'%{term}%') for column in columns]) for term in terms])
+
+
+def filter_catalogue(model, query):
+    """Apply the catalogue query parameters that `model` has columns for.
+
+    Raises ValueError for a filter the model does not support or a
+    non-numeric bound, which the handlers turn into a 400.
+    """
+    for param, (column_name, op) in CATALOGUE_FILTERS.items():
+        value = request.args.get(param)
+        if value is None or value == '':
+            continue
+        column = getattr(model, column_name, None)
+        if column is None:
+            raise ValueError(f'Unsupported filter: {param}')
+        if op == 'eq':
+            query = query.filter(column == value)
+            continue
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f'{param} must be an integer')
+        query = query.filter(column >= value if op == 'ge' else column <= value)
+
+    q = request.args.get('q', '').strip()
+    if q:
+        query = query.filter(text_search(model, q))
+    return query
@@ -0,0 +1,180 @@
+from flask import current_app
+from app import db
+from models import StoredFile, Petm, SellPet
+from images import IMAGE_VARIANTS, variant_name, process_image
+from async_db import blocking
+import hashlib
+import os
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def shard_path(digest, ext):
+    # ab/cd/abcd1234....jpg - two levels of 256 directories keep each one small
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+
+def absolute(name):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], name)
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else 'bin'
+
+
+def add_reference(digest, name):
+    """Take a reference in the current transaction with one upsert.
+
+    Returns the stored name, which is the first upload's when the same
+    content arrives again under another extension. The row stays locked
+    until the caller commits (see remove_unreferenced).
+    """
+    table = StoredFile.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        entry = StoredFile.query.filter_by(hash=digest).with_for_update().first()
+        if entry is None:
+            db.session.add(StoredFile(hash=digest, path=name, refcount=1))
+            db.session.flush()
+            return name
+        entry.refcount += 1
+        return entry.path
+
+    stmt = insert(table).values(hash=digest, path=name, refcount=1)
+    stmt = stmt.on_conflict_do_update(index_elements=['hash'], set_={'refcount': table.c.refcount + 1})
+    return db.session.execute(stmt.returning(table.c.path)).scalar_one()
+
+
+def copy_to_file(stream, path, limit):
+    """Copy a stream to `path`, hashing it on the way; returns the sha256 hex digest."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if limit is not None and written > limit:
+                raise UploadTooLarge(f'Image exceeds {limit} bytes')
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def move_into_place(tmp_path, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Same content, same bytes: replacing an existing copy is harmless
+    os.replace(tmp_path, path)
+
+
+def store_stream(stream, ext, limit=None):
+    """Stream bytes into the content-addressed store and take a reference.
+
+    The sha256 is computed as the chunks arrive; identical content ends up at
+    the same sharded path and only bumps the reference count. The reference
+    is added to the current session and commits with the caller's row. On
+    the ASGI event loop the file work waits on a thread (see async_db.py).
+    Returns (stored name, digest).
+    """
+    tmp_path = os.path.join(absolute('tmp'), uuid.uuid4().hex)
+    try:
+        digest = blocking(copy_to_file, stream, tmp_path, limit)
+        # The reference comes first: once it is taken, a delete of the last
+        # other reference either finished removing the file already or waits
+        # for our commit and then keeps it, so the file moved in below stays
+        name = add_reference(digest, shard_path(digest, ext))
+        blocking(move_into_place, tmp_path, absolute(name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return name, digest
+
+
+def store_upload(file):
+    return store_stream(file.stream, file_extension(file.filename), current_app.config['MAX_UPLOAD_BYTES'])
+
+
+def release_upload(name):
+    """Drop one reference to a stored file, in the current session.
+
+    Returns the name when this was the last reference; pass it to
+    remove_unreferenced() after the commit so a rolled-back delete never
+    loses the file.
+    """
+    entry = StoredFile.query.filter_by(path=name).with_for_update().first()
+    if entry is None:
+        return name  # Pre-migration flat upload, owned by a single row
+    entry.refcount -= 1
+    # The row stays at zero; remove_unreferenced deletes it with the files
+    return name if entry.refcount <= 0 else None
+
+
+def remove_unreferenced(name):
+    """Delete a stored file nothing references any more, and commit.
+
+    The zero-count row is deleted first and the files removed while that
+    delete holds the row: an upload of the same content upserting meanwhile
+    either took its reference first (nothing is deleted, the files stay) or
+    waits for this commit and then moves its own copy into place.
+    """
+    if name is None:
+        return
+    deleted = StoredFile.query.filter_by(path=name).filter(StoredFile.refcount <= 0).delete()
+    if deleted or '/' not in name:  # Store names are sharded; flat ones have no row
+        for path in [name] + [variant_name(name, variant) for variant in IMAGE_VARIANTS]:
+            if os.path.exists(absolute(path)):
+                os.remove(absolute(path))
+    db.session.commit()
+
+
+def migrate_flat_uploads(dry_run=False):
+    """Move flat `{id}_{filename}` uploads into the content-addressed store.
+
+    Rows sharing identical content end up pointing at one file. Files no row
+    references are left in place and reported.
+    """
+    folder = current_app.config['UPLOAD_FOLDER']
+    referenced = set()
+    moved = 0
+    for model in (Petm, SellPet):
+        for row in model.query.filter(model.image_name.isnot(None)).all():
+            if '/' in row.image_name:
+                continue  # Already in the store
+            referenced.add(row.image_name)
+            old_path = os.path.join(folder, row.image_name)
+            if not os.path.exists(old_path):
+                print(f"Missing upload for {model.__tablename__} {row.id}: {row.image_name}")
+                continue
+            if dry_run:
+                moved += 1
+                continue
+            with open(old_path, 'rb') as source:
+                name, digest = store_stream(source, file_extension(row.image_name))
+            row.image_name = name
+            row.image_hash = digest
+            row.image_variants = None
+            db.session.commit()
+            process_image(model, row.id, name)  # Variants for the new path
+            moved += 1
+
+    if not dry_run:
+        for old_name in referenced:
+            for path in [old_name] + [variant_name(old_name, v) for v in IMAGE_VARIANTS]:
+                if os.path.exists(os.path.join(folder, path)):
+                    os.remove(os.path.join(folder, path))
+
+    unreferenced = [f for f in os.listdir(folder)
+                    if os.path.isfile(os.path.join(folder, f)) and f not in referenced]
+    return moved, unreferenced
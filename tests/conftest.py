@@ -0,0 +1,33 @@
+# Shared fixtures: python -m pytest -q from the repository root.
+from app import create_app, db
+from lifecycle import shutdown
+import pytest
+
+
+def make_app(tmp_path, name='test', **config):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / f'{name}.db'}",
+        'JWT_SECRET_KEY': 'test-only-secret-key-of-at-least-32-bytes',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'ID_LOCK_DIR': str(tmp_path / 'ids'),
+        'EVENTS_BACKEND': 'memory',
+        'ADMISSION_ENABLED': False,
+        'HASH_WORKERS': 1,
+        **config,
+    })
+    with app.app_context():
+        import models  # Registers the tables
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    shutdown(app, wait=False)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,31 @@
+from conftest import make_app
+from lifecycle import shutdown
+import pytest
+
+
+@pytest.fixture
+def two_apps(tmp_path):
+    apps = make_app(tmp_path, 'first'), make_app(tmp_path, 'second')
+    yield apps
+    for app in apps:
+        shutdown(app, wait=False)
+
+
+def test_apps_in_one_process_keep_their_own_state(two_apps):
+    first, second = two_apps
+    client, other = first.test_client(), second.test_client()
+    checkouts = other.get('/api/db/pool-stats').json['checkouts']  # create_all's
+    assert client.get('/api/sell_pets').status_code == 200
+    assert client.post('/api/bookings', json={'petName': 'Rex', 'service': 'bath', 'date': '2030-01-01',
+                                              'time': '10:00'}).status_code == 201
+
+    assert client.get('/api/cache/stats').json['misses'] == 1
+    assert client.get('/api/db/pool-stats').json['checkouts'] > checkouts
+    assert other.get('/api/cache/stats').json['misses'] == 0
+    assert other.get('/api/db/pool-stats').json['checkouts'] == checkouts
+    assert '/api/sell_pets' not in other.get('/metrics').get_data(as_text=True)
+
+    # Both lease from the same ID_LOCK_DIR, so they hold different worker ids
+    assert other.post('/api/bookings', json={'petName': 'Rex', 'service': 'bath', 'date': '2030-01-01',
+                                             'time': '10:00'}).status_code == 201
+    assert first.extensions['ids'].worker_id != second.extensions['ids'].worker_id
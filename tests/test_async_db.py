@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from app import db
+from async_db import build_async_engines, IO_POOL_KEY
+from db_config import ASYNC_BINDS_KEY
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from PIL import Image
+import asyncio
+import os
+import pytest
+import threading
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+
+
+@pytest.fixture
+def on_loop(app):
+    """Runs test client calls as asgi.py runs loop requests; records which driver each query used."""
+    with app.app_context():
+        engines = build_async_engines(db.engine, app.extensions['replicas'])
+    drivers, in_flight = [], {'now': 0, 'max': 0}
+
+    def record(conn, *args):
+        drivers.append(conn.dialect.driver)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+
+    @app.before_request
+    def enter():
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        g.counted = True
+
+    @app.teardown_request
+    def leave(exc):
+        if g.pop('counted', False):
+            in_flight['now'] -= 1
+
+    io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='test-io')
+    overrides = {ASYNC_BINDS_KEY: engines.binds, IO_POOL_KEY: io_pool}
+
+    def run(*calls):
+        async def main():
+            try:
+                return await asyncio.gather(*(engines.run(call, overrides) for call in calls))
+            finally:
+                await engines.dispose()
+        return asyncio.run(main())
+
+    yield run, drivers, in_flight
+    event.remove(Engine, 'before_cursor_execute', record)
+    io_pool.shutdown()
+
+
+def test_pages_interleave_on_the_async_driver(app, client, on_loop):
+    run, drivers, in_flight = on_loop
+    for n in range(3):
+        client.post('/api/bookings', json={'petName': 'Rex', 'service': 'bath', 'date': '2030-01-01',
+                                           'time': f'1{n}:00'})
+    drivers.clear()
+
+    def page(overrides):
+        return client.get('/api/bookings?limit=2', environ_overrides=overrides)
+
+    responses = run(page, page, page)
+    assert [len(response.json) for response in responses] == [2, 2, 2]
+    assert set(drivers) == {'aiosqlite'}
+    # Each request let the others in while it waited on the database
+    assert in_flight['max'] == 3
+
+
+def test_upload_on_the_loop(app, client, on_loop):
+    run, drivers, _ = on_loop
+    broker, sent_from = app.extensions['events'].broker, []
+    broker_publish = broker.publish
+
+    def publish(message):
+        sent_from.append(threading.current_thread().name)
+        broker_publish(message)
+
+    broker.publish = publish
+    image = BytesIO()
+    Image.new('RGB', (16, 16), 'red').save(image, 'PNG')
+
+    def upload(overrides):
+        return client.post('/api/petm', environ_overrides=overrides, data={
+            'name': 'Tom', 'species': 'cat', 'breed': 'x', 'age': '2', 'vaccination': 'full',
+            'aggression': 'low', 'image': (BytesIO(image.getvalue()), 'tom.png')})
+
+    response, = run(upload)
+    assert response.status_code == 201 and set(drivers) == {'aiosqlite'}
+    assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], response.json['imageName']))
+    # The created event and the cache invalidation went out from the I/O pool, not the loop
+    assert sent_from and all(name.startswith('test-io') for name in sent_from)
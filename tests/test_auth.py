@@ -0,0 +1,20 @@
+from app import db
+from models import User
+
+
+def register(client, email, **fields):
+    return client.post('/register', json={'name': 'Sam', 'email': email, 'password': 'pw-123456', **fields})
+
+
+def test_register_keeps_seller_and_adopter_roles(app, client):
+    assert register(client, 'seller@example.com', role='seller').status_code == 201
+    assert register(client, 'adopter@example.com').status_code == 201
+    with app.app_context():
+        roles = dict(db.session.query(User.email, User.role))
+    assert roles == {'seller@example.com': 'seller', 'adopter@example.com': 'adopter'}
+
+
+def test_register_refuses_the_admin_role(app, client):
+    assert register(client, 'mallory@example.com', role='admin').status_code == 400
+    with app.app_context():
+        assert User.query.count() == 0
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from availability import SlotCache
+from threading import Barrier
+
+DAY = date.today() + timedelta(days=7)
+
+
+def book(client, vet_id, slot, day=DAY):
+    return client.post('/api/consultations', json={
+        'vetId': vet_id, 'vetName': 'Dr. Test', 'petType': 'dog', 'petAge': 3,
+        'symptoms': 'check-up', 'consultDate': day.isoformat(), 'timeSlot': slot,
+    })
+
+
+def free_slots(client, vet_id, day=DAY):
+    response = client.get(f'/api/vets/{vet_id}/availability?from={day}&to={day}')
+    assert response.status_code == 200
+    return set(response.json['days'][0]['free'])
+
+
+def test_parallel_clients_book_each_slot_once(app):
+    slots = app.config['CONSULT_SLOTS']
+    clients = 4 * len(slots)
+    barrier = Barrier(clients)
+
+    def run(n):
+        client = app.test_client()
+        slot = slots[n % len(slots)]
+        free_slots(client, 1)  # Every client fills or reads the cache first
+        barrier.wait()
+        status = book(client, 1, slot).status_code
+        # Whoever booked it, a read after our answer never offers the slot
+        return slot, status, slot in free_slots(client, 1)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(run, range(clients)))
+
+    for slot in slots:
+        statuses = sorted(status for s, status, _ in results if s == slot)
+        assert statuses == [201] + [409] * 3, slot
+    assert not any(offered for _, _, offered in results)
+    assert free_slots(app.test_client(), 1) == set()
+
+
+def test_cancelled_slot_is_offered_again(client):
+    consultation = book(client, 2, '10:00').json
+    assert '10:00' not in free_slots(client, 2)
+    assert client.delete(f"/api/consultations/{consultation['id']}").status_code == 200
+    assert '10:00' in free_slots(client, 2)
+
+
+def test_slot_cache_keeps_at_most_max_days(app):
+    cache = SlotCache(ttl=60, max_days=10)
+    with app.app_context():
+        for vet_id in range(1, 6):
+            cache.get_range(vet_id, DAY, DAY + timedelta(days=6))
+        assert len(cache.days) == 10
+        # The most recently loaded vet is kept, the first ones are evicted
+        assert (5, DAY) in cache.days and (1, DAY) not in cache.days
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+from models import Booking, Boarding, Consultation
+
+DAY = (date.today() + timedelta(days=7)).isoformat()
+
+
+def booking(time, service='grooming'):
+    return {'petName': 'Rex', 'service': service, 'date': DAY, 'time': time}
+
+
+def boarding(price, check_in=DAY, check_out=DAY):
+    return {'petName': 'Rex', 'packageType': 'standard', 'checkIn': check_in, 'checkOut': check_out,
+            'totalPrice': price}
+
+
+def consultation(vet_id, slot):
+    return {'vetId': vet_id, 'vetName': 'Dr. Test', 'petType': 'dog', 'petAge': 3,
+            'symptoms': 'check-up', 'consultDate': DAY, 'timeSlot': slot}
+
+
+def statuses(response):
+    return [(result['index'], result['status']) for result in response.json['results']]
+
+
+def test_bad_fields_are_reported_per_item(app, client):
+    response = client.post('/api/boardings/bulk', json=[boarding(120), boarding('abc'), boarding(90, check_in='soon')])
+    assert response.status_code == 400
+    assert statuses(response) == [(0, 'ok'), (1, 'error'), (2, 'error')]
+    assert 'totalPrice' in response.json['results'][1]['error']
+    assert 'checkIn' in response.json['results'][2]['error']
+    response = client.post('/api/consultations/bulk', json=[consultation('one', '10:00')])
+    assert response.status_code == 400 and 'vetId' in response.json['results'][0]['error']
+    with app.app_context():
+        assert Boarding.query.count() == Consultation.query.count() == 0
+
+
+def test_duplicate_slots_name_the_conflicting_items(app, client):
+    assert client.post('/api/bookings', json=booking('09:00')).status_code == 201
+    response = client.post('/api/bookings/bulk', json=[
+        booking('10:00'), booking('09:00'), booking('10:00'), booking('10:00', service='bath')])
+    assert response.status_code == 409
+    assert statuses(response) == [(0, 'ok'), (1, 'conflict'), (2, 'conflict'), (3, 'ok')]
+    assert response.json['results'][2]['error'] == 'Duplicates item 0'
+
+    assert client.post('/api/consultations', json=consultation(1, '10:00')).status_code == 201
+    response = client.post('/api/consultations/bulk', json=[
+        consultation(1, '11:00'), consultation(1, '10:00'), consultation(2, '10:00'), consultation(1, '11:00')])
+    assert response.status_code == 409
+    assert statuses(response) == [(0, 'ok'), (1, 'conflict'), (2, 'ok'), (3, 'conflict')]
+    with app.app_context():
+        assert Booking.query.count() == Consultation.query.count() == 1
@@ -0,0 +1,17 @@
+def listing(name, species):
+    return {'name': name, 'species': species, 'breed': 'mixed', 'contact_email': 'seller@example.com', 'price': '100'}
+
+
+def names(client, query):
+    response = client.get(f'/api/sell_pets?{query}')
+    assert response.status_code == 200
+    return [item['name'] for item in response.json]
+
+
+def test_repeated_parameters_in_another_order_are_another_entry(client):
+    for name, species in (('Rex', 'dog'), ('Tom', 'cat')):
+        assert client.post('/api/sell_pets', data=listing(name, species)).status_code == 201
+    assert names(client, 'species=dog&species=cat') == ['Rex']
+    assert names(client, 'species=cat&species=dog') == ['Tom']
+    # Reordering distinct parameters still shares the entry
+    assert names(client, 'limit=5&species=cat') == names(client, 'species=cat&limit=5') == ['Tom']
@@ -0,0 +1,27 @@
+from ids import IdGenerator, SEQUENCE_BITS, WORKER_BITS
+import pytest
+
+
+def generator(tmp_path, base, host_workers):
+    ids = IdGenerator()
+    ids.lock_dir = str(tmp_path)
+    ids.worker_base, ids.host_workers = base, host_workers
+    return ids
+
+
+def worker_of(id_value):
+    return id_value >> SEQUENCE_BITS & ((1 << WORKER_BITS) - 1)
+
+
+def test_leases_stay_in_the_host_range(tmp_path):
+    first, second = generator(tmp_path, 8, 2), generator(tmp_path, 8, 2)
+    assert {worker_of(first.next_id()), worker_of(second.next_id())} == {8, 9}
+    with pytest.raises(RuntimeError):
+        generator(tmp_path, 8, 2).next_id()
+    # Another host's range is leased independently of this one's
+    assert worker_of(generator(tmp_path, 10, 2).next_id()) == 10
+
+
+def test_range_must_fit_the_worker_bits(tmp_path):
+    with pytest.raises(ValueError):
+        generator(tmp_path, 60, 8).next_id()
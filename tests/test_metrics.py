@@ -0,0 +1,16 @@
+from app import db
+from flask import g
+from metrics import RequestStats
+import pytest
+
+
+def test_failed_query_does_not_time_the_next_one(app):
+    with app.test_request_context():
+        g.request_stats = stats = RequestStats()
+        with db.engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(db.text('SELECT * FROM no_such_table'))
+            assert conn.info['query_start'] == []
+            conn.execute(db.text('SELECT 1'))
+            assert conn.info['query_start'] == []
+        assert stats.queries == 2
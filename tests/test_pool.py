@@ -0,0 +1,46 @@
+from app import db
+from conftest import make_app
+from lifecycle import shutdown
+import pytest
+import time
+
+POOL_TIMEOUT = 1  # DB_POOL_TIMEOUT=0.5, rounded up to whole seconds
+
+
+@pytest.fixture
+def one_connection(tmp_path, monkeypatch):
+    # A pool of one, so the test can exhaust it by holding a single connection
+    monkeypatch.setenv('DB_POOL_SIZE', '1')
+    monkeypatch.setenv('DB_MAX_OVERFLOW', '0')
+    monkeypatch.setenv('DB_POOL_TIMEOUT', '0.5')
+    app = make_app(tmp_path, CACHE_ENABLED=False)
+    yield app
+    shutdown(app, wait=False)
+
+
+def test_exhausted_pool(one_connection):
+    app = one_connection
+    client = app.test_client()
+    with app.app_context():
+        held = db.engine.connect()
+    try:
+        # Readiness answers at once instead of queueing for a connection
+        started = time.perf_counter()
+        response = client.get('/readyz')
+        assert response.status_code == 503 and response.json['status'] == 'pool exhausted'
+        assert time.perf_counter() - started < POOL_TIMEOUT
+
+        # A request that needs the database gives up after DB_POOL_TIMEOUT
+        timeouts = client.get('/api/db/pool-stats').json['timeouts']
+        started = time.perf_counter()
+        assert client.get('/api/bookings').status_code >= 500
+        assert POOL_TIMEOUT <= time.perf_counter() - started < POOL_TIMEOUT + 1
+        stats = client.get('/api/db/pool-stats').json
+        assert stats['timeouts'] == timeouts + 1
+        assert stats['checkedOut'] == 1 and stats['size'] == 1
+    finally:
+        held.close()
+
+    assert client.get('/readyz').status_code == 200
+    assert client.get('/api/bookings').status_code == 200
+    assert client.get('/api/db/pool-stats').json['checkedOut'] == 0
@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+from app import db
+from auth import issue_token
+from conftest import make_app
+from lifecycle import shutdown
+import pytest
+
+# The replica is a second SQLite file that never receives the primary's
+# writes: a replica lagging for the whole test.
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    def build(**config):
+        app = make_app(tmp_path, SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'replica.db'}"], **config)
+        db.metadata.create_all(app.extensions['replicas'].engines[0])
+        apps.append(app)
+        return app
+    apps = []
+    yield build
+    for app in apps:
+        shutdown(app, wait=False)
+
+
+def listing(name):
+    return {'name': name, 'species': 'dog', 'breed': 'beagle', 'contact_email': 'seller@example.com', 'price': '100'}
+
+
+def names(client, **headers):
+    response = client.get('/api/sell_pets', headers=headers)
+    assert response.status_code == 200
+    return {item['name'] for item in response.json}
+
+
+def client_at(app, address):
+    # No cookies: stickiness has to come from the client's identity
+    client = app.test_client(use_cookies=False)
+    client.environ_base['REMOTE_ADDR'] = address
+    return client
+
+
+def test_gets_read_from_the_replica(replicated):
+    app = replicated(CACHE_ENABLED=False)
+    with app.app_context():
+        db.session.execute(db.text(
+            "INSERT INTO sell_pets (id, name, species, breed, age, contact_email, price) "
+            "VALUES (1, 'replica only', 'dog', 'beagle', 1, 'seller@example.com', 100)"
+        ), bind_arguments={'bind': app.extensions['replicas'].engines[0]})
+        db.session.commit()
+    assert names(client_at(app, '192.0.2.1')) == {'replica only'}
+
+
+def test_writer_behind_a_proxy_reads_its_writes(replicated):
+    app = replicated(CACHE_ENABLED=False, TRUSTED_PROXIES=1)
+    proxy = client_at(app, '10.0.0.100')
+    assert proxy.post('/api/sell_pets', data=listing('fresh'), headers={'X-Forwarded-For': '192.0.2.1'}).status_code == 201
+    assert names(proxy, **{'X-Forwarded-For': '192.0.2.1'}) == {'fresh'}
+    # Another client behind the same proxy still reads from the replica
+    assert names(proxy, **{'X-Forwarded-For': '192.0.2.2'}) == set()
+
+
+def test_signed_in_writer_reads_its_writes_from_any_address(replicated):
+    app = replicated(CACHE_ENABLED=False)
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {issue_token('7', 'adopter')}"}
+    assert client_at(app, '192.0.2.1').post('/api/sell_pets', data=listing('fresh'), headers=headers).status_code == 201
+    assert names(client_at(app, '192.0.2.2'), **headers) == {'fresh'}
+    assert names(client_at(app, '192.0.2.2')) == set()
+
+
+def test_cached_list_is_fresh_after_a_write(replicated):
+    app = replicated()
+    writer, reader = client_at(app, '192.0.2.1'), client_at(app, '192.0.2.2')
+    assert names(reader) == set()  # Cached from the replica
+    assert writer.post('/api/sell_pets', data=listing('fresh')).status_code == 201
+    # The reader never wrote, but the refill after the invalidation comes from
+    # the primary, so the lagging replica is not cached as the new list
+    assert names(reader) == {'fresh'}
+    assert names(client_at(app, '192.0.2.3')) == {'fresh'}
+
+
+def test_slot_availability_is_loaded_from_the_primary(replicated):
+    app = replicated()
+    booker, other = client_at(app, '192.0.2.1'), client_at(app, '192.0.2.2')
+    day = (date.today() + timedelta(days=7)).isoformat()
+    assert booker.post('/api/consultations', json={
+        'vetId': 1, 'vetName': 'Dr. Test', 'petType': 'dog', 'petAge': 3,
+        'symptoms': 'check-up', 'consultDate': day, 'timeSlot': '10:00',
+    }).status_code == 201
+    # The first read fills the slot cache; the lagging replica must not be its source
+    for client in (other, booker):
+        response = client.get(f'/api/vets/1/availability?from={day}&to={day}')
+        assert '10:00' not in response.json['days'][0]['free']
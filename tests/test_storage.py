@@ -0,0 +1,53 @@
+from app import db
+from io import BytesIO
+from models import StoredFile
+from storage import store_stream, release_upload, remove_unreferenced, absolute
+from threading import Event, Thread
+import os
+import time
+
+
+def store(content, ext='jpg'):
+    name, _ = store_stream(BytesIO(content), ext)
+    db.session.commit()
+    return name
+
+
+def test_identical_uploads_share_one_file(app):
+    with app.app_context():
+        name = store(b'photo')
+        assert store(b'photo', 'jpeg') == name
+        assert StoredFile.query.filter_by(path=name).one().refcount == 2
+        assert release_upload(name) is None
+        db.session.commit()
+        assert os.path.exists(absolute(name))
+        assert release_upload(name) == name
+        db.session.commit()
+        remove_unreferenced(name)
+        assert not os.path.exists(absolute(name))
+        assert StoredFile.query.filter_by(path=name).first() is None
+
+
+def test_delete_keeps_a_file_an_uncommitted_upload_took(app):
+    with app.app_context():
+        name = store(b'photo')
+        assert release_upload(name) == name
+        db.session.commit()
+
+    taken = Event()
+
+    def upload():
+        with app.app_context():
+            store_stream(BytesIO(b'photo'), 'jpg')
+            taken.set()
+            time.sleep(0.3)  # Moved into place, not committed yet
+            db.session.commit()
+
+    thread = Thread(target=upload)
+    thread.start()
+    taken.wait()
+    with app.app_context():
+        remove_unreferenced(name)  # Waits for the upload's commit
+        assert os.path.exists(absolute(name))
+        assert StoredFile.query.filter_by(path=name).one().refcount == 1
+    thread.join()
@@ -0,0 +1,36 @@
+from app import db
+from datetime import date, timedelta
+from models import Booking
+import tracemalloc
+
+
+def add_bookings(count, start=0):
+    rows = [{'pet_name': 'Rex', 'service': f'service-{i}', 'date': date.today() + timedelta(days=i % 365),
+             'time': '10:00', 'notes': 'x' * 100} for i in range(start, start + count)]
+    db.session.execute(Booking.__table__.insert(), rows)
+    db.session.commit()
+
+
+def stream_peak(client):
+    """(lines, peak bytes allocated) while reading the whole NDJSON stream."""
+    tracemalloc.start()
+    try:
+        response = client.get('/api/bookings?stream=1', buffered=False)
+        lines = sum(chunk.count(b'\n') for chunk in response.response)
+        response.close()
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_ndjson_peak_memory_does_not_grow_with_the_table(app, client):
+    with app.app_context():
+        add_bookings(1000)
+    small_lines, small_peak = stream_peak(client)
+    with app.app_context():
+        add_bookings(9000, start=1000)
+    large_lines, large_peak = stream_peak(client)
+
+    assert (small_lines, large_lines) == (1000, 10000)
+    # Ten times the rows, about the same peak: one STREAM_BATCH_SIZE batch at a time
+    assert large_peak < small_peak * 1.5, (small_peak, large_peak)